@@ -0,0 +1,48 @@
+-- =====================================================
+-- updated_at triggers for the cash forecast source tables
+-- The forecast scripts pull only rows whose updated_at moved since their last
+-- run (forecast_snapshot.py). bank_statements and gl_transaction_overrides
+-- already have a trigger; quickbooks_bills, quickbooks_expenses and
+-- ramp_transactions only had DEFAULT NOW(), so a QuickBooks re-sync or a Ramp
+-- edit never reached a delta pull.
+--
+-- The QuickBooks sync rewrites every existing row on each run, so the stamp
+-- only moves when a column actually changed - otherwise every sync would turn
+-- the next delta pull into a full one.
+--
+-- After applying, run the forecast scripts once with --full-refresh to pick up
+-- edits made before the triggers existed.
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION touch_updated_at_if_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF ROW(NEW.*) IS DISTINCT FROM ROW(OLD.*) THEN
+    NEW.updated_at = NOW();
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS quickbooks_bills_updated_at ON quickbooks_bills;
+CREATE TRIGGER quickbooks_bills_updated_at
+  BEFORE UPDATE ON quickbooks_bills
+  FOR EACH ROW
+  EXECUTE FUNCTION touch_updated_at_if_changed();
+
+DROP TRIGGER IF EXISTS quickbooks_expenses_updated_at ON quickbooks_expenses;
+CREATE TRIGGER quickbooks_expenses_updated_at
+  BEFORE UPDATE ON quickbooks_expenses
+  FOR EACH ROW
+  EXECUTE FUNCTION touch_updated_at_if_changed();
+
+DROP TRIGGER IF EXISTS ramp_transactions_updated_at ON ramp_transactions;
+CREATE TRIGGER ramp_transactions_updated_at
+  BEFORE UPDATE ON ramp_transactions
+  FOR EACH ROW
+  EXECUTE FUNCTION touch_updated_at_if_changed();
+
+-- Delta pulls filter on updated_at
+CREATE INDEX IF NOT EXISTS idx_quickbooks_bills_updated_at ON quickbooks_bills(updated_at);
+CREATE INDEX IF NOT EXISTS idx_quickbooks_expenses_updated_at ON quickbooks_expenses(updated_at);
+CREATE INDEX IF NOT EXISTS idx_ramp_transactions_updated_at ON ramp_transactions(updated_at);
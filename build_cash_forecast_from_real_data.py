@@ -6,12 +6,18 @@ Pull from: GL transactions, Bank statements, Ramp transactions, QuickBooks
 
 import os
 import pandas as pd
-from supabase import create_client, Client
+from supabase import Client
 from datetime import datetime, timedelta
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from dotenv import load_dotenv
 
+from forecast_fetch import fetch_table
+from forecast_http import create_pooled_client, print_transport_summary
+from forecast_rules import print_cache_summary
+from forecast_ruleset import load_ruleset
+from forecast_vendors import VendorIndex, print_vendor_summary
+
 # Load environment variables
 load_dotenv('.env.local')
 
@@ -24,7 +30,7 @@ if not SUPABASE_URL or not SUPABASE_KEY:
     print("   Need: NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
     exit(1)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase: Client = create_pooled_client(SUPABASE_URL, SUPABASE_KEY)
 
 print("=" * 80)
 print("📊 BUILDING CASH FORECAST FROM REAL BOSS DATA")
@@ -38,19 +44,17 @@ print("-" * 80)
 
 try:
     # Get QuickBooks bills categorized as labor
-    labor_response = supabase.table('quickbooks_bills').select(
-        'id, txn_date, bill_date, vendor_ref, total_amt, balance, due_date, doc_number'
-    ).execute()
-    
-    bills = labor_response.data if labor_response.data else []
+    bills = fetch_table(
+        supabase, 'quickbooks_bills',
+        'id, bill_date, vendor_name, total_amount, balance, due_date, bill_number'
+    )
     print(f"   ✅ Fetched {len(bills)} bills from QuickBooks")
     
     # Get overrides to identify labor categories
-    overrides_response = supabase.table('gl_transaction_overrides').select(
+    overrides = fetch_table(
+        supabase, 'gl_transaction_overrides',
         'transaction_id, override_category, override_account_type'
-    ).execute()
-    
-    overrides = overrides_response.data if overrides_response.data else []
+    )
     print(f"   ✅ Fetched {len(overrides)} GL overrides")
     
     # Create override lookup
@@ -76,7 +80,7 @@ try:
     if labor_bills:
         print("\n   Sample labor transactions:")
         for bill in labor_bills[:5]:
-            print(f"      {bill.get('bill_date', 'N/A')[:10]} | {bill.get('vendor_ref', 'Unknown')[:30]:30} | ${float(bill.get('total_amt', 0)):>10,.2f} | {bill.get('override_account_type', 'Uncategorized')}")
+            print(f"      {bill.get('bill_date', 'N/A')[:10]} | {bill.get('vendor_name') or 'Unknown':30.30} | ${float(bill.get('total_amount') or 0):>10,.2f} | {bill.get('override_account_type', 'Uncategorized')}")
 
 except Exception as e:
     print(f"   ❌ Error fetching labor data: {e}")
@@ -89,12 +93,12 @@ print("\n\n2️⃣ Fetching Bank Statement Transactions...")
 print("-" * 80)
 
 try:
-    bank_response = supabase.table('bank_statements').select(
-        'id, transaction_date, description, amount, balance, transaction_type, category, memo'
-    ).order('transaction_date', desc=True).limit(500).execute()
-    
-    bank_txns = bank_response.data if bank_response.data else []
-    print(f"   ✅ Fetched {len(bank_txns)} bank transactions (last 500)")
+    bank_txns = fetch_table(
+        supabase, 'bank_statements',
+        'id, transaction_date, description, amount, balance, category'
+    )
+    bank_txns.reverse()  # newest first
+    print(f"   ✅ Fetched {len(bank_txns)} bank transactions")
     
     if bank_txns:
         print("\n   Sample bank transactions:")
@@ -113,24 +117,27 @@ print("\n\n3️⃣ Fetching Ramp Transaction Data...")
 print("-" * 80)
 
 try:
-    ramp_response = supabase.table('ramp_transactions').select(
-        'id, transaction_date, merchant_name, amount, category, memo, card_holder'
-    ).order('transaction_date', desc=True).limit(500).execute()
-    
-    ramp_txns = ramp_response.data if ramp_response.data else []
-    print(f"   ✅ Fetched {len(ramp_txns)} Ramp transactions (last 500)")
+    ramp_txns = fetch_table(
+        supabase, 'ramp_transactions',
+        'id, transaction_date, payee, charge_usd, payment_usd, category, memo'
+    )
+    ramp_txns.reverse()  # newest first
+    for txn in ramp_txns:
+        # A card charge, or a refund/payment when nothing was charged
+        txn['amount'] = float(txn.get('charge_usd') or 0) or float(txn.get('payment_usd') or 0)
+    print(f"   ✅ Fetched {len(ramp_txns)} Ramp transactions")
     
     if ramp_txns:
         print("\n   Sample Ramp transactions:")
         for txn in ramp_txns[:10]:
             amt = float(txn.get('amount', 0))
-            print(f"      {txn.get('transaction_date', 'N/A')[:10]} | {txn.get('merchant_name', 'Unknown')[:40]:40} | ${amt:>10,.2f} | {txn.get('category', 'Uncategorized')}")
+            print(f"      {txn.get('transaction_date', 'N/A')[:10]} | {txn.get('payee') or 'Unknown':40.40} | ${amt:>10,.2f} | {txn.get('category', 'Uncategorized')}")
         
         # Analyze recurring expenses
         print("\n   🔁 Analyzing Recurring Expenses from Ramp:")
         ramp_df = pd.DataFrame(ramp_txns)
-        if not ramp_df.empty and 'merchant_name' in ramp_df.columns:
-            recurring = ramp_df.groupby('merchant_name').agg({
+        if not ramp_df.empty and 'payee' in ramp_df.columns:
+            recurring = ramp_df.groupby('payee').agg({
                 'amount': ['count', 'sum', 'mean'],
                 'category': lambda x: x.mode()[0] if not x.empty else 'Unknown'
             }).reset_index()
@@ -152,18 +159,18 @@ print("\n\n4️⃣ Fetching QuickBooks Expenses...")
 print("-" * 80)
 
 try:
-    qb_expenses_response = supabase.table('quickbooks_expenses').select(
-        'id, txn_date, payee, total_amt, payment_type, memo'
-    ).order('txn_date', desc=True).limit(500).execute()
-    
-    qb_expenses = qb_expenses_response.data if qb_expenses_response.data else []
-    print(f"   ✅ Fetched {len(qb_expenses)} QuickBooks expenses (last 500)")
+    qb_expenses = fetch_table(
+        supabase, 'quickbooks_expenses',
+        'id, expense_date, vendor_name, total_amount, payment_type, memo'
+    )
+    qb_expenses.reverse()  # newest first
+    print(f"   ✅ Fetched {len(qb_expenses)} QuickBooks expenses")
     
     if qb_expenses:
         print("\n   Sample QB expenses:")
         for exp in qb_expenses[:10]:
-            amt = float(exp.get('total_amt', 0))
-            print(f"      {exp.get('txn_date', 'N/A')[:10]} | {exp.get('payee', 'Unknown')[:40]:40} | ${amt:>10,.2f} | {exp.get('payment_type', 'N/A')}")
+            amt = float(exp.get('total_amount') or 0)
+            print(f"      {exp.get('expense_date') or 'N/A':10.10} | {exp.get('vendor_name') or 'Unknown':40.40} | ${amt:>10,.2f} | {exp.get('payment_type', 'N/A')}")
 
 except Exception as e:
     print(f"   ❌ Error fetching QB expenses: {e}")
@@ -175,65 +182,9 @@ except Exception as e:
 print("\n\n5️⃣ Categorizing Expenses into Professional Structure...")
 print("-" * 80)
 
-# Category mapping rules
-CATEGORY_RULES = {
-    # Labor - Operations
-    'warehouse': 'Operations - Warehouse',
-    'fulfillment': 'Operations - Warehouse',
-    'customer support': 'Operations - Support',
-    'customer care': 'Operations - Support',
-    'facility': 'Operations - Facility',
-    'maintenance': 'Operations - Facility',
-    
-    # Labor - G&A
-    'controller': 'G&A - Finance',
-    'accounting': 'G&A - Finance',
-    'finance': 'G&A - Finance',
-    'sales': 'G&A - Sales',
-    'commission': 'G&A - Sales',
-    'executive': 'G&A - Executive',
-    'ceo': 'G&A - Executive',
-    'hr': 'G&A - HR/Admin',
-    'admin': 'G&A - HR/Admin',
-    
-    # Labor - R&D
-    'engineering': 'R&D - Engineering',
-    'engineer': 'R&D - Engineering',
-    'firmware': 'R&D - Engineering',
-    'software': 'R&D - Engineering',
-    'product manager': 'R&D - Product',
-    'product management': 'R&D - Product',
-    'cto': 'R&D - Product',
-    'testing': 'R&D - Testing',
-    'qa': 'R&D - Testing',
-    'certification': 'R&D - Testing',
-    
-    # Labor - Marketing
-    'marketing': 'Marketing - Ops',
-    'seo': 'Marketing - Digital',
-    'google ads': 'Marketing - Digital',
-    'facebook ads': 'Marketing - Digital',
-    'amazon ads': 'Marketing - Digital',
-    'design': 'Marketing - Creative',
-    'creative': 'Marketing - Creative',
-    
-    # OpEx
-    'aws': 'OpEx - IT/Software',
-    'amazon web services': 'OpEx - IT/Software',
-    'software': 'OpEx - IT/Software',
-    'saas': 'OpEx - IT/Software',
-    'subscription': 'OpEx - IT/Software',
-    'rent': 'OpEx - Rent/Facilities',
-    'lease': 'OpEx - Rent/Facilities',
-    'insurance': 'OpEx - Insurance',
-    'legal': 'OpEx - Professional Services',
-    'attorney': 'OpEx - Professional Services',
-    'lawyer': 'OpEx - Professional Services',
-    'shipping': 'Inventory - Freight',
-    'freight': 'Inventory - Freight',
-    'fedex': 'Inventory - Freight',
-    'ups': 'Inventory - Freight',
-}
+# Category rules: the shared forecast_ruleset.json rules, then this builder's own keywords
+RULESET = load_ruleset(rule_set='real_data')
+CATEGORY_MATCHER = RULESET.matcher
 
 def categorize_transaction(description, vendor, category_hint=None):
     """
@@ -245,11 +196,7 @@ def categorize_transaction(description, vendor, category_hint=None):
     
     search_text = f"{desc_lower} {vendor_lower} {hint_lower}"
     
-    for keyword, category in CATEGORY_RULES.items():
-        if keyword in search_text:
-            return category
-    
-    return 'Uncategorized'
+    return CATEGORY_MATCHER.match(search_text, ('Uncategorized', ''))[0]
 
 # Categorize all transactions
 print("\n   Categorizing transactions...")
@@ -259,15 +206,15 @@ categorized_data = []
 # Process labor bills
 for bill in labor_bills:
     cat = categorize_transaction(
-        bill.get('vendor_ref', ''),
-        bill.get('vendor_ref', ''),
+        bill.get('vendor_name', ''),
+        bill.get('vendor_name', ''),
         bill.get('override_account_type', '')
     )
     categorized_data.append({
         'Source': 'QuickBooks Bill',
-        'Date': bill.get('bill_date', bill.get('txn_date', '')),
-        'Vendor/Payee': bill.get('vendor_ref', 'Unknown'),
-        'Amount': float(bill.get('total_amt', 0)),
+        'Date': bill.get('bill_date', ''),
+        'Vendor/Payee': bill.get('vendor_name') or 'Unknown',
+        'Amount': float(bill.get('total_amount') or 0),
         'Category': cat,
         'Subcategory': bill.get('override_account_type', ''),
         'Type': 'Labor' if 'labor' in bill.get('override_category', '').lower() else 'OpEx'
@@ -294,35 +241,34 @@ for txn in bank_txns:
 
 # Process Ramp transactions
 for txn in ramp_txns:
-    amt = float(txn.get('amount', 0))
+    amt = txn['amount']
     cat = categorize_transaction(
-        txn.get('merchant_name', ''),
-        txn.get('merchant_name', ''),
+        txn.get('payee', ''),
+        txn.get('payee', ''),
         txn.get('category', '')
     )
     categorized_data.append({
         'Source': 'Ramp',
         'Date': txn.get('transaction_date', ''),
-        'Vendor/Payee': txn.get('merchant_name', 'Unknown'),
+        'Vendor/Payee': txn.get('payee') or 'Unknown',
         'Amount': abs(amt),
         'Category': cat,
         'Subcategory': txn.get('category', ''),
-        'Type': 'OpEx',
-        'Card_Holder': txn.get('card_holder', '')
+        'Type': 'OpEx'
     })
 
 # Process QB expenses
 for exp in qb_expenses:
-    amt = float(exp.get('total_amt', 0))
+    amt = float(exp.get('total_amount') or 0)
     cat = categorize_transaction(
-        exp.get('payee', ''),
-        exp.get('payee', ''),
+        exp.get('vendor_name', ''),
+        exp.get('vendor_name', ''),
         exp.get('memo', '')
     )
     categorized_data.append({
         'Source': 'QuickBooks Expense',
-        'Date': exp.get('txn_date', ''),
-        'Vendor/Payee': exp.get('payee', 'Unknown'),
+        'Date': exp.get('expense_date', ''),
+        'Vendor/Payee': exp.get('vendor_name') or 'Unknown',
         'Amount': abs(amt),
         'Category': cat,
         'Subcategory': exp.get('payment_type', ''),
@@ -343,6 +289,12 @@ if not df.empty:
     # Convert date to datetime
     df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
     
+    # Group payees by canonical vendor, not by raw bank/Ramp string
+    vendor_index = VendorIndex()
+    df['Vendor_ID'], df['Canonical_Vendor'] = vendor_index.resolve(df['Vendor/Payee'])
+    vendor_index.save()
+    print_vendor_summary(df['Vendor/Payee'], df['Vendor_ID'])
+    
     # Summary by category
     print("\n   💰 SPENDING BY CATEGORY:")
     category_summary = df.groupby('Category')['Amount'].agg(['count', 'sum']).sort_values('sum', ascending=False)
@@ -359,7 +311,7 @@ if not df.empty:
     
     # Top vendors
     print("\n   🏢 TOP 20 VENDORS BY SPEND:")
-    vendor_summary = df.groupby('Vendor/Payee')['Amount'].sum().sort_values(ascending=False).head(20)
+    vendor_summary = df.groupby('Canonical_Vendor')['Amount'].sum().sort_values(ascending=False).head(20)
     for vendor, amount in vendor_summary.items():
         print(f"      {vendor[:50]:50} | ${amount:>12,.2f}")
 
@@ -380,7 +332,7 @@ if not df.empty:
         labor_df = df[df['Type'] == 'Labor'].copy()
         if not labor_df.empty:
             labor_summary = labor_df.pivot_table(
-                index='Vendor/Payee',
+                index='Canonical_Vendor',
                 columns=df['Date'].dt.to_period('W').astype(str),
                 values='Amount',
                 aggfunc='sum',
@@ -417,3 +369,5 @@ print("2. Identify any 'Uncategorized' items and assign proper categories")
 print("3. Merge this with the Cash Forecast template")
 print("4. Iterate on categorization rules based on your feedback")
 
+print_transport_summary(supabase.transport_stats)
+print_cache_summary(CATEGORY_MATCHER)
@@ -6,10 +6,13 @@ Pull REAL data from BOSS to populate Labor & OpEx tabs
 
 import os
 import pandas as pd
-from supabase import create_client, Client
+from supabase import Client
 from datetime import datetime
 from dotenv import load_dotenv
 
+from forecast_fetch import fetch_table
+from forecast_http import create_pooled_client, print_transport_summary
+
 # Load environment variables
 load_dotenv('.env.local')
 
@@ -20,7 +23,7 @@ if not SUPABASE_URL or not SUPABASE_KEY:
     print("❌ Error: Missing Supabase credentials")
     exit(1)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase: Client = create_pooled_client(SUPABASE_URL, SUPABASE_KEY)
 
 print("=" * 80)
 print("💰 BUILDING CASH FORECAST FROM REAL BOSS DATA - ITERATION 1")
@@ -33,13 +36,11 @@ all_expenses = []
 # =============================================================================
 print("\n1️⃣ Fetching QuickBooks Bills...")
 try:
-    bills_response = supabase.table('quickbooks_bills').select('*').execute()
-    bills = bills_response.data if bills_response.data else []
+    bills = fetch_table(supabase, 'quickbooks_bills')
     print(f"   ✅ Found {len(bills)} bills")
     
     # Get GL overrides
-    overrides_response = supabase.table('gl_transaction_overrides').select('*').execute()
-    overrides = overrides_response.data if overrides_response.data else []
+    overrides = fetch_table(supabase, 'gl_transaction_overrides')
     override_map = {o['transaction_id']: o for o in overrides}
     print(f"   ✅ Found {len(overrides)} GL overrides")
     
@@ -62,8 +63,7 @@ except Exception as e:
 # =============================================================================
 print("\n2️⃣ Fetching QuickBooks Expenses...")
 try:
-    expenses_response = supabase.table('quickbooks_expenses').select('*').execute()
-    expenses = expenses_response.data if expenses_response.data else []
+    expenses = fetch_table(supabase, 'quickbooks_expenses')
     print(f"   ✅ Found {len(expenses)} expenses")
     
     for exp in expenses:
@@ -84,8 +84,7 @@ except Exception as e:
 # =============================================================================
 print("\n3️⃣ Fetching Bank Transactions...")
 try:
-    bank_response = supabase.table('bank_statements').select('*').limit(1000).execute()
-    bank_txns = bank_response.data if bank_response.data else []
+    bank_txns = fetch_table(supabase, 'bank_statements')
     print(f"   ✅ Found {len(bank_txns)} bank transactions")
     
     for txn in bank_txns:
@@ -108,8 +107,7 @@ except Exception as e:
 # =============================================================================
 print("\n4️⃣ Fetching Ramp Transactions...")
 try:
-    ramp_response = supabase.table('ramp_transactions').select('*').limit(1000).execute()
-    ramp_txns = ramp_response.data if ramp_response.data else []
+    ramp_txns = fetch_table(supabase, 'ramp_transactions')
     print(f"   ✅ Found {len(ramp_txns)} Ramp transactions")
     
     for txn in ramp_txns:
@@ -167,3 +165,4 @@ print("\n" + "=" * 80)
 print("✅ DONE! Review the Excel file.")
 print("=" * 80)
 
+print_transport_summary(supabase.transport_stats)
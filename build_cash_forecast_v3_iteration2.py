@@ -4,101 +4,112 @@ Build Cash Forecast - ITERATION 2
 Smart auto-categorization based on vendor patterns + GL overrides
 """
 
+import argparse
+import atexit
 import os
 import pandas as pd
-from supabase import create_client, Client
+from supabase import Client
 from datetime import datetime
+import time
 from dotenv import load_dotenv
 import re
 
+from forecast_aggregates import (fetch_weekly_spend, fetch_weekly_spend_pg, print_summary_only_warning,
+                                 rules_payload)
+from forecast_category_cache import RESULT_COLUMNS, CategoryCache, print_category_cache_summary
+from forecast_classifier import fill_uncategorized
+from forecast_dedup import DATE_WINDOW_DAYS, dedupe_sources, print_dedup_summary
+from forecast_fetch import print_fetch_summary, resolve_window
+from forecast_frame import apply_overrides, dollars, print_frame_summary, source_frame, transaction_frame
+from forecast_fixtures import FIXTURE_DIR, RecordingClient, ReplayClient
+from forecast_http import create_pooled_client, print_transport_summary
+from forecast_parallel import PARALLEL_MIN_ROWS
+from forecast_pg import get_dsn
+from forecast_rule_profile import PROFILE_FILE, print_rule_profile, profile_rules
+from forecast_rules import print_cache_summary, search_texts
+from forecast_ruleset import MATCH_TEXT_VERSION, load_ruleset
+from forecast_sources import fetch_forecast_sources, source_fetcher
+from forecast_vendors import VendorIndex, print_vendor_summary
+
+parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+parser.add_argument('--backend', choices=['supabase', 'postgres'],
+                    default=os.getenv('FORECAST_BACKEND', 'supabase'),
+                    help='supabase = PostgREST (+ local snapshots); postgres = COPY over DATABASE_URL')
+parser.add_argument('--full-refresh', action='store_true',
+                    help='discard the local snapshots in .forecast_cache/ and re-download every table')
+parser.add_argument('--no-snapshot', action='store_true',
+                    help='read straight from Supabase, bypassing the local snapshots')
+parser.add_argument('--since', help='first transaction date to pull (YYYY-MM-DD)')
+parser.add_argument('--until', help='last transaction date to pull (YYYY-MM-DD)')
+parser.add_argument('--weeks-back', type=int,
+                    help='pull this many whole weeks before the current week (ignored with --since)')
+parser.add_argument('--weeks-forward', type=int,
+                    help='pull this many whole weeks after the current week (ignored with --until)')
+parser.add_argument('--summary-only', action='store_true',
+                    help='only build the weekly summary sheets from server-side aggregates (no raw fetch)')
+parser.add_argument('--record', nargs='?', const=FIXTURE_DIR, metavar='DIR',
+                    help=f'save every Supabase response as gzip fixtures in DIR (default {FIXTURE_DIR}/)')
+parser.add_argument('--replay', nargs='?', const=FIXTURE_DIR, metavar='DIR',
+                    help='serve Supabase responses from fixtures saved with --record (no credentials needed)')
+parser.add_argument('--recategorize', action='store_true',
+                    help='discard cached categorization results in .forecast_cache/ and match every row again')
+parser.add_argument('--profile-rules', action='store_true',
+                    help='report per-rule hits, dollars, shadowing and dead rules (also saved to BDI_Rule_Profile.xlsx)')
+parser.add_argument('--workers', type=int,
+                    help=f'processes for categorizing large backfills (default: every core, once more than '
+                         f'{PARALLEL_MIN_ROWS:,} rows need matching; 1 = single process)')
+parser.add_argument('--dedup-days', type=int, default=DATE_WINDOW_DAYS,
+                    help=f'days apart a QB/bank/Ramp row can be from its duplicate in another source '
+                         f'(default {DATE_WINDOW_DAYS}; bills also match anywhere up to their due date)')
+parser.add_argument('--keep-duplicates', action='store_true',
+                    help='keep cross-source duplicates in the totals instead of folding them into one record')
+args = parser.parse_args()
+
+if args.record or args.replay:
+    if args.backend == 'postgres':
+        parser.error('--record/--replay only apply to the supabase backend')
+    # Snapshot delta pulls depend on local state, so fixtures are always full queries
+    args.no_snapshot = True
+
 load_dotenv('.env.local')
 
 SUPABASE_URL = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+DATABASE_URL = get_dsn()
 
-if not SUPABASE_URL or not SUPABASE_KEY:
+if args.backend == 'postgres':
+    if not DATABASE_URL:
+        print("❌ Missing DATABASE_URL for the postgres backend")
+        exit(1)
+elif not args.replay and (not SUPABASE_URL or not SUPABASE_KEY):
     print("❌ Missing Supabase credentials")
     exit(1)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase: Client = None
+if args.replay:
+    supabase = ReplayClient(args.replay)
+elif args.backend == 'supabase':
+    supabase = create_pooled_client(SUPABASE_URL, SUPABASE_KEY)
+    atexit.register(print_transport_summary, supabase.transport_stats)
+    if args.record:
+        supabase = RecordingClient(supabase, args.record)
+        atexit.register(lambda: print(f"\n💾 Recorded {supabase.save()} responses to {args.record}/"))
 
 print("=" * 80)
 print("💰 CASH FORECAST BUILDER - ITERATION 2")
 print("=" * 80)
 
 # =============================================================================
-# SMART CATEGORIZATION RULES
+# SMART CATEGORIZATION RULES (forecast_ruleset.json, shared by every builder)
 # =============================================================================
-VENDOR_RULES = {
-    # Labor - Operations
-    'customer care': ('Labor - Operations', 'Support'),
-    'warehouse': ('Labor - Operations', 'Warehouse'),
-    'fulfillment': ('Labor - Operations', 'Warehouse'),
-    'facility': ('Labor - Operations', 'Facility'),
-    'maintenance': ('Labor - Operations', 'Facility'),
-    
-    # Labor - G&A
-    'controller': ('Labor - G&A', 'Finance'),
-    'accounting': ('Labor - G&A', 'Finance'),
-    'paylocity': ('Labor - G&A', 'Payroll'),
-    'payroll': ('Labor - G&A', 'Payroll'),
-    'sales': ('Labor - G&A', 'Sales'),
-    'commission': ('Labor - G&A', 'Sales'),
-    'legal': ('OpEx - Professional Services', 'Legal'),
-    'attorney': ('OpEx - Professional Services', 'Legal'),
-    
-    # Labor - R&D
-    'gryphon': ('Labor - R&D', 'Engineering'),
-    'firmware': ('Labor - R&D', 'Engineering'),
-    'software': ('Labor - R&D', 'Engineering'),
-    'engineering': ('Labor - R&D', 'Engineering'),
-    'cto': ('Labor - R&D', 'Product'),
-    'product manager': ('Labor - R&D', 'Product'),
-    
-    # NRE/R&D
-    'cable television laboratories': ('NRE', 'Certification'),
-    'cable lab': ('NRE', 'Certification'),
-    'cablelabs': ('NRE', 'Certification'),
-    'certification': ('NRE', 'Certification'),
-    'testing': ('NRE', 'Testing'),
-    
-    # Inventory/COGS
-    'mtn high-technology': ('Inventory', 'Finished Goods'),
-    'mtn': ('Inventory', 'Finished Goods'),
-    'askey': ('Inventory', 'Finished Goods'),
-    'compal': ('Inventory', 'Finished Goods'),
-    't&w': ('Inventory', 'Components'),
-    'flexport': ('Inventory', 'Freight'),
-    'shipping': ('Inventory', 'Freight'),
-    'fedex': ('Inventory', 'Freight'),
-    'ups': ('Inventory', 'Freight'),
-    
-    # OpEx - IT/Software
-    'amazon web servi': ('OpEx - IT/Software', 'AWS'),
-    'aws': ('OpEx - IT/Software', 'AWS'),
-    'google': ('OpEx - IT/Software', 'Google Workspace'),
-    'microsoft': ('OpEx - IT/Software', 'Microsoft'),
-    'salesforce': ('OpEx - IT/Software', 'Salesforce'),
-    'quickbooks': ('OpEx - IT/Software', 'QuickBooks'),
-    'slack': ('OpEx - IT/Software', 'Slack'),
-    'zoom': ('OpEx - IT/Software', 'Zoom'),
-    'adobe': ('OpEx - IT/Software', 'Adobe'),
-    'dropbox': ('OpEx - IT/Software', 'Dropbox'),
-    
-    # OpEx - Other
-    'insurance': ('OpEx - Insurance', 'Insurance'),
-    'rent': ('OpEx - Rent/Facilities', 'Rent'),
-    'lease': ('OpEx - Rent/Facilities', 'Lease'),
-    'bank fee': ('OpEx - Banking', 'Bank Fees'),
-    'wire': ('OpEx - Banking', 'Wire Fees'),
-    
-    # Marketing
-    'facebook': ('Marketing - Digital', 'Facebook Ads'),
-    'meta': ('Marketing - Digital', 'Meta Ads'),
-    'google ads': ('Marketing - Digital', 'Google Ads'),
-    'linkedin': ('Marketing - Digital', 'LinkedIn Ads'),
-    'amazon advertising': ('Marketing - Digital', 'Amazon Ads'),
-}
+# Compiled once and cached in .forecast_cache/ until the file changes; one pass
+# over the lowercased search text per transaction whatever the number of rules.
+# The iteration 2 keywords (rent, lease, FedEx, Salesforce...) follow the shared rules
+RULESET = load_ruleset(rule_set='iteration2')
+VENDOR_RULES, FALLBACK_RULES = RULESET.vendor_rules, RULESET.fallback_rules
+RULE_MATCHER = RULESET.matcher
+atexit.register(print_cache_summary, RULE_MATCHER)
+print(f"📚 Ruleset v{RULESET.version}: {len(RULESET)} rules")
 
 def smart_categorize(vendor, description, memo=''):
     """
@@ -107,186 +118,214 @@ def smart_categorize(vendor, description, memo=''):
     """
     search_text = f"{vendor} {description} {memo}".lower()
     
-    # Check each rule
-    for keyword, (category, subcategory) in VENDOR_RULES.items():
-        if keyword in search_text:
-            return (category, subcategory)
-    
-    # Special patterns
-    if 'tide rock' in search_text or 'corporate xfer' in search_text:
-        return ('Internal Transfer', 'Tide Rock')
-    
-    if 'wire/out' in search_text or 'ach' in search_text:
-        return ('Uncategorized', 'Wire/ACH - Needs Review')
-    
-    return ('Uncategorized', '')
+    # First matching rule wins: VENDOR_RULES in order, then FALLBACK_RULES
+    return RULE_MATCHER.match(search_text, ('Uncategorized', ''))
+
+# Each source's search texts from its last smart_categorize_batch call
+SEARCH_TEXTS = {}
+
+def smart_categorize_batch(source, ids, vendor, description, memo=''):
+    """
+    smart_categorize over whole columns, through the persistent result cache
+    Returns RESULT_COLUMNS aligned to the input; only rows that are new, edited or
+    touched by a rule change since the last run are matched
+    """
+    search_text = search_texts(vendor, description, memo)
+    SEARCH_TEXTS[source] = search_text  # kept for --profile-rules
+    return CATEGORY_CACHE.categorize(source, ids, search_text, shard_keys=vendor)
+
+# =============================================================================
+# SUMMARY-ONLY MODE (server-side weekly aggregates, no raw transactions)
+# =============================================================================
+if args.summary_only:
+    print("\n1️⃣ Pulling weekly aggregates from BOSS...")
+    print_summary_only_warning()
+    since, until = resolve_window(args.since, args.until, args.weeks_back, args.weeks_forward)
+    rules = rules_payload(RULE_MATCHER)
+    if args.backend == 'postgres':
+        weekly = fetch_weekly_spend_pg(DATABASE_URL, rules, since, until)
+    else:
+        weekly = fetch_weekly_spend(supabase, rules, since, until)
+    print(f"   ✅ {len(weekly)} week × category rows ({int(weekly['txn_count'].sum())} transactions)")
+
+    if weekly.empty:
+        print("   ⚠️  No transactions found (check --since/--until)")
+        exit(0)
+
+    weekly = weekly.rename(columns={'week_start': 'Week', 'category': 'Category', 'amount': 'Amount'})
+    cat_summary = weekly.groupby('Category').agg(count=('txn_count', 'sum'), sum=('Amount', 'sum')).sort_values('sum', ascending=False)
+    print(f"\n   📊 TOTAL SPEND (dated transactions): ${weekly['Amount'].sum():,.2f}")
+
+    output_file = "BDI_Cash_Forecast_Weekly_Summary_v2.xlsx"
+    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        cat_summary.to_excel(writer, sheet_name='By Category')
+        weekly_pivot = weekly.pivot_table(
+            index='Category',
+            columns='Week',
+            values='Amount',
+            aggfunc='sum',
+            fill_value=0
+        )
+        weekly_pivot['Total'] = weekly_pivot.sum(axis=1)
+        weekly_pivot = weekly_pivot.sort_values('Total', ascending=False)
+        weekly_pivot.to_excel(writer, sheet_name='Weekly Spend')
+
+    print(f"\n   ✅ Excel created: {output_file}")
+    exit(0)
 
 # =============================================================================
 # PULL DATA
 # =============================================================================
 print("\n1️⃣ Pulling data from BOSS...")
 
-all_expenses = []
+since, until = resolve_window(args.since, args.until, args.weeks_back, args.weeks_forward)
+if since or until:
+    print(f"   📅 Window: {since or 'start'} → {until or 'latest'}")
+
+fetch_started = time.perf_counter()
+client, fetch, fetch_options = source_fetcher(
+    args.backend, supabase, DATABASE_URL, snapshot=not args.no_snapshot, full_refresh=args.full_refresh
+)
+fetched, fetch_stats = fetch_forecast_sources(client, fetch, fetch_options, since, until)
+print_fetch_summary(fetch_stats, time.perf_counter() - fetch_started)
+
+CATEGORY_CACHE = CategoryCache('v3', RULE_MATCHER, normalize_version=MATCH_TEXT_VERSION,
+                               reset=args.recategorize, workers=args.workers)
+atexit.register(print_category_cache_summary, CATEGORY_CACHE)
+
+frames = []
 
 # Get GL Overrides first
-print("   Fetching GL overrides...")
-overrides_response = supabase.table('gl_transaction_overrides').select('*').execute()
-overrides = overrides_response.data if overrides_response.data else []
-override_map = {o['transaction_id']: o for o in overrides}
+print("   Processing GL overrides...")
+overrides = fetched['gl_transaction_overrides']
 print(f"   ✅ {len(overrides)} GL overrides")
 
 # QuickBooks Bills
-print("   Fetching QB Bills...")
-bills_response = supabase.table('quickbooks_bills').select('*').execute()
-bills = bills_response.data if bills_response.data else []
+print("   Processing QB Bills...")
+bills = fetched['quickbooks_bills']
+bills[RESULT_COLUMNS] = smart_categorize_batch('quickbooks_bills', bills['id'], bills['vendor_name'], bills['vendor_name'], '')
 print(f"   ✅ {len(bills)} bills")
 
-for bill in bills:
-    override = override_map.get(str(bill['id']))
-    
-    if override:
-        category = f"{override.get('override_category', 'Uncategorized').title()}"
-        subcategory = override.get('override_account_type', '')
-    else:
-        category, subcategory = smart_categorize(
-            bill.get('vendor_name', ''),
-            bill.get('vendor_name', ''),
-            ''
-        )
-    
-    all_expenses.append({
-        'Source': 'QB Bill',
-        'Date': bill.get('bill_date'),
-        'Vendor': bill.get('vendor_name', 'Unknown'),
-        'Amount': abs(float(bill.get('total_amount', 0))),
-        'Category': category,
-        'Subcategory': subcategory,
-        'Balance': float(bill.get('balance', 0)),
-        'Due_Date': bill.get('due_date'),
-        'ID': bill.get('id')
-    })
+bill_frame = source_frame('QB Bill', bills['id'], bills['bill_date'], bills['vendor_name'], bills['total_amount'].abs(),
+                          bills[RESULT_COLUMNS], balance=bills['balance'], due_dates=bills['due_date'])
+apply_overrides(bill_frame, overrides)
+frames.append(bill_frame)
 
 # QuickBooks Expenses
-print("   Fetching QB Expenses...")
-expenses_response = supabase.table('quickbooks_expenses').select('*').execute()
-expenses = expenses_response.data if expenses_response.data else []
+print("   Processing QB Expenses...")
+expenses = fetched['quickbooks_expenses']
+expenses[RESULT_COLUMNS] = smart_categorize_batch(
+    'quickbooks_expenses', expenses['id'], expenses['vendor_name'], expenses['vendor_name'], expenses['memo']
+)
 print(f"   ✅ {len(expenses)} expenses")
 
-for exp in expenses:
-    override = override_map.get(str(exp['id']))
-    
-    if override:
-        category = f"{override.get('override_category', 'Uncategorized').title()}"
-        subcategory = override.get('override_account_type', '')
-    else:
-        category, subcategory = smart_categorize(
-            exp.get('payee', ''),
-            exp.get('payee', ''),
-            exp.get('memo', '')
-        )
-    
-    all_expenses.append({
-        'Source': 'QB Expense',
-        'Date': exp.get('expense_date'),
-        'Vendor': exp.get('payee', 'Unknown'),
-        'Amount': abs(float(exp.get('total_amt', 0))),
-        'Category': category,
-        'Subcategory': subcategory,
-        'Balance': 0,
-        'Due_Date': None,
-        'ID': exp.get('id')
-    })
+expense_frame = source_frame('QB Expense', expenses['id'], expenses['expense_date'], expenses['vendor_name'],
+                             expenses['total_amount'].abs(), expenses[RESULT_COLUMNS], memo=expenses['memo'])
+apply_overrides(expense_frame, overrides)
+frames.append(expense_frame)
 
 # Bank Statements
-print("   Fetching Bank transactions...")
-bank_response = supabase.table('bank_statements').select('*').limit(1000).execute()
-bank_txns = bank_response.data if bank_response.data else []
+print("   Processing Bank transactions...")
+bank_txns = fetched['bank_statements']
+bank_txns[RESULT_COLUMNS] = smart_categorize_batch(
+    'bank_statements', bank_txns['id'], bank_txns['description'], bank_txns['description'], ''
+)
 print(f"   ✅ {len(bank_txns)} bank transactions")
 
-for txn in bank_txns:
-    amt = float(txn.get('amount', 0))
-    if amt < 0:  # Expenses only
-        category, subcategory = smart_categorize(
-            txn.get('description', ''),
-            txn.get('description', ''),
-            txn.get('memo', '')
-        )
-        
-        all_expenses.append({
-            'Source': 'Bank',
-            'Date': txn.get('transaction_date'),
-            'Vendor': txn.get('description', 'Unknown'),
-            'Amount': abs(amt),
-            'Category': category,
-            'Subcategory': subcategory,
-            'Balance': 0,
-            'Due_Date': None,
-            'ID': txn.get('id')
-        })
+debits = bank_txns[bank_txns['amount'] < 0]  # Expenses only
+frames.append(source_frame('Bank', debits['id'], debits['transaction_date'], debits['description'],
+                           debits['amount'].abs(), debits[RESULT_COLUMNS]))
 
 # Ramp Transactions (use charge_usd and payee)
-print("   Fetching Ramp transactions...")
-ramp_response = supabase.table('ramp_transactions').select('*').limit(1000).execute()
-ramp_txns = ramp_response.data if ramp_response.data else []
+print("   Processing Ramp transactions...")
+ramp_txns = fetched['ramp_transactions']
+ramp_txns[RESULT_COLUMNS] = smart_categorize_batch(
+    'ramp_transactions', ramp_txns['id'], ramp_txns['payee'], ramp_txns['memo'], ramp_txns['txn_class']
+)
 print(f"   ✅ {len(ramp_txns)} Ramp transactions")
 
-for txn in ramp_txns:
-    charge = txn.get('charge_usd') or 0
-    payment = txn.get('payment_usd') or 0
-    amt = abs(float(charge)) if charge else abs(float(payment)) if payment else 0
-    
-    if amt > 0:
-        category, subcategory = smart_categorize(
-            txn.get('payee', ''),
-            txn.get('memo', ''),
-            txn.get('class', '')
-        )
-        
-        all_expenses.append({
-            'Source': 'Ramp',
-            'Date': txn.get('transaction_date'),
-            'Vendor': txn.get('payee', 'Unknown'),
-            'Amount': amt,
-            'Category': category,
-            'Subcategory': subcategory,
-            'Balance': 0,
-            'Due_Date': None,
-            'ID': txn.get('id')
-        })
+# The charge, or the payment when there is no charge
+ramp_amount = ramp_txns['charge_usd'].where(ramp_txns['charge_usd'] != 0, ramp_txns['payment_usd']).abs()
+spent = ramp_txns[ramp_amount > 0]
+frames.append(source_frame('Ramp', spent['id'], spent['transaction_date'], spent['payee'],
+                           ramp_amount[ramp_amount > 0], spent[RESULT_COLUMNS], memo=spent['memo']))
+
+if args.profile_rules:
+    # The search texts the categorizer just matched, with each row's dollars
+    profiled = pd.concat([
+        pd.DataFrame({'text': SEARCH_TEXTS['quickbooks_bills'], 'amount': bills['total_amount']}),
+        pd.DataFrame({'text': SEARCH_TEXTS['quickbooks_expenses'], 'amount': expenses['total_amount']}),
+        pd.DataFrame({'text': SEARCH_TEXTS['bank_statements'], 'amount': bank_txns['amount']})[bank_txns['amount'] < 0],
+        pd.DataFrame({'text': SEARCH_TEXTS['ramp_transactions'], 'amount': ramp_amount}),
+    ], ignore_index=True)
+    rule_profile = profile_rules(RULE_MATCHER, profiled['text'], profiled['amount'])
+    print_rule_profile(rule_profile)
+    rule_profile.to_excel(PROFILE_FILE, index=False)
+    print(f"   ✅ Rule profile saved: {PROFILE_FILE}")
 
 # =============================================================================
 # ANALYZE
 # =============================================================================
-print(f"\n2️⃣ Analyzing {len(all_expenses)} transactions...")
+df = transaction_frame(frames)
+print(f"\n2️⃣ Analyzing {len(df)} transactions...")
+
+if df.empty:
+    print("   ⚠️  No transactions found (check --since/--until)")
+    exit(0)
 
-df = pd.DataFrame(all_expenses)
-df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
 df = df.sort_values('Date', ascending=False)
 
 # Filter out zero amounts
-df = df[df['Amount'] > 0]
+df = df[df['Amount_Cents'] > 0].copy()
+# Dollars for the classifier and the sheets; totals are summed in cents
+df['Amount'] = dollars(df['Amount_Cents'])
+df['Balance'] = dollars(df['Balance_Cents'])
 
 print(f"\n   ✅ {len(df)} transactions with amounts > 0")
+print_frame_summary(df)
+
+# One canonical vendor per payee, however many raw bank/Ramp strings it appears under
+vendor_index = VendorIndex()
+df['Vendor_ID'], df['Canonical_Vendor'] = vendor_index.resolve(df['Vendor'])
+vendor_index.save()
+print_vendor_summary(df['Vendor'], df['Vendor_ID'])
+
+# One record per cash event: a bill's bank wire or Ramp payment is not a second expense
+duplicates = None
+if not args.keep_duplicates:
+    df, duplicates = dedupe_sources(df, args.dedup_days)
+    # Paid bills now carry their payment's date
+    df = df.sort_values('Date', ascending=False)
+    print_dedup_summary(duplicates, df)
+
+# Rule misses: fall back to a classifier trained on the bookkeeper's overrides
+fill_started = time.perf_counter()
+# Overrides are filed under coarse labels ('Opex'); train on the rule categories they map to
+relabelled, trained_on = fill_uncategorized(df, label_map=RULESET.override_label)
+source = f"trained on {trained_on} overrides" if trained_on else "saved model"
+print(f"   🤖 Override classifier ({source}): {relabelled} rule misses categorized "
+      f"in {time.perf_counter() - fill_started:.2f}s")
 
 # Summary stats
 print("\n   💰 BY CATEGORY:")
-cat_summary = df.groupby('Category')['Amount'].agg(['count', 'sum']).sort_values('sum', ascending=False)
+cat_summary = df.groupby('Category', observed=True)['Amount_Cents'].agg(['count', 'sum']).sort_values('sum', ascending=False)
+cat_summary['sum'] = dollars(cat_summary['sum'])
 for idx, row in cat_summary.iterrows():
     print(f"      {idx:40} {int(row['count']):4} txns  ${row['sum']:>14,.2f}")
 
-print(f"\n   📊 TOTAL SPEND: ${df['Amount'].sum():,.2f}")
+print(f"\n   📊 TOTAL SPEND: ${dollars(df['Amount_Cents'].sum()):,.2f}")
 
 # Categorization success rate
 uncategorized = len(df[df['Category'] == 'Uncategorized'])
 categorized = len(df) - uncategorized
 success_rate = (categorized / len(df)) * 100 if len(df) > 0 else 0
 print(f"\n   ✅ Categorization: {categorized}/{len(df)} ({success_rate:.1f}%)")
-print(f"   ⚠️  Still Uncategorized: {uncategorized} transactions (${df[df['Category'] == 'Uncategorized']['Amount'].sum():,.2f})")
+print(f"   ⚠️  Still Uncategorized: {uncategorized} transactions (${dollars(df[df['Category'] == 'Uncategorized']['Amount_Cents'].sum()):,.2f})")
 
 # Top vendors still uncategorized
 if uncategorized > 0:
     print("\n   🔍 TOP 10 UNCATEGORIZED VENDORS (need manual review):")
-    uncat = df[df['Category'] == 'Uncategorized'].groupby('Vendor')['Amount'].sum().sort_values(ascending=False).head(10)
+    uncat = df[df['Category'] == 'Uncategorized'].groupby('Canonical_Vendor')['Amount'].sum().sort_values(ascending=False).head(10)
     for vendor, amt in uncat.items():
         print(f"      {vendor[:60]:60} ${amt:>12,.2f}")
 
@@ -299,7 +338,10 @@ output_file = "BDI_Cash_Forecast_Categorized_v2.xlsx"
 
 with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
     # Sheet 1: All Expenses
-    df_export = df[['Date', 'Source', 'Vendor', 'Category', 'Subcategory', 'Amount', 'Balance', 'Due_Date']].copy()
+    export_columns = ['Date', 'Source', 'Vendor', 'Category', 'Subcategory', 'Amount', 'Balance', 'Due_Date', 'Categorized_By']
+    if 'Linked_IDs' in df:
+        export_columns.append('Linked_IDs')
+    df_export = df[export_columns].copy()
     df_export['Date'] = df_export['Date'].dt.strftime('%Y-%m-%d')
     df_export['Due_Date'] = pd.to_datetime(df_export['Due_Date'], errors='coerce').dt.strftime('%Y-%m-%d')
     df_export.to_excel(writer, sheet_name='All Expenses', index=False)
@@ -310,33 +352,33 @@ with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
     # Sheet 3: Labor Breakdown
     labor_df = df[df['Category'].str.contains('Labor', na=False)].copy()
     if not labor_df.empty:
-        labor_summary = labor_df.groupby(['Category', 'Subcategory', 'Vendor'])['Amount'].sum().reset_index()
+        labor_summary = labor_df.groupby(['Category', 'Subcategory', 'Canonical_Vendor'], observed=True)['Amount'].sum().reset_index()
         labor_summary = labor_summary.sort_values(['Category', 'Amount'], ascending=[True, False])
         labor_summary.to_excel(writer, sheet_name='Labor Breakdown', index=False)
     
     # Sheet 4: OpEx Breakdown
     opex_df = df[df['Category'].str.contains('OpEx', na=False)].copy()
     if not opex_df.empty:
-        opex_summary = opex_df.groupby(['Category', 'Subcategory', 'Vendor'])['Amount'].sum().reset_index()
+        opex_summary = opex_df.groupby(['Category', 'Subcategory', 'Canonical_Vendor'], observed=True)['Amount'].sum().reset_index()
         opex_summary = opex_summary.sort_values(['Category', 'Amount'], ascending=[True, False])
         opex_summary.to_excel(writer, sheet_name='OpEx Breakdown', index=False)
     
     # Sheet 5: NRE Breakdown
     nre_df = df[df['Category'].str.contains('NRE', na=False)].copy()
     if not nre_df.empty:
-        nre_summary = nre_df.groupby(['Subcategory', 'Vendor'])['Amount'].sum().reset_index()
+        nre_summary = nre_df.groupby(['Subcategory', 'Canonical_Vendor'], observed=True)['Amount'].sum().reset_index()
         nre_summary = nre_summary.sort_values('Amount', ascending=False)
         nre_summary.to_excel(writer, sheet_name='NRE Breakdown', index=False)
     
     # Sheet 6: Inventory Breakdown
     inv_df = df[df['Category'].str.contains('Inventory', na=False)].copy()
     if not inv_df.empty:
-        inv_summary = inv_df.groupby(['Subcategory', 'Vendor'])['Amount'].sum().reset_index()
+        inv_summary = inv_df.groupby(['Subcategory', 'Canonical_Vendor'], observed=True)['Amount'].sum().reset_index()
         inv_summary = inv_summary.sort_values('Amount', ascending=False)
         inv_summary.to_excel(writer, sheet_name='Inventory Breakdown', index=False)
     
     # Sheet 7: Uncategorized (needs review)
-    uncat_df = df[df['Category'] == 'Uncategorized'][['Date', 'Vendor', 'Amount', 'Source']].copy()
+    uncat_df = df[df['Category'] == 'Uncategorized'][['Date', 'Vendor', 'Canonical_Vendor', 'Amount', 'Source']].copy()
     if not uncat_df.empty:
         uncat_df['Date'] = pd.to_datetime(uncat_df['Date']).dt.strftime('%Y-%m-%d')
         uncat_df = uncat_df.sort_values('Amount', ascending=False)
@@ -350,14 +392,23 @@ with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
         columns='Week',
         values='Amount',
         aggfunc='sum',
-        fill_value=0
+        fill_value=0,
+        observed=True
     )
     weekly_pivot['Total'] = weekly_pivot.sum(axis=1)
     weekly_pivot = weekly_pivot.sort_values('Total', ascending=False)
     weekly_pivot.to_excel(writer, sheet_name='Weekly Spend')
 
+    # Sheet 9: Cross-source duplicates, each against the record it was folded into
+    if duplicates is not None and not duplicates.empty:
+        dup_df = duplicates.copy()
+        dup_df['Date'] = dup_df['Date'].dt.strftime('%Y-%m-%d')
+        dup_df['Kept_Date'] = dup_df['Kept_Date'].dt.strftime('%Y-%m-%d')
+        dup_df.to_excel(writer, sheet_name='Duplicates Removed', index=False)
+    sheet_count = len(writer.sheets)
+
 print(f"   ✅ Excel created: {output_file}")
-print(f"   📊 {len(df)} transactions across 8 sheets")
+print(f"   📊 {len(df)} transactions across {sheet_count} sheets")
 
 print("\n" + "=" * 80)
 print("✅ ITERATION 2 COMPLETE!")
@@ -4,23 +4,102 @@ Build Cash Forecast - ITERATION 3
 Apply user corrections + map to new GL Codes from CoA project
 """
 
+import argparse
+import atexit
 import os
 import pandas as pd
-from supabase import create_client, Client
+from supabase import Client
 from datetime import datetime
+import time
 from dotenv import load_dotenv
 import re
 
+from forecast_aggregates import (fetch_weekly_spend, fetch_weekly_spend_pg, print_summary_only_warning,
+                                 rules_payload)
+from forecast_category_cache import RESULT_COLUMNS, CategoryCache, print_category_cache_summary
+from forecast_classifier import fill_uncategorized
+from forecast_dedup import DATE_WINDOW_DAYS, dedupe_sources, print_dedup_summary
+from forecast_fetch import print_fetch_summary, resolve_window
+from forecast_frame import apply_overrides, dollars, print_frame_summary, set_labels, source_frame, transaction_frame
+from forecast_fixtures import FIXTURE_DIR, RecordingClient, ReplayClient
+from forecast_http import create_pooled_client, print_transport_summary
+from forecast_parallel import PARALLEL_MIN_ROWS
+from forecast_pg import get_dsn
+from forecast_polars import ENGINES, check_parity, engine_summaries
+from forecast_rule_profile import PROFILE_FILE, print_rule_profile, profile_rules
+from forecast_rules import print_cache_summary, search_texts
+from forecast_ruleset import MATCH_TEXT_VERSION, load_ruleset
+from forecast_sources import fetch_forecast_sources, source_fetcher
+from forecast_vendors import VendorIndex, print_vendor_summary
+from forecast_views import aggregate_tables, workbook_views
+
+parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+parser.add_argument('--backend', choices=['supabase', 'postgres'],
+                    default=os.getenv('FORECAST_BACKEND', 'supabase'),
+                    help='supabase = PostgREST (+ local snapshots); postgres = COPY over DATABASE_URL')
+parser.add_argument('--full-refresh', action='store_true',
+                    help='discard the local snapshots in .forecast_cache/ and re-download every table')
+parser.add_argument('--no-snapshot', action='store_true',
+                    help='read straight from Supabase, bypassing the local snapshots')
+parser.add_argument('--since', help='first transaction date to pull (YYYY-MM-DD)')
+parser.add_argument('--until', help='last transaction date to pull (YYYY-MM-DD)')
+parser.add_argument('--weeks-back', type=int,
+                    help='pull this many whole weeks before the current week (ignored with --since)')
+parser.add_argument('--weeks-forward', type=int,
+                    help='pull this many whole weeks after the current week (ignored with --until)')
+parser.add_argument('--summary-only', action='store_true',
+                    help='only build the weekly summary sheets from server-side aggregates (no raw fetch)')
+parser.add_argument('--record', nargs='?', const=FIXTURE_DIR, metavar='DIR',
+                    help=f'save every Supabase response as gzip fixtures in DIR (default {FIXTURE_DIR}/)')
+parser.add_argument('--replay', nargs='?', const=FIXTURE_DIR, metavar='DIR',
+                    help='serve Supabase responses from fixtures saved with --record (no credentials needed)')
+parser.add_argument('--recategorize', action='store_true',
+                    help='discard cached categorization results in .forecast_cache/ and match every row again')
+parser.add_argument('--profile-rules', action='store_true',
+                    help='report per-rule hits, dollars, shadowing and dead rules (also saved to BDI_Rule_Profile.xlsx)')
+parser.add_argument('--workers', type=int,
+                    help=f'processes for categorizing large backfills (default: every core, once more than '
+                         f'{PARALLEL_MIN_ROWS:,} rows need matching; 1 = single process)')
+parser.add_argument('--dedup-days', type=int, default=DATE_WINDOW_DAYS,
+                    help=f'days apart a QB/bank/Ramp row can be from its duplicate in another source '
+                         f'(default {DATE_WINDOW_DAYS}; bills also match anywhere up to their due date)')
+parser.add_argument('--keep-duplicates', action='store_true',
+                    help='keep cross-source duplicates in the totals instead of folding them into one record')
+parser.add_argument('--engine', choices=ENGINES, default='pandas',
+                    help='engine for the summary tables (polars needs polars and pyarrow; default pandas)')
+parser.add_argument('--check-engine-parity', action='store_true',
+                    help='build the summary tables with both engines and report any difference')
+args = parser.parse_args()
+
+if args.record or args.replay:
+    if args.backend == 'postgres':
+        parser.error('--record/--replay only apply to the supabase backend')
+    # Snapshot delta pulls depend on local state, so fixtures are always full queries
+    args.no_snapshot = True
+
 load_dotenv('.env.local')
 
 SUPABASE_URL = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+DATABASE_URL = get_dsn()
 
-if not SUPABASE_URL or not SUPABASE_KEY:
+if args.backend == 'postgres':
+    if not DATABASE_URL:
+        print("❌ Missing DATABASE_URL for the postgres backend")
+        exit(1)
+elif not args.replay and (not SUPABASE_URL or not SUPABASE_KEY):
     print("❌ Missing Supabase credentials")
     exit(1)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase: Client = None
+if args.replay:
+    supabase = ReplayClient(args.replay)
+elif args.backend == 'supabase':
+    supabase = create_pooled_client(SUPABASE_URL, SUPABASE_KEY)
+    atexit.register(print_transport_summary, supabase.transport_stats)
+    if args.record:
+        supabase = RecordingClient(supabase, args.record)
+        atexit.register(lambda: print(f"\n💾 Recorded {supabase.save()} responses to {args.record}/"))
 
 print("=" * 80)
 print("💰 CASH FORECAST BUILDER - ITERATION 3 (FINAL)")
@@ -28,329 +107,244 @@ print("   With User Corrections + GL Code Mapping")
 print("=" * 80)
 
 # =============================================================================
-# GL CODE MAPPING (from our CoA project)
-# =============================================================================
-GL_CODE_MAP = {
-    # Labor - Operations (6000s)
-    'Labor - Operations - Support': {'gl_code': '6210', 'gl_name': 'Salaries - Customer Support'},
-    'Labor - Operations - Warehouse': {'gl_code': '6220', 'gl_name': 'Salaries - Warehouse'},
-    'Labor - Operations - Repair': {'gl_code': '6230', 'gl_name': 'Salaries - Repair Center'},
-    
-    # Labor - G&A (6100s)
-    'Labor - G&A - Finance': {'gl_code': '6110', 'gl_name': 'Salaries - Accounting/Finance'},
-    'Labor - G&A - Executive': {'gl_code': '6100', 'gl_name': 'Salaries - Executive'},
-    'Labor - G&A - Sales': {'gl_code': '6120', 'gl_name': 'Salaries - Sales'},
-    'Labor - G&A - Payroll': {'gl_code': '6150', 'gl_name': 'Payroll Taxes & Benefits'},
-    
-    # Labor - R&D (9000s - from our NRE restructuring)
-    'Labor - R&D - Engineering': {'gl_code': '9100', 'gl_name': 'R&D - Firmware Development'},
-    'Labor - R&D - Product': {'gl_code': '9200', 'gl_name': 'R&D - Product Management'},
-    
-    # Labor - Marketing (6400s)
-    'Labor - Marketing - Ops': {'gl_code': '6410', 'gl_name': 'Marketing Salaries'},
-    
-    # NRE/R&D (9000s)
-    'NRE - Certification': {'gl_code': '9300', 'gl_name': 'R&D - Certification & Testing'},
-    'NRE - Testing': {'gl_code': '9310', 'gl_name': 'R&D - Lab & Testing Equipment'},
-    'NRE - Prototyping': {'gl_code': '9320', 'gl_name': 'R&D - Prototyping'},
-    
-    # Inventory/COGS (5000s)
-    'Inventory - Finished Goods': {'gl_code': '5010', 'gl_name': 'COGS - Finished Goods'},
-    'Inventory - Components': {'gl_code': '5020', 'gl_name': 'COGS - Components'},
-    'Inventory - Freight': {'gl_code': '5030', 'gl_name': 'COGS - Freight & Shipping'},
-    'Inventory - Import Costs': {'gl_code': '5040', 'gl_name': 'COGS - Import/Customs'},
-    'Inventory - Prepaid': {'gl_code': '1250', 'gl_name': 'Prepaid Inventory'},
-    
-    # OpEx - IT/Software (6500s - DevOps from our restructuring)
-    'OpEx - IT/Software - AWS': {'gl_code': '6510', 'gl_name': 'DevOps - Cloud Services (AWS)'},
-    'OpEx - IT/Software - Other': {'gl_code': '6520', 'gl_name': 'DevOps - Software Subscriptions'},
-    
-    # OpEx - Other (6300s)
-    'OpEx - Rent/Facilities': {'gl_code': '6310', 'gl_name': 'Rent & Facilities'},
-    'OpEx - Insurance': {'gl_code': '6320', 'gl_name': 'Insurance'},
-    'OpEx - Professional Services': {'gl_code': '6340', 'gl_name': 'Professional Fees - Legal/Accounting'},
-    'OpEx - Banking': {'gl_code': '6350', 'gl_name': 'Bank Fees & Wire Charges'},
-    
-    # Operations - Repair Center
-    'Operations - Repair Center': {'gl_code': '6240', 'gl_name': 'Repair Center Operations'},
-    
-    # Marketing (6400s)
-    'Marketing - Digital': {'gl_code': '6420', 'gl_name': 'Marketing - Digital Advertising'},
-}
-
-# =============================================================================
-# ENHANCED CATEGORIZATION RULES (with user corrections)
+# RULES + GL CODE MAPPING (forecast_ruleset.json, shared by every builder)
 # =============================================================================
-VENDOR_RULES = {
-    # PAYROLL
-    '334843 boundless': ('Labor - G&A - Payroll', 'Payroll Processing'),
-    'boundless1364227403': ('Labor - G&A - Payroll', 'Payroll Processing'),
-    'paylocity': ('Labor - G&A - Payroll', 'Payroll Taxes'),
-    
-    # LABOR - G&A
-    'karen e drennan': ('Labor - G&A - Finance', 'Contract Controller'),
-    'karen drennan': ('Labor - G&A - Finance', 'Contract Controller'),
-    'controller': ('Labor - G&A - Finance', 'Controller'),
-    'steven cistulli': ('Labor - G&A - Executive', 'Owner Expenses'),
-    
-    # LABOR - Operations
-    'deel': ('Labor - Operations - Support', 'Customer Care Contract Labor'),
-    'customer care': ('Labor - Operations - Support', 'Customer Support'),
-    'complete catv': ('Operations - Repair Center', 'Repair Center Services'),
-    
-    # LABOR - R&D
-    'gryphon': ('Labor - R&D - Engineering', 'Engineering Services'),
-    'firmware': ('Labor - R&D - Engineering', 'Firmware Development'),
-    
-    # NRE/Certification
-    'cable television laboratories': ('NRE - Certification', 'Certification Testing'),
-    'cable lab': ('NRE - Certification', 'Certification Testing'),
-    'cablelabs': ('NRE - Certification', 'Certification Testing'),
-    'cable television9186939000': ('NRE - Certification', 'Certification Testing'),
-    
-    # INVENTORY
-    'mtn high-technology': ('Inventory - Finished Goods', 'MTN - Finished Goods'),
-    'mtn': ('Inventory - Finished Goods', 'MTN - Finished Goods'),
-    'askey': ('Inventory - Finished Goods', 'Askey - Finished Goods'),
-    'compal': ('Inventory - Finished Goods', 'Compal - Finished Goods'),
-    'atel': ('Inventory - Prepaid', 'ATEL - Prepaid Inventory'),
-    'ol usa': ('Inventory - Import Costs', 'Import/Customs Costs'),
-    't&w': ('Inventory - Components', 'Components'),
-    'flexport': ('Inventory - Freight', 'Freight Services'),
-    
-    # OPEX
-    'baker & hostetler': ('OpEx - Professional Services', 'Legal Services'),
-    'baker hostetler': ('OpEx - Professional Services', 'Legal Services'),
-    'amazon web servi': ('OpEx - IT/Software - AWS', 'AWS Cloud Services'),
-    'aws': ('OpEx - IT/Software - AWS', 'AWS Cloud Services'),
-    'google': ('OpEx - IT/Software - Other', 'Google Workspace'),
-    'microsoft': ('OpEx - IT/Software - Other', 'Microsoft'),
-    'insurance': ('OpEx - Insurance', 'Insurance'),
-    'wire': ('OpEx - Banking', 'Wire Fees'),
-    'bank fee': ('OpEx - Banking', 'Bank Fees'),
-    
-    # MARKETING
-    'facebook': ('Marketing - Digital', 'Facebook Ads'),
-    'google ads': ('Marketing - Digital', 'Google Ads'),
-    
-    # INTERNAL
-    'tide rock': ('Internal Transfer', 'Tide Rock Transfer'),
-    'corporate xfer': ('Internal Transfer', 'Internal Transfer'),
-}
+# Compiled once and cached in .forecast_cache/ until the file changes; one pass
+# over the lowercased search text per transaction whatever the number of rules
+RULESET = load_ruleset()
+VENDOR_RULES, FALLBACK_RULES, GL_CODE_MAP = RULESET.vendor_rules, RULESET.fallback_rules, RULESET.gl_codes
+RULE_MATCHER = RULESET.matcher
+atexit.register(print_cache_summary, RULE_MATCHER)
+print(f"📚 Ruleset v{RULESET.version}: {len(RULESET)} rules, {len(GL_CODE_MAP)} GL codes")
 
 def smart_categorize(vendor, description, memo=''):
     """Enhanced categorization with user corrections"""
     search_text = f"{vendor} {description} {memo}".lower()
     
-    # Check each rule
-    for keyword, (category, subcategory) in VENDOR_RULES.items():
-        if keyword in search_text:
-            return (category, subcategory)
-    
-    # Wire/ACH patterns
-    if 'wire/out' in search_text or 'ach' in search_text:
-        return ('OpEx - Banking', 'Wire/ACH Transfer')
-    
-    return ('Uncategorized', '')
+    # First matching rule wins: VENDOR_RULES in order, then FALLBACK_RULES
+    return RULE_MATCHER.match(search_text, ('Uncategorized', ''))
+
+# Each source's search texts from its last smart_categorize_batch call
+SEARCH_TEXTS = {}
+
+def smart_categorize_batch(source, ids, vendor, description, memo=''):
+    """
+    smart_categorize over whole columns, through the persistent result cache
+    Returns RESULT_COLUMNS aligned to the input; only rows that are new, edited or
+    touched by a rule change since the last run are matched
+    """
+    search_text = search_texts(vendor, description, memo)
+    SEARCH_TEXTS[source] = search_text  # kept for --profile-rules
+    return CATEGORY_CACHE.categorize(source, ids, search_text, shard_keys=vendor)
 
 def get_gl_code(category, subcategory=''):
     """Get GL code based on category"""
-    key = f"{category}"
-    if key in GL_CODE_MAP:
-        return GL_CODE_MAP[key]['gl_code'], GL_CODE_MAP[key]['gl_name']
-    
-    # Try with subcategory
-    if subcategory and 'AWS' in subcategory:
-        return '6510', 'DevOps - Cloud Services (AWS)'
-    
-    return '', ''
+    return RULESET.gl_code(category, subcategory)
+
+# =============================================================================
+# SUMMARY-ONLY MODE (server-side weekly aggregates, no raw transactions)
+# =============================================================================
+if args.summary_only:
+    print("\n1️⃣ Pulling weekly aggregates from BOSS...")
+    print_summary_only_warning()
+    since, until = resolve_window(args.since, args.until, args.weeks_back, args.weeks_forward)
+    rules = rules_payload(RULE_MATCHER)
+    if args.backend == 'postgres':
+        weekly = fetch_weekly_spend_pg(DATABASE_URL, rules, since, until)
+    else:
+        weekly = fetch_weekly_spend(supabase, rules, since, until)
+    print(f"   ✅ {len(weekly)} week × category rows ({int(weekly['txn_count'].sum())} transactions)")
+
+    if weekly.empty:
+        print("   ⚠️  No transactions found (check --since/--until)")
+        exit(0)
+
+    weekly = weekly.rename(columns={'week_start': 'Week', 'category': 'Category', 'amount': 'Amount'})
+    gl = {key: get_gl_code(*key) for key in set(zip(weekly['Category'], weekly['subcategory']))}
+    weekly['GL_Code'] = [gl[key][0] for key in zip(weekly['Category'], weekly['subcategory'])]
+    weekly['GL_Name'] = [gl[key][1] for key in zip(weekly['Category'], weekly['subcategory'])]
+
+    # The full workbook's By Category and Weekly by GL Code sheets, from the aggregate
+    tables = aggregate_tables(weekly)
+    print("\n   💰 BY CATEGORY:")
+    cat_summary = tables['By Category']
+    for idx, row in cat_summary.head(15).iterrows():
+        print(f"      {idx:45} {int(row['count']):4} txns  ${row['sum']:>14,.2f}")
+    print(f"\n   📊 TOTAL SPEND (dated transactions): ${weekly['Amount'].sum():,.2f}")
+
+    output_file = "BDI_Cash_Forecast_Weekly_Summary.xlsx"
+    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        if 'Weekly by GL Code' in tables:
+            tables['Weekly by GL Code'].to_excel(writer, sheet_name='Weekly by GL Code')
+        cat_summary.to_excel(writer, sheet_name='By Category')
+
+    print(f"\n   ✅ Excel created: {output_file}")
+    exit(0)
 
 # =============================================================================
 # PULL DATA
 # =============================================================================
 print("\n1️⃣ Pulling data from BOSS...")
 
-all_expenses = []
+since, until = resolve_window(args.since, args.until, args.weeks_back, args.weeks_forward)
+if since or until:
+    print(f"   📅 Window: {since or 'start'} → {until or 'latest'}")
+
+fetch_started = time.perf_counter()
+client, fetch, fetch_options = source_fetcher(
+    args.backend, supabase, DATABASE_URL, snapshot=not args.no_snapshot, full_refresh=args.full_refresh
+)
+fetched, fetch_stats = fetch_forecast_sources(client, fetch, fetch_options, since, until)
+print_fetch_summary(fetch_stats, time.perf_counter() - fetch_started)
+
+CATEGORY_CACHE = CategoryCache('v4', RULE_MATCHER, gl=get_gl_code, gl_map=GL_CODE_MAP,
+                               normalize_version=MATCH_TEXT_VERSION, reset=args.recategorize,
+                               workers=args.workers)
+atexit.register(print_category_cache_summary, CATEGORY_CACHE)
+
+frames = []
 
 # Get GL Overrides
-print("   Fetching GL overrides...")
-overrides_response = supabase.table('gl_transaction_overrides').select('*').execute()
-overrides = overrides_response.data if overrides_response.data else []
-override_map = {o['transaction_id']: o for o in overrides}
+print("   Processing GL overrides...")
+overrides = fetched['gl_transaction_overrides']
 print(f"   ✅ {len(overrides)} GL overrides")
 
 # QuickBooks Bills
-print("   Fetching QB Bills...")
-bills_response = supabase.table('quickbooks_bills').select('*').execute()
-bills = bills_response.data if bills_response.data else []
+print("   Processing QB Bills...")
+bills = fetched['quickbooks_bills']
+bills[RESULT_COLUMNS] = smart_categorize_batch('quickbooks_bills', bills['id'], bills['vendor_name'], bills['vendor_name'], '')
 print(f"   ✅ {len(bills)} bills")
 
-for bill in bills:
-    override = override_map.get(str(bill['id']))
-    
-    if override:
-        category = f"{override.get('override_category', 'Uncategorized').title()}"
-        subcategory = override.get('override_account_type', '')
-    else:
-        category, subcategory = smart_categorize(
-            bill.get('vendor_name', ''),
-            bill.get('vendor_name', ''),
-            ''
-        )
-    
-    gl_code, gl_name = get_gl_code(category, subcategory)
-    
-    all_expenses.append({
-        'Source': 'QB Bill',
-        'Date': bill.get('bill_date'),
-        'Vendor': bill.get('vendor_name', 'Unknown'),
-        'Amount': abs(float(bill.get('total_amount', 0))),
-        'Category': category,
-        'Subcategory': subcategory,
-        'GL_Code': gl_code,
-        'GL_Name': gl_name,
-        'Balance': float(bill.get('balance', 0)),
-        'Due_Date': bill.get('due_date'),
-        'Status': 'Unpaid' if float(bill.get('balance', 0)) > 0 else 'Paid',
-        'ID': bill.get('id')
-    })
+bill_frame = source_frame('QB Bill', bills['id'], bills['bill_date'], bills['vendor_name'], bills['total_amount'].abs(),
+                          bills[RESULT_COLUMNS], balance=bills['balance'], due_dates=bills['due_date'])
+apply_overrides(bill_frame, overrides, get_gl_code)
+frames.append(bill_frame)
 
 # QuickBooks Expenses
-print("   Fetching QB Expenses...")
-expenses_response = supabase.table('quickbooks_expenses').select('*').execute()
-expenses = expenses_response.data if expenses_response.data else []
+print("   Processing QB Expenses...")
+expenses = fetched['quickbooks_expenses']
+expenses[RESULT_COLUMNS] = smart_categorize_batch(
+    'quickbooks_expenses', expenses['id'], expenses['vendor_name'], expenses['vendor_name'], expenses['memo']
+)
 print(f"   ✅ {len(expenses)} expenses")
 
-for exp in expenses:
-    override = override_map.get(str(exp['id']))
-    
-    if override:
-        category = f"{override.get('override_category', 'Uncategorized').title()}"
-        subcategory = override.get('override_account_type', '')
-    else:
-        category, subcategory = smart_categorize(
-            exp.get('payee', ''),
-            exp.get('payee', ''),
-            exp.get('memo', '')
-        )
-    
-    gl_code, gl_name = get_gl_code(category, subcategory)
-    
-    all_expenses.append({
-        'Source': 'QB Expense',
-        'Date': exp.get('expense_date'),
-        'Vendor': exp.get('payee', 'Unknown'),
-        'Amount': abs(float(exp.get('total_amt', 0))),
-        'Category': category,
-        'Subcategory': subcategory,
-        'GL_Code': gl_code,
-        'GL_Name': gl_name,
-        'Balance': 0,
-        'Due_Date': None,
-        'Status': 'Paid',
-        'ID': exp.get('id')
-    })
+expense_frame = source_frame('QB Expense', expenses['id'], expenses['expense_date'], expenses['vendor_name'],
+                             expenses['total_amount'].abs(), expenses[RESULT_COLUMNS], memo=expenses['memo'])
+apply_overrides(expense_frame, overrides, get_gl_code)
+frames.append(expense_frame)
 
 # Bank Statements
-print("   Fetching Bank transactions...")
-bank_response = supabase.table('bank_statements').select('*').limit(1000).execute()
-bank_txns = bank_response.data if bank_response.data else []
+print("   Processing Bank transactions...")
+bank_txns = fetched['bank_statements']
+bank_txns[RESULT_COLUMNS] = smart_categorize_batch(
+    'bank_statements', bank_txns['id'], bank_txns['description'], bank_txns['description'], ''
+)
 print(f"   ✅ {len(bank_txns)} bank transactions")
 
-for txn in bank_txns:
-    amt = float(txn.get('amount', 0))
-    if amt < 0:  # Expenses only
-        category, subcategory = smart_categorize(
-            txn.get('description', ''),
-            txn.get('description', ''),
-            txn.get('memo', '')
-        )
-        
-        gl_code, gl_name = get_gl_code(category, subcategory)
-        
-        all_expenses.append({
-            'Source': 'Bank',
-            'Date': txn.get('transaction_date'),
-            'Vendor': txn.get('description', 'Unknown'),
-            'Amount': abs(amt),
-            'Category': category,
-            'Subcategory': subcategory,
-            'GL_Code': gl_code,
-            'GL_Name': gl_name,
-            'Balance': 0,
-            'Due_Date': None,
-            'Status': 'Paid',
-            'ID': txn.get('id')
-        })
+debits = bank_txns[bank_txns['amount'] < 0]  # Expenses only
+frames.append(source_frame('Bank', debits['id'], debits['transaction_date'], debits['description'],
+                           debits['amount'].abs(), debits[RESULT_COLUMNS]))
 
 # Ramp Transactions
-print("   Fetching Ramp transactions...")
-ramp_response = supabase.table('ramp_transactions').select('*').limit(1000).execute()
-ramp_txns = ramp_response.data if ramp_response.data else []
+print("   Processing Ramp transactions...")
+ramp_txns = fetched['ramp_transactions']
+ramp_txns[RESULT_COLUMNS] = smart_categorize_batch(
+    'ramp_transactions', ramp_txns['id'], ramp_txns['payee'], ramp_txns['memo'], ramp_txns['txn_class']
+)
 print(f"   ✅ {len(ramp_txns)} Ramp transactions")
 
-for txn in ramp_txns:
-    charge = txn.get('charge_usd') or 0
-    payment = txn.get('payment_usd') or 0
-    amt = abs(float(charge)) if charge else abs(float(payment)) if payment else 0
-    
-    if amt > 0:
-        category, subcategory = smart_categorize(
-            txn.get('payee', ''),
-            txn.get('memo', ''),
-            txn.get('class', '')
-        )
-        
-        gl_code, gl_name = get_gl_code(category, subcategory)
-        
-        all_expenses.append({
-            'Source': 'Ramp',
-            'Date': txn.get('transaction_date'),
-            'Vendor': txn.get('payee', 'Unknown'),
-            'Amount': amt,
-            'Category': category,
-            'Subcategory': subcategory,
-            'GL_Code': gl_code,
-            'GL_Name': gl_name,
-            'Balance': 0,
-            'Due_Date': None,
-            'Status': 'Paid',
-            'ID': txn.get('id')
-        })
+# The charge, or the payment when there is no charge
+ramp_amount = ramp_txns['charge_usd'].where(ramp_txns['charge_usd'] != 0, ramp_txns['payment_usd']).abs()
+spent = ramp_txns[ramp_amount > 0]
+frames.append(source_frame('Ramp', spent['id'], spent['transaction_date'], spent['payee'],
+                           ramp_amount[ramp_amount > 0], spent[RESULT_COLUMNS], memo=spent['memo']))
+
+if args.profile_rules:
+    # The search texts the categorizer just matched, with each row's dollars
+    profiled = pd.concat([
+        pd.DataFrame({'text': SEARCH_TEXTS['quickbooks_bills'], 'amount': bills['total_amount']}),
+        pd.DataFrame({'text': SEARCH_TEXTS['quickbooks_expenses'], 'amount': expenses['total_amount']}),
+        pd.DataFrame({'text': SEARCH_TEXTS['bank_statements'], 'amount': bank_txns['amount']})[bank_txns['amount'] < 0],
+        pd.DataFrame({'text': SEARCH_TEXTS['ramp_transactions'], 'amount': ramp_amount}),
+    ], ignore_index=True)
+    rule_profile = profile_rules(RULE_MATCHER, profiled['text'], profiled['amount'])
+    print_rule_profile(rule_profile)
+    rule_profile.to_excel(PROFILE_FILE, index=False)
+    print(f"   ✅ Rule profile saved: {PROFILE_FILE}")
 
 # =============================================================================
 # ANALYZE
 # =============================================================================
-print(f"\n2️⃣ Analyzing {len(all_expenses)} transactions...")
+df = transaction_frame(frames)
+print(f"\n2️⃣ Analyzing {len(df)} transactions...")
+
+if df.empty:
+    print("   ⚠️  No transactions found (check --since/--until)")
+    exit(0)
 
-df = pd.DataFrame(all_expenses)
-df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
 df = df.sort_values('Date', ascending=False)
 
 # Filter out zero amounts
-df = df[df['Amount'] > 0]
+df = df[df['Amount_Cents'] > 0].copy()
+# Dollars for the classifier, neighbours and the sheets; totals are summed in cents
+df['Amount'] = dollars(df['Amount_Cents'])
+df['Balance'] = dollars(df['Balance_Cents'])
 
 print(f"\n   ✅ {len(df)} transactions with amounts > 0")
+print_frame_summary(df)
+
+# One canonical vendor per payee, however many raw bank/Ramp strings it appears under
+vendor_index = VendorIndex()
+df['Vendor_ID'], df['Canonical_Vendor'] = vendor_index.resolve(df['Vendor'])
+vendor_index.save()
+print_vendor_summary(df['Vendor'], df['Vendor_ID'])
+
+# One record per cash event: a bill's bank wire or Ramp payment is not a second expense
+duplicates = None
+if not args.keep_duplicates:
+    df, duplicates = dedupe_sources(df, args.dedup_days)
+    # Paid bills now carry their payment's date
+    df = df.sort_values('Date', ascending=False)
+    print_dedup_summary(duplicates, df)
+
+# Rule misses: fall back to a classifier trained on the bookkeeper's overrides
+fill_started = time.perf_counter()
+# Overrides are filed under coarse labels ('Opex'); train on the rule categories they map to
+relabelled, trained_on = fill_uncategorized(df, label_map=RULESET.override_label)
+source = f"trained on {trained_on} overrides" if trained_on else "saved model"
+print(f"   🤖 Override classifier ({source}): {relabelled} rule misses categorized "
+      f"in {time.perf_counter() - fill_started:.2f}s")
+modelled = df['Categorized_By'] == 'model'
+if modelled.any():
+    gl = [get_gl_code(category, subcategory) for category, subcategory in zip(df.loc[modelled, 'Category'], df.loc[modelled, 'Subcategory'])]
+    set_labels(df, modelled, 'GL_Code', [code for code, _ in gl])
+    set_labels(df, modelled, 'GL_Name', [name for _, name in gl])
 
 # Summary stats
 print("\n   💰 BY CATEGORY:")
-cat_summary = df.groupby('Category')['Amount'].agg(['count', 'sum']).sort_values('sum', ascending=False)
+summaries_started = time.perf_counter()
+summaries = engine_summaries(df, args.engine)
+summaries_seconds = time.perf_counter() - summaries_started
+cat_summary = summaries['By Category']
 for idx, row in cat_summary.head(15).iterrows():
     print(f"      {idx:45} {int(row['count']):4} txns  ${row['sum']:>14,.2f}")
 
-print(f"\n   📊 TOTAL SPEND: ${df['Amount'].sum():,.2f}")
+print(f"\n   📊 TOTAL SPEND: ${dollars(df['Amount_Cents'].sum()):,.2f}")
 
 # Categorization success rate
 uncategorized = len(df[df['Category'] == 'Uncategorized'])
 categorized = len(df) - uncategorized
 success_rate = (categorized / len(df)) * 100 if len(df) > 0 else 0
 print(f"\n   ✅ Categorization: {categorized}/{len(df)} ({success_rate:.1f}%)")
-print(f"   ⚠️  Still Uncategorized: {uncategorized} transactions (${df[df['Category'] == 'Uncategorized']['Amount'].sum():,.2f})")
+print(f"   ⚠️  Still Uncategorized: {uncategorized} transactions (${dollars(df[df['Category'] == 'Uncategorized']['Amount_Cents'].sum()):,.2f})")
 
 # GL Code coverage
 with_gl_code = len(df[df['GL_Code'] != ''])
 gl_coverage = (with_gl_code / len(df)) * 100 if len(df) > 0 else 0
 print(f"   📋 GL Code Mapped: {with_gl_code}/{len(df)} ({gl_coverage:.1f}%)")
+print(f"   🧮 Summary tables ({args.engine} engine) built in {summaries_seconds:.2f}s")
+if args.check_engine_parity:
+    check_parity(df)
 
 # =============================================================================
 # EXPORT FOR BOOKKEEPER
@@ -359,82 +353,13 @@ print("\n3️⃣ Creating Bookkeeper-Ready Excel...")
 
 output_file = "BDI_Cash_Forecast_FINAL_for_Bookkeeper.xlsx"
 
+views_started = time.perf_counter()
+views = workbook_views(df, summaries, duplicates)
+print(f"   🧮 {len(views)} sheets built in {time.perf_counter() - views_started:.2f}s")
+
 with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-    # Sheet 1: All Expenses (Master List)
-    df_export = df[['Date', 'Source', 'Vendor', 'Category', 'Subcategory', 'GL_Code', 'GL_Name', 'Amount', 'Status', 'Balance', 'Due_Date']].copy()
-    df_export['Date'] = df_export['Date'].dt.strftime('%Y-%m-%d')
-    df_export['Due_Date'] = pd.to_datetime(df_export['Due_Date'], errors='coerce').dt.strftime('%Y-%m-%d')
-    df_export = df_export.sort_values('Date', ascending=False)
-    df_export.to_excel(writer, sheet_name='All Expenses', index=False)
-    
-    # Sheet 2: LABOR DETAILED (for payroll breakdown)
-    labor_df = df[df['Category'].str.contains('Labor', na=False)].copy()
-    if not labor_df.empty:
-        labor_detail = labor_df[['Date', 'Vendor', 'Category', 'Subcategory', 'GL_Code', 'Amount', 'Status']].copy()
-        labor_detail['Date'] = pd.to_datetime(labor_detail['Date']).dt.strftime('%Y-%m-%d')
-        labor_detail['Week'] = pd.to_datetime(labor_detail['Date']).dt.to_period('W').astype(str)
-        labor_detail = labor_detail.sort_values(['Category', 'Date'], ascending=[True, False])
-        labor_detail.to_excel(writer, sheet_name='Labor Detail', index=False)
-        
-        # Labor Summary by Category
-        labor_summary = labor_df.groupby(['Category', 'Subcategory', 'GL_Code', 'Vendor'])['Amount'].sum().reset_index()
-        labor_summary = labor_summary.sort_values(['Category', 'Amount'], ascending=[True, False])
-        labor_summary.to_excel(writer, sheet_name='Labor Summary', index=False)
-    
-    # Sheet 3: OPEX DETAILED
-    opex_df = df[df['Category'].str.contains('OpEx', na=False)].copy()
-    if not opex_df.empty:
-        opex_detail = opex_df[['Date', 'Vendor', 'Subcategory', 'GL_Code', 'Amount']].copy()
-        opex_detail['Date'] = pd.to_datetime(opex_detail['Date']).dt.strftime('%Y-%m-%d')
-        opex_detail = opex_detail.sort_values('Date', ascending=False)
-        opex_detail.to_excel(writer, sheet_name='OpEx Detail', index=False)
-    
-    # Sheet 4: INVENTORY/COGS
-    inv_df = df[df['Category'].str.contains('Inventory', na=False)].copy()
-    if not inv_df.empty:
-        inv_detail = inv_df[['Date', 'Vendor', 'Subcategory', 'GL_Code', 'Amount', 'Status', 'Balance', 'Due_Date']].copy()
-        inv_detail['Date'] = pd.to_datetime(inv_detail['Date']).dt.strftime('%Y-%m-%d')
-        inv_detail['Due_Date'] = pd.to_datetime(inv_detail['Due_Date'], errors='coerce').dt.strftime('%Y-%m-%d')
-        inv_detail = inv_detail.sort_values('Date', ascending=False)
-        inv_detail.to_excel(writer, sheet_name='Inventory_COGS', index=False)
-    
-    # Sheet 5: NRE/R&D
-    nre_df = df[df['Category'].str.contains('NRE|R&D', na=False)].copy()
-    if not nre_df.empty:
-        nre_detail = nre_df[['Date', 'Vendor', 'Subcategory', 'GL_Code', 'Amount']].copy()
-        nre_detail['Date'] = pd.to_datetime(nre_detail['Date']).dt.strftime('%Y-%m-%d')
-        nre_detail = nre_detail.sort_values('Date', ascending=False)
-        nre_detail.to_excel(writer, sheet_name='NRE_RD', index=False)
-    
-    # Sheet 6: Operations (Repair Center)
-    ops_df = df[df['Category'].str.contains('Operations', na=False)].copy()
-    if not ops_df.empty:
-        ops_detail = ops_df[['Date', 'Vendor', 'Subcategory', 'GL_Code', 'Amount']].copy()
-        ops_detail['Date'] = pd.to_datetime(ops_detail['Date']).dt.strftime('%Y-%m-%d')
-        ops_detail = ops_detail.sort_values('Date', ascending=False)
-        ops_detail.to_excel(writer, sheet_name='Operations', index=False)
-    
-    # Sheet 7: Weekly Summary by GL Code
-    df_weekly = df[df['GL_Code'] != ''].copy()
-    if not df_weekly.empty:
-        df_weekly['Week'] = df_weekly['Date'].dt.to_period('W').dt.start_time
-        weekly_pivot = df_weekly.pivot_table(
-            index=['GL_Code', 'GL_Name', 'Category'],
-            columns='Week',
-            values='Amount',
-            aggfunc='sum',
-            fill_value=0
-        )
-        weekly_pivot['Total'] = weekly_pivot.sum(axis=1)
-        weekly_pivot = weekly_pivot.sort_values('Total', ascending=False)
-        weekly_pivot.to_excel(writer, sheet_name='Weekly by GL Code')
-    
-    # Sheet 8: Uncategorized (Needs Review)
-    uncat_df = df[df['Category'] == 'Uncategorized'][['Date', 'Vendor', 'Amount', 'Source']].copy()
-    if not uncat_df.empty:
-        uncat_df['Date'] = pd.to_datetime(uncat_df['Date']).dt.strftime('%Y-%m-%d')
-        uncat_df = uncat_df.sort_values('Amount', ascending=False)
-        uncat_df.to_excel(writer, sheet_name='Needs Review', index=False)
+    for sheet, view, index in views:
+        view.to_excel(writer, sheet_name=sheet, index=index)
 
 print(f"   ✅ Excel created: {output_file}")
 print(f"   📊 {len(df)} transactions organized into professional sheets")
@@ -452,5 +377,6 @@ print("  5. Inventory_COGS - Inventory purchases")
 print("  6. NRE_RD - R&D/Certification expenses")
 print("  7. Operations - Repair center costs")
 print("  8. Weekly by GL Code - Pivot for analysis")
-print("  9. Needs Review - Uncategorized items")
+print("  9. Duplicates Removed - Cross-source rows folded into a kept record")
+print("  10. Needs Review - Uncategorized items with nearest categorized vendors")
 
@@ -0,0 +1,131 @@
+-- =====================================================
+-- Forecast Weekly Spend (server-side aggregation)
+-- =====================================================
+-- Returns spend pre-aggregated to (week_start, source, category, subcategory)
+-- for the cash forecast builders' summary sheets, so they don't have to pull
+-- every raw transaction over PostgREST just to pivot it.
+--
+-- Categorization mirrors smart_categorize() in the Python builders:
+--   * QB bills/expenses with a gl_transaction_overrides row use the override
+--     (initcap(override_category), override_account_type)
+--   * everything else takes the FIRST rule in p_rules whose keyword occurs in
+--     lower(vendor || ' ' || description || ' ' || memo)
+--   * no match -> 'Uncategorized'
+-- p_rules is an ordered JSON array of [keyword, category, subcategory]; the
+-- builders send their RuleMatcher's compiled rules (forecast_aggregates.
+-- rules_payload). Keywords are used exactly as sent - not lowercased, like the
+-- Python matcher - and an empty keyword is ignored rather than matching every row.
+-- The text is searched with a space at each end, as the Python matcher does, so
+-- a keyword with an edge space (' rent') matches a whole word.
+--
+-- Totals are rule categorization alone: the cross-source dedup, vendor
+-- canonicalization and classifier fills of a full builder run are not applied.
+--
+-- Weeks start on Monday (same as pandas to_period('W').start_time).
+-- Rows without a date or with a zero amount are skipped, as in the builders.
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION forecast_weekly_spend(
+  p_rules JSONB,
+  p_since DATE DEFAULT NULL,
+  p_until DATE DEFAULT NULL
+)
+RETURNS TABLE (
+  week_start DATE,
+  source TEXT,
+  category TEXT,
+  subcategory TEXT,
+  amount NUMERIC,
+  txn_count BIGINT
+) AS $$
+  WITH rules AS (
+    SELECT
+      r.ord,
+      r.rule->>0 AS keyword,
+      r.rule->>1 AS category,
+      COALESCE(r.rule->>2, '') AS subcategory
+    FROM jsonb_array_elements(p_rules) WITH ORDINALITY AS r(rule, ord)
+    WHERE COALESCE(r.rule->>0, '') <> ''
+  ),
+  spend AS (
+    SELECT 'QB Bill' AS source, b.id::TEXT AS id, b.bill_date AS txn_date,
+           ABS(b.total_amount) AS amount,
+           lower(COALESCE(b.vendor_name, '') || ' ' || COALESCE(b.vendor_name, '') || ' ') AS search_text
+    FROM quickbooks_bills b
+    WHERE (p_since IS NULL OR b.bill_date >= p_since)
+      AND (p_until IS NULL OR b.bill_date <= p_until)
+
+    UNION ALL
+    SELECT 'QB Expense', e.id::TEXT, e.expense_date,
+           ABS(e.total_amount),
+           lower(COALESCE(e.vendor_name, '') || ' ' || COALESCE(e.vendor_name, '') || ' ' || COALESCE(e.memo, ''))
+    FROM quickbooks_expenses e
+    WHERE (p_since IS NULL OR e.expense_date >= p_since)
+      AND (p_until IS NULL OR e.expense_date <= p_until)
+
+    UNION ALL
+    SELECT 'Bank', s.id::TEXT, s.transaction_date,
+           ABS(s.amount),
+           lower(COALESCE(s.description, '') || ' ' || COALESCE(s.description, '') || ' ')
+    FROM bank_statements s
+    WHERE s.amount < 0
+      AND (p_since IS NULL OR s.transaction_date >= p_since)
+      AND (p_until IS NULL OR s.transaction_date <= p_until)
+
+    UNION ALL
+    SELECT 'Ramp', t.id::TEXT, t.transaction_date,
+           ABS(COALESCE(NULLIF(t.charge_usd, 0), t.payment_usd, 0)),
+           lower(COALESCE(t.payee, '') || ' ' || COALESCE(t.memo, '') || ' ' || COALESCE(t.class, ''))
+    FROM ramp_transactions t
+    WHERE (p_since IS NULL OR t.transaction_date >= p_since)
+      AND (p_until IS NULL OR t.transaction_date <= p_until)
+  ),
+  categorized AS (
+    SELECT
+      s.txn_date,
+      s.source,
+      s.amount,
+      CASE WHEN o.transaction_id IS NOT NULL
+        THEN initcap(COALESCE(NULLIF(o.override_category, ''), 'Uncategorized'))
+        ELSE COALESCE(m.category, 'Uncategorized')
+      END AS category,
+      CASE WHEN o.transaction_id IS NOT NULL
+        THEN COALESCE(o.override_account_type, '')
+        ELSE COALESCE(m.subcategory, '')
+      END AS subcategory
+    FROM spend s
+    LEFT JOIN LATERAL (
+      SELECT ov.transaction_id, ov.override_category, ov.override_account_type
+      FROM gl_transaction_overrides ov
+      WHERE s.source IN ('QB Bill', 'QB Expense')
+        AND ov.transaction_id = s.id
+      ORDER BY ov.id DESC
+      LIMIT 1
+    ) o ON TRUE
+    LEFT JOIN LATERAL (
+      SELECT r.category, r.subcategory
+      FROM rules r
+      WHERE position(r.keyword IN ' ' || s.search_text || ' ') > 0
+      ORDER BY r.ord
+      LIMIT 1
+    ) m ON TRUE
+    WHERE s.txn_date IS NOT NULL
+      AND s.amount > 0
+  )
+  SELECT
+    date_trunc('week', c.txn_date)::DATE AS week_start,
+    c.source,
+    c.category,
+    c.subcategory,
+    SUM(c.amount) AS amount,
+    COUNT(*) AS txn_count
+  FROM categorized c
+  GROUP BY 1, 2, 3, 4;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION forecast_weekly_spend(JSONB, DATE, DATE) TO service_role;
+
+COMMENT ON FUNCTION forecast_weekly_spend(JSONB, DATE, DATE) IS
+  'Weekly spend by source/category for the cash forecast summary sheets; p_rules = ordered [keyword, category, subcategory] list';
+
+SELECT 'forecast_weekly_spend function created successfully!' as status;
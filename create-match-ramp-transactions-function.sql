@@ -0,0 +1,52 @@
+-- =====================================================
+-- Match Ramp Transactions (guarded write-back)
+-- =====================================================
+-- Marks Ramp charges matched to the QuickBooks rows match_ramp_to_quickbooks.py
+-- paired them with - but only charges that are still unmatched when the write
+-- lands. A charge someone matched by hand (or another run matched) between the
+-- script's read and its write is left exactly as it is, and so is a charge
+-- whose QuickBooks row has since been claimed by another Ramp row.
+--
+-- A plain UPDATE, not an upsert: a charge deleted in the meantime stays deleted.
+-- Under READ COMMITTED the WHERE clause is re-checked against a row another
+-- transaction updated concurrently, so the guard holds without extra locking.
+--
+-- p_matches is a JSON array of {id, matched_qb_transaction_id}; the result is
+-- the number of charges actually marked (the rest were skipped by the guard).
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION match_ramp_transactions(
+  p_matches JSONB,
+  p_matched_at TIMESTAMPTZ DEFAULT NOW()
+)
+RETURNS INTEGER AS $$
+  WITH updated AS (
+    UPDATE ramp_transactions t
+    SET is_matched = TRUE,
+        matched_qb_transaction_id = m.matched_qb_transaction_id,
+        matched_at = p_matched_at,
+        updated_at = p_matched_at
+    FROM jsonb_to_recordset(p_matches) AS m(id UUID, matched_qb_transaction_id TEXT)
+    WHERE t.id = m.id
+      AND t.is_matched IS NOT TRUE
+      AND NOT EXISTS (
+        SELECT 1
+        FROM ramp_transactions c
+        WHERE c.is_matched
+          AND c.matched_qb_transaction_id = m.matched_qb_transaction_id
+      )
+    RETURNING t.id
+  )
+  SELECT COUNT(*)::INTEGER FROM updated;
+$$ LANGUAGE sql VOLATILE;
+
+-- The claimed-QB-row check looks charges up by the row they matched
+CREATE INDEX IF NOT EXISTS idx_ramp_transactions_matched_qb_transaction_id
+  ON ramp_transactions(matched_qb_transaction_id);
+
+GRANT EXECUTE ON FUNCTION match_ramp_transactions(JSONB, TIMESTAMPTZ) TO service_role;
+
+COMMENT ON FUNCTION match_ramp_transactions(JSONB, TIMESTAMPTZ) IS
+  'Marks Ramp charges matched to QuickBooks rows, skipping charges matched (or QB rows claimed) since the read; returns rows marked';
+
+SELECT 'match_ramp_transactions function created successfully!' as status;
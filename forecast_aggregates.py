@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Server-side weekly aggregates for the cash forecast summary sheets
+Calls forecast_weekly_spend() (create-forecast-weekly-spend-function.sql), which
+categorizes and sums spend by (week_start, source, category, subcategory) inside
+Postgres, so summary-only runs never pull raw transactions.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from forecast_fetch import PAGE_SIZE
+
+WEEKLY_SPEND_FUNCTION = 'forecast_weekly_spend'
+WEEKLY_SPEND_COLUMNS = ['week_start', 'source', 'category', 'subcategory', 'amount', 'txn_count']
+
+
+def rules_payload(matcher):
+    """
+    Ordered [keyword, category, subcategory] list of a RuleMatcher's compiled rules
+    The keywords go as the matcher holds them (repeats and empty keys already
+    dropped, never lowercased), so position() in Postgres finds the same first rule
+    """
+    if matcher.normalize is not None:
+        raise ValueError("forecast_weekly_spend() matches raw lowercased text; the matcher normalizes")
+    return [
+        [keyword, category, subcategory]
+        for keyword, (category, subcategory) in zip(matcher.keywords, matcher.values)
+    ]
+
+
+def print_summary_only_warning():
+    """What the server-side totals leave out compared with a full run"""
+    print("   ⚠️  Summary-only totals are rule categorization alone: no cross-source dedup, vendor "
+          "canonicalization or classifier fills - they will not tie out to a full run")
+
+
+def _to_frame(rows):
+    frame = pd.DataFrame(rows, columns=WEEKLY_SPEND_COLUMNS)
+    frame['week_start'] = pd.to_datetime(frame['week_start'])
+    frame['amount'] = pd.to_numeric(frame['amount']).astype(np.float64)
+    frame['txn_count'] = pd.to_numeric(frame['txn_count']).astype(np.int64)
+    frame['subcategory'] = frame['subcategory'].fillna('')
+    return frame
+
+
+def fetch_weekly_spend(client, rules, since=None, until=None, page_size=PAGE_SIZE):
+    """
+    Weekly spend via PostgREST RPC
+    The result can exceed max-rows (weeks x categories x sources), so it is paged
+    by offset over the group key until an empty page comes back
+    """
+    params = {'p_rules': rules, 'p_since': since, 'p_until': until}
+    rows, offset = [], 0
+    while True:
+        page = (
+            client.rpc(WEEKLY_SPEND_FUNCTION, params)
+            .order('week_start').order('source').order('category').order('subcategory')
+            .range(offset, offset + page_size - 1)
+            .execute()
+        ).data or []
+        if not page:
+            break
+        rows.extend(page)
+        offset += len(page)
+    return _to_frame(rows)
+
+
+def fetch_weekly_spend_pg(dsn, rules, since=None, until=None):
+    """Weekly spend over a direct Postgres connection (--backend postgres)"""
+    from forecast_pg import _require_psycopg
+
+    psycopg, _ = _require_psycopg()
+    with psycopg.connect(dsn) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {", ".join(WEEKLY_SPEND_COLUMNS)} '
+                f'FROM {WEEKLY_SPEND_FUNCTION}(%s::jsonb, %s::date, %s::date) '
+                'ORDER BY week_start, source, category, subcategory',
+                (json.dumps(rules), since, until),
+            )
+            rows = cursor.fetchall()
+    return _to_frame(rows)
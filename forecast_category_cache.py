@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Persistent categorization results for the forecast builders
+Every categorized row is stored under (source, transaction id) with a hash of
+its search text and the rule that fired, plus the category, subcategory and GL
+code that rule produced. A rerun only matches rows that are new or whose text
+changed. When the rule table changes, the stored ruleset is diffed against the
+new one and only rows whose text contains an added, removed, re-valued or
+reordered keyword are matched again; a GL map change re-derives GL codes
+without re-matching anything.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+from forecast_fetch import chunked
+from forecast_parallel import match_rules
+from forecast_rules import RuleMatcher
+from forecast_snapshot import SNAPSHOT_DIR
+
+RESULT_COLUMNS = ['category', 'subcategory', 'rule', 'gl_code', 'gl_name']
+
+
+def _digest(value):
+    return hashlib.blake2b(value.encode(), digest_size=8).hexdigest()
+
+
+def ruleset_fingerprint(matcher):
+    """[[keyword, value], ...] in compile order - what a cached result depends on"""
+    return json.loads(json.dumps([[keyword, value] for keyword, value in zip(matcher.keywords, matcher.values)]))
+
+
+def changed_keywords(old, new):
+    """Keywords whose presence in a text could now pick a different winner"""
+    old_values, new_values = dict(map(tuple, old)), dict(map(tuple, new))
+    changed = set(old_values.keys() ^ new_values.keys())
+    changed |= {keyword for keyword in old_values.keys() & new_values.keys()
+                if old_values[keyword] != new_values[keyword]}
+    # Relative order is what decides between two present keywords
+    old_order = [keyword for keyword, _ in old if keyword in new_values]
+    new_order = [keyword for keyword, _ in new if keyword in old_values]
+    changed |= {a for a, b in zip(old_order, new_order) if a != b}
+    changed |= {b for a, b in zip(old_order, new_order) if a != b}
+    return changed
+
+
+class CategoryCache:
+    """
+    Rule categorization results for one builder's rule table, in
+    .forecast_cache/categorized_<name>.sqlite
+    matcher values are (category, subcategory) pairs; gl maps them to (gl_code, gl_name)
+    normalize_version: bump with the matcher's normalize function - stored search
+    texts were normalized by the old one, so every row is matched again
+    workers: processes for large batches of uncached rows (None = every core), see
+    forecast_parallel.match_rules
+    """
+
+    def __init__(self, name, matcher, default=('Uncategorized', ''), gl=None, gl_map=None,
+                 normalize_version='', snapshot_dir=SNAPSHOT_DIR, reset=False, workers=1):
+        self.matcher = matcher
+        self.default = default
+        self.gl = gl
+        self.workers = workers
+        self.path = os.path.join(snapshot_dir, f'categorized_{name}.sqlite')
+        self.stats = {'cached': 0, 'matched': 0, 'rematched': 0, 'processes': 1}
+
+        os.makedirs(snapshot_dir, exist_ok=True)
+        if reset and os.path.exists(self.path):
+            os.remove(self.path)
+
+        self.ruleset = ruleset_fingerprint(matcher)
+        self.ruleset_hash = _digest(json.dumps(self.ruleset))
+        gl_hash = _digest(json.dumps(gl_map, sort_keys=True, default=str))
+
+        conn = self._connect()
+        try:
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS results (source TEXT, id TEXT, content_hash TEXT, search_text TEXT, '
+                'ruleset_hash TEXT, rule TEXT, category TEXT, subcategory TEXT, gl_code TEXT, gl_name TEXT, '
+                'PRIMARY KEY (source, id))'
+            )
+            meta = dict(conn.execute('SELECT key, value FROM meta'))
+            if meta.get('normalize_version', normalize_version) != normalize_version:
+                conn.execute('DELETE FROM results')
+            elif meta.get('ruleset_hash') not in (None, self.ruleset_hash):
+                self._rematch(conn, json.loads(meta['ruleset']))
+            if meta.get('gl_hash') not in (None, gl_hash):
+                self._rederive_gl(conn)
+            conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', [
+                ('ruleset_hash', self.ruleset_hash),
+                ('ruleset', json.dumps(self.ruleset)),
+                ('gl_hash', gl_hash),
+                ('normalize_version', normalize_version),
+            ])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _result(self, rule):
+        """(rule keyword, category, subcategory, gl_code, gl_name) for a winning rule index (None = no match)"""
+        keyword = self.matcher.keywords[rule] if rule is not None else ''
+        category, subcategory = self.matcher.values[rule] if rule is not None else self.default
+        gl_code, gl_name = self.gl(category, subcategory) if self.gl else ('', '')
+        return keyword, category, subcategory, gl_code, gl_name
+
+    def _rematch(self, conn, old_ruleset):
+        """Targeted recategorization: only rows containing a changed keyword"""
+        changed = changed_keywords(old_ruleset, self.ruleset)
+        if not changed:
+            return
+        # Stored texts are already normalized, so the probe matcher needs no normalize
+        probe = RuleMatcher(dict.fromkeys(changed, True), cache_size=0)
+        updates = []
+        for source, row_id, search_text in conn.execute('SELECT source, id, search_text FROM results'):
+            if probe.rule(search_text) is not None:
+                updates.append((*self._result(self.matcher.rule(search_text, normalized=True)),
+                                self.ruleset_hash, source, row_id))
+        conn.executemany(
+            'UPDATE results SET rule = ?, category = ?, subcategory = ?, gl_code = ?, gl_name = ?, '
+            'ruleset_hash = ? WHERE source = ? AND id = ?', updates
+        )
+        conn.execute('UPDATE results SET ruleset_hash = ?', (self.ruleset_hash,))
+        self.stats['rematched'] = len(updates)
+
+    def _rederive_gl(self, conn):
+        pairs = conn.execute('SELECT DISTINCT category, subcategory FROM results').fetchall()
+        gl = {pair: self.gl(*pair) if self.gl else ('', '') for pair in pairs}
+        conn.executemany(
+            'UPDATE results SET gl_code = ?, gl_name = ? WHERE category = ? AND subcategory = ?',
+            [(*gl[pair], *pair) for pair in pairs]
+        )
+
+    def categorize(self, source, ids, texts, shard_keys=None):
+        """
+        RESULT_COLUMNS for a source's rows, aligned to ids
+        texts are the raw search texts; rows cached under the same id, text hash and
+        ruleset hash skip matching
+        shard_keys: row-aligned payees that group rows across worker processes
+        """
+        ids = pd.Series(ids).astype(str)
+        raw = pd.Series(texts, dtype=object).fillna('').astype(str).tolist()
+        hashes = [_digest(text) for text in raw]
+        keys = None if shard_keys is None else pd.Series(shard_keys, dtype=object).tolist()
+
+        cached = {}
+        conn = self._connect()
+        try:
+            query = ('SELECT id, content_hash, ruleset_hash, rule, category, subcategory, gl_code, gl_name '
+                     'FROM results WHERE source = ? AND id IN ({})')
+            for chunk in chunked(list(set(ids))):
+                for row_id, content_hash, ruleset_hash, *result in conn.execute(
+                        query.format(', '.join('?' * len(chunk))), [source, *chunk]):
+                    cached[row_id] = (content_hash, ruleset_hash, tuple(result))
+        finally:
+            conn.close()
+
+        rows, misses = [], []
+        for position, (row_id, content_hash) in enumerate(zip(ids, hashes)):
+            hit = cached.get(row_id)
+            # A row stored under another rule table (e.g. by a run that loaded a different ruleset) is stale
+            if hit is not None and hit[0] == content_hash and hit[1] == self.ruleset_hash:
+                rows.append(hit[2])
+                self.stats['cached'] += 1
+            else:
+                rows.append(None)
+                misses.append(position)
+
+        # No connection is open while matching, so forked workers don't inherit one
+        matched, processes = match_rules(
+            self.matcher, [raw[i] for i in misses],
+            None if keys is None else [keys[i] for i in misses], self.workers
+        )
+        self.stats['processes'] = max(self.stats['processes'], processes)
+        writes = []
+        for position, (search_text, rule) in zip(misses, matched):
+            result = self._result(rule)
+            rows[position] = result
+            writes.append((source, ids.iat[position], hashes[position], search_text, self.ruleset_hash, *result))
+        self.stats['matched'] += len(misses)
+
+        conn = self._connect()
+        try:
+            conn.executemany(f'INSERT OR REPLACE INTO results VALUES ({", ".join("?" * 10)})', writes)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        frame = pd.DataFrame(rows, columns=['rule', 'category', 'subcategory', 'gl_code', 'gl_name'],
+                             index=texts.index if isinstance(texts, pd.Series) else None)
+        return frame[RESULT_COLUMNS]
+
+
+def print_category_cache_summary(cache):
+    """Cached vs matched line for a builder run"""
+    stats = cache.stats
+    line = f"   🗃️  Categorization cache: {stats['cached']:,} rows reused, {stats['matched']:,} matched"
+    if stats['processes'] > 1:
+        line += f" on {stats['processes']} processes"
+    if stats['rematched']:
+        line += f", {stats['rematched']:,} recategorized after a rule change"
+    print(line)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Fallback categorizer trained on the bookkeeper's gl_transaction_overrides
+A multinomial naive Bayes over payee/memo word unigrams and bigrams plus an
+order-of-magnitude amount bucket. It runs after the rule matcher and only
+fills rows the rules left Uncategorized, when its confidence is high enough.
+Override labels are coarse ('Opex', 'Nre'), so they are mapped onto the rule
+table's categories before training (Ruleset.override_label); the model then
+predicts labels the GL map and the workbook families know.
+Training and prediction are a handful of NumPy array ops, so both take well
+under a second at ledger sizes; the model is saved next to the snapshots so a
+narrow --since/--until run with few overrides can reuse the last full training.
+"""
+
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from forecast_frame import set_labels
+from forecast_snapshot import SNAPSHOT_DIR
+from forecast_vendors import normalize_payee
+
+# Renamed when the label space changed: older files predicted raw override labels
+MODEL_FILE = 'override_classifier-ruleset.npz'
+
+# Fewer labelled rows than this and the saved model is used instead
+MIN_TRAINING_ROWS = 20
+# Posterior probability a prediction needs before it replaces 'Uncategorized'
+MIN_CONFIDENCE = 0.8
+# Laplace smoothing
+ALPHA = 1.0
+
+
+def _text_tokens(text):
+    words = normalize_payee(text).split()
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _amount_token(amount):
+    magnitude = int(math.log10(abs(amount))) if amount and not pd.isna(amount) else 0
+    return f"amount:1e{magnitude}"
+
+
+def features(text, amount):
+    """Tokens for one row: words, adjacent word pairs and an amount bucket"""
+    return _text_tokens(text) + [_amount_token(amount)]
+
+
+class OverrideClassifier:
+    """
+    Multinomial naive Bayes over features() tokens
+    labels are (category, subcategory) pairs
+    """
+
+    def __init__(self, vocabulary, labels, log_prior, log_likelihood):
+        self.vocabulary = vocabulary
+        self.labels = labels
+        self.log_prior = log_prior
+        self.log_likelihood = log_likelihood  # (tokens, labels)
+
+    @classmethod
+    def fit(cls, texts, amounts, labels, alpha=ALPHA):
+        label_codes, label_values = pd.factorize(pd.Series(list(labels), dtype=object))
+        vocabulary = {}
+        rows, tokens = [], []
+        for row, (text, amount) in enumerate(zip(texts, amounts)):
+            for token in features(text, amount):
+                tokens.append(vocabulary.setdefault(token, len(vocabulary)))
+                rows.append(row)
+
+        counts = np.zeros((len(vocabulary), len(label_values)))
+        np.add.at(counts, (np.array(tokens, dtype=np.int64), label_codes[rows]), 1)
+        counts += alpha
+        log_likelihood = np.log(counts / counts.sum(axis=0))
+
+        class_counts = np.bincount(label_codes, minlength=len(label_values))
+        log_prior = np.log(class_counts / class_counts.sum())
+        return cls(vocabulary, list(label_values), log_prior, log_likelihood)
+
+    def predict(self, texts, amounts):
+        """
+        (labels, confidences) for every row; a row with no known payee/memo word
+        gets confidence 0, since the prior and amount bucket alone say little
+        Identical (text, amount bucket) rows are scored once
+        """
+        keyed = pd.Series([(text, _amount_token(amount)) for text, amount in zip(texts, amounts)], dtype=object)
+        codes, uniques = pd.factorize(keyed)
+
+        rows, tokens = [], []
+        known = np.zeros(len(uniques), dtype=bool)
+        for row, (text, bucket) in enumerate(uniques):
+            for token in _text_tokens(text):
+                index = self.vocabulary.get(token)
+                if index is not None:
+                    rows.append(row)
+                    tokens.append(index)
+                    known[row] = True
+            index = self.vocabulary.get(bucket)
+            if index is not None:
+                rows.append(row)
+                tokens.append(index)
+
+        scores = np.tile(self.log_prior, (len(uniques), 1))
+        if tokens:
+            rows = np.array(rows, dtype=np.int64)
+            # rows are ascending, so each row's token likelihoods are one contiguous run
+            starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            scores[rows[starts]] += np.add.reduceat(self.log_likelihood[tokens], starts, axis=0)
+
+        best = scores.argmax(axis=1)
+        # Posterior of the winner: softmax over the label scores
+        shifted = np.exp(scores - scores.max(axis=1, keepdims=True))
+        confidence = np.where(known, shifted[np.arange(len(best)), best] / shifted.sum(axis=1), 0.0)
+
+        labels = np.empty(len(best), dtype=object)
+        labels[:] = [self.labels[i] for i in best]
+        return labels[codes], confidence[codes]
+
+    def save(self, snapshot_dir=SNAPSHOT_DIR):
+        os.makedirs(snapshot_dir, exist_ok=True)
+        np.savez_compressed(
+            os.path.join(snapshot_dir, MODEL_FILE),
+            vocabulary=np.array(list(self.vocabulary), dtype=str),
+            categories=np.array([category for category, _ in self.labels], dtype=str),
+            subcategories=np.array([subcategory for _, subcategory in self.labels], dtype=str),
+            log_prior=self.log_prior,
+            log_likelihood=self.log_likelihood,
+        )
+
+    @classmethod
+    def load(cls, snapshot_dir=SNAPSHOT_DIR):
+        """The last saved model, or None"""
+        path = os.path.join(snapshot_dir, MODEL_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as saved:
+            vocabulary = {token: i for i, token in enumerate(saved['vocabulary'].tolist())}
+            labels = list(zip(saved['categories'].tolist(), saved['subcategories'].tolist()))
+            return cls(vocabulary, labels, saved['log_prior'], saved['log_likelihood'])
+
+    def __len__(self):
+        return len(self.labels)
+
+
+def train_or_load(texts, amounts, labels, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Fit on this run's labelled rows and save, or fall back to the saved model
+    when there are fewer than MIN_TRAINING_ROWS of them
+    Returns (model or None, trained)
+    """
+    labels = list(labels)
+    if len(labels) >= MIN_TRAINING_ROWS and len(set(labels)) > 1:
+        model = OverrideClassifier.fit(texts, amounts, labels)
+        model.save(snapshot_dir)
+        return model, True
+    return OverrideClassifier.load(snapshot_dir), False
+
+
+def fill_uncategorized(df, snapshot_dir=SNAPSHOT_DIR, min_confidence=MIN_CONFIDENCE, label_map=None):
+    """
+    In place over a builder frame (Vendor, Memo, Amount, Category, Subcategory,
+    Categorized_By - plain or Categorical columns): train on the override rows, then relabel the rule misses the
+    model is confident about as Categorized_By='model'
+    label_map: (override category, account type) -> (category, subcategory) or None
+    (e.g. Ruleset.override_label); rows it maps to None are left out of training
+    Returns (rows relabelled, labelled rows trained on - 0 if the saved model was used)
+    """
+    text = df['Vendor'].fillna('').astype(str) + ' ' + df['Memo'].fillna('').astype(str)
+    labelled = df.index[(df['Categorized_By'] == 'override') & (df['Category'] != 'Uncategorized')]
+    labels = list(zip(df.loc[labelled, 'Category'], df.loc[labelled, 'Subcategory'].astype(object).fillna('')))
+    if label_map is not None:
+        mapped = {pair: label_map(*pair) for pair in set(labels)}
+        kept = [mapped[pair] is not None for pair in labels]
+        labelled = labelled[kept]
+        labels = [mapped[pair] for pair in labels if mapped[pair] is not None]
+    model, trained = train_or_load(text[labelled], df.loc[labelled, 'Amount'], labels, snapshot_dir)
+
+    misses = (df['Categorized_By'] == 'rule') & (df['Category'] == 'Uncategorized')
+    if model is None or not misses.any():
+        return 0, len(labels) if trained else 0
+
+    predicted, confidence = model.predict(text[misses], df.loc[misses, 'Amount'])
+    confident = confidence >= min_confidence
+    rows = df.index[misses][confident]
+    set_labels(df, rows, 'Category', [category for category, _ in predicted[confident]])
+    set_labels(df, rows, 'Subcategory', [subcategory for _, subcategory in predicted[confident]])
+    set_labels(df, rows, 'Categorized_By', ['model'] * len(rows))
+    df.loc[df.index[misses], 'Model_Confidence'] = confidence
+    return len(rows), len(labels) if trained else 0
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Cross-source duplicates: a QB bill paid by bank wire or through Ramp is one
+cash event, not two
+Only a bill and a payment can be the same event: each bill is paired with at
+most one Bank row and one Ramp row whose amount is within a tolerance and
+whose date falls in the bill's window, which runs from its bill date to its due
+date, since the payment can land anywhere in between. QB expenses are payments
+already, and two rows of one source are never duplicates of each other.
+Payees rarely canonicalize alike across sources ('Gryphon Technologies' vs
+'GRYPHON TECH WIRE/OUT ...'), so vendors don't have to agree: a pair whose
+vendors differ must match to the cent, and when a payment fits several bills
+the same vendor wins, then the closest date, then the closest amount.
+Candidates come from a sorted-window join: payments are sorted once by cents
+and each bill's amount window is located by binary search - no nested loops
+over the table. The bill is kept, for its GL coding, but dated when the cash
+left (its payment's date, the bank's before Ramp's), so the outflow stays in
+the payment week; the payment rows are dropped from the totals and listed
+against it.
+"""
+
+import numpy as np
+import pandas as pd
+
+from forecast_frame import dollars
+
+# The record a duplicate folds into, and the payment sources that can duplicate it, in date preference
+DOCUMENT_SOURCE = 'QB Bill'
+PAYMENT_SOURCES = ['Bank', 'Ramp']
+
+DATE_WINDOW_DAYS = 7
+# Wire fees and FX rounding: the larger of $1 and 0.5% of the amount
+AMOUNT_TOLERANCE_CENTS = 100
+AMOUNT_TOLERANCE_RATE = 0.005
+
+DUPLICATE_COLUMNS = ['Date', 'Source', 'Vendor', 'Canonical_Vendor', 'Amount', 'ID',
+                     'Kept_Source', 'Kept_ID', 'Kept_Date', 'Days_Apart', 'Amount_Difference', 'Same_Vendor']
+
+
+def _window_pairs(keys, tolerance, candidate_keys):
+    """
+    (record, candidate) position pairs whose keys are within tolerance, from one
+    sort of candidate_keys and two binary searches per record
+    """
+    order = np.argsort(candidate_keys, kind='stable')
+    sorted_keys = candidate_keys[order]
+    low = np.searchsorted(sorted_keys, keys - tolerance, side='left')
+    high = np.searchsorted(sorted_keys, keys + tolerance, side='right')
+    counts = high - low
+    records = np.repeat(np.arange(len(keys)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return records, order[np.repeat(low, counts) + offsets]
+
+
+def match_duplicates(df, days=DATE_WINDOW_DAYS):
+    """
+    Position of the bill each payment row duplicates (-1 = none), with the days
+    and cents between them and whether their vendors agree
+    df: the analyzed transaction table (Source, Date, Due_Date, Amount_Cents,
+    Balance_Cents, Vendor_ID)
+    """
+    count = len(df)
+    kept_by = np.full(count, -1, dtype=np.int64)
+    days_apart = np.zeros(count, dtype=np.int64)
+    cents_apart = np.zeros(count, dtype=np.int64)
+    same_vendor = np.zeros(count, dtype=bool)
+
+    vendors = pd.factorize(df['Vendor_ID'])[0]
+    cents = df['Amount_Cents'].to_numpy(dtype=np.int64)
+    tolerance = np.maximum(AMOUNT_TOLERANCE_CENTS, np.rint(cents * AMOUNT_TOLERANCE_RATE).astype(np.int64))
+
+    dates = df['Date'].to_numpy(dtype='datetime64[D]')
+    start = dates.astype(np.int64)
+    due = df['Due_Date'].to_numpy(dtype='datetime64[D]')
+    end = np.where(np.isnat(due) | (due < dates), dates, due).astype(np.int64)
+
+    sources = df['Source'].astype(object).to_numpy()
+    dated = ~np.isnat(dates)
+    # A bill still open for its full amount has not been paid, so no cash row can be its payment
+    paid = df['Balance_Cents'].to_numpy(dtype=np.int64) < cents
+    bills = np.flatnonzero(dated & paid & (sources == DOCUMENT_SOURCE))
+
+    for payment_source in PAYMENT_SOURCES:
+        payments = np.flatnonzero(dated & (sources == payment_source))
+        if not len(bills) or not len(payments):
+            continue
+        pair_bills, pair_payments = _window_pairs(cents[bills], tolerance[bills], cents[payments])
+        bill, payment = bills[pair_bills], payments[pair_payments]
+        # Days from the payment to the bill's [bill date, due date] window
+        gap = np.maximum(0, np.maximum(start[payment] - end[bill], start[bill] - start[payment]))
+        difference = np.abs(cents[payment] - cents[bill])
+        agree = vendors[payment] == vendors[bill]
+        close = (gap <= days) & (agree | (difference == 0))
+        bill, payment, gap, difference, agree = bill[close], payment[close], gap[close], difference[close], agree[close]
+
+        # Same vendor first, then closest date, then closest amount; each side used once
+        taken = set()
+        for i in np.lexsort((payment, bill, difference, gap, ~agree)).tolist():
+            if kept_by[payment[i]] < 0 and bill[i] not in taken:
+                kept_by[payment[i]] = bill[i]
+                days_apart[payment[i]] = gap[i]
+                cents_apart[payment[i]] = difference[i]
+                same_vendor[payment[i]] = agree[i]
+                taken.add(bill[i])
+    return kept_by, days_apart, cents_apart, same_vendor
+
+
+def dedupe_sources(df, days=DATE_WINDOW_DAYS):
+    """
+    (df without its cross-source duplicates, the dropped rows)
+    Kept bills take the date of their payment (the bank's before Ramp's) and get
+    Linked_IDs ('Bank 123; Ramp 456') naming the rows folded into them; the dropped
+    rows come back as DUPLICATE_COLUMNS against their bill, Kept_Date being its bill date
+    """
+    kept_by, days_apart, cents_apart, same_vendor = match_duplicates(df, days)
+    duplicate = kept_by >= 0
+    dropped, kept = df.iloc[duplicate], df.iloc[kept_by[duplicate]]
+
+    duplicates = pd.DataFrame({
+        'Date': dropped['Date'].to_numpy(),
+        'Source': dropped['Source'].astype(object).to_numpy(),
+        'Vendor': dropped['Vendor'].to_numpy(),
+        'Canonical_Vendor': dropped['Canonical_Vendor'].to_numpy(),
+        'Amount': dollars(dropped['Amount_Cents']),
+        'ID': dropped['ID'].to_numpy(),
+        'Kept_Source': kept['Source'].astype(object).to_numpy(),
+        'Kept_ID': kept['ID'].to_numpy(),
+        'Kept_Date': kept['Date'].to_numpy(),
+        'Days_Apart': days_apart[duplicate],
+        'Amount_Difference': dollars(cents_apart[duplicate]),
+        'Same_Vendor': same_vendor[duplicate],
+    }, columns=DUPLICATE_COLUMNS)
+
+    linked = {}
+    for position, label in zip(kept_by[duplicate].tolist(), (duplicates['Source'] + ' ' + duplicates['ID']).tolist()):
+        linked[position] = f"{linked[position]}; {label}" if position in linked else label
+    links = np.full(len(df), '', dtype=object)
+    links[list(linked)] = list(linked.values())
+
+    # The cash left when the payment did: walk the sources least preferred first so the bank's date wins
+    dates = df['Date'].to_numpy(copy=True)
+    sources = df['Source'].astype(object).to_numpy()
+    for payment_source in reversed(PAYMENT_SOURCES):
+        paid_by = np.flatnonzero(duplicate & (sources == payment_source))
+        dates[kept_by[paid_by]] = dates[paid_by]
+    result = df.assign(Date=dates, Linked_IDs=links)
+    return result.iloc[~duplicate], duplicates
+
+
+def print_dedup_summary(duplicates, kept):
+    """Rows and dollars folded away, per source"""
+    if duplicates.empty:
+        print(f"   🔁 Cross-source duplicates: none found across {len(kept):,} transactions")
+        return
+    by_source = duplicates.groupby('Source')['Amount'].agg(['count', 'sum'])
+    detail = ', '.join(f"{source} {int(row['count']):,}" for source, row in by_source.iterrows())
+    print(f"   🔁 Cross-source duplicates: {len(duplicates):,} rows (${duplicates['Amount'].sum():,.2f}) "
+          f"folded into {len(duplicates[['Kept_Source', 'Kept_ID']].drop_duplicates()):,} kept records ({detail})")
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Shared BOSS fetch helpers for the cash forecast builders
+Keyset pagination over (date, id) so every ledger table loads completely,
+and a thread-pool fetch stage so the sources download side by side
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+# PostgREST caps responses at max-rows (1000 on Supabase by default)
+PAGE_SIZE = 1000
+
+# Values per in_ filter - keeps the query string well under URL limits for UUIDs
+KEY_CHUNK_SIZE = 150
+
+# Keyset column per ledger table (None = page by id only)
+LEDGER_DATE_COLUMNS = {
+    'gl_transaction_overrides': None,
+    'quickbooks_bills': 'bill_date',
+    'quickbooks_expenses': 'expense_date',
+    'bank_statements': 'transaction_date',
+    'ramp_transactions': 'transaction_date',
+}
+
+# The five sources every forecast builder pulls
+FORECAST_SOURCES = list(LEDGER_DATE_COLUMNS)
+
+OVERRIDES_TABLE = 'gl_transaction_overrides'
+LEDGER_SOURCES = [table for table in FORECAST_SOURCES if table != OVERRIDES_TABLE]
+
+
+def resolve_window(since=None, until=None, weeks_back=None, weeks_forward=None, today=None):
+    """
+    Turn --since/--until or --weeks-back/--weeks-forward into ISO date bounds
+    Week counts are whole Monday-Sunday weeks around the current week; None = unbounded
+    """
+    week_start = (today or date.today())
+    week_start -= timedelta(days=week_start.weekday())
+    if since is None and weeks_back is not None:
+        since = (week_start - timedelta(weeks=weeks_back)).isoformat()
+    if until is None and weeks_forward is not None:
+        until = (week_start + timedelta(weeks=weeks_forward, days=6)).isoformat()
+    return since, until
+
+
+def window_filters(table, since=None, until=None):
+    """gte/lte filters on a table's date column (tables without one are not windowed)"""
+    date_column = LEDGER_DATE_COLUMNS.get(table)
+    if not date_column:
+        return []
+    filters = []
+    if since:
+        filters.append(('gte', date_column, since))
+    if until:
+        filters.append(('lte', date_column, until))
+    return filters
+
+
+def _with_key_columns(columns, date_column):
+    """Make sure the keyset columns come back in every row"""
+    if columns.strip() == '*':
+        return columns
+    selected = [c.strip() for c in columns.split(',') if c.strip()]
+    for key in ('id', date_column):
+        if key and key not in selected:
+            selected.append(key)
+    return ','.join(selected)
+
+
+def _quote(value):
+    """A value double-quoted for a PostgREST or=(...) list, where ',', '.', ':' and parentheses are syntax"""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _iter_pages(client, table, columns, date_column, page_size, null_dates, filters):
+    """Walk one keyset range until the server returns an empty page"""
+    last = None
+    while True:
+        query = client.table(table).select(columns)
+        for op, column, value in filters:
+            query = getattr(query, op)(column, value)
+
+        if date_column and null_dates:
+            query = query.is_(date_column, 'null')
+        elif date_column:
+            query = query.not_.is_(date_column, 'null')
+
+        if last is not None:
+            if date_column and not null_dates:
+                last_date, last_id = map(_quote, last)
+                query = query.or_(
+                    f"{date_column}.gt.{last_date},"
+                    f"and({date_column}.eq.{last_date},id.gt.{last_id})"
+                )
+            else:
+                query = query.gt('id', last)
+
+        if date_column and not null_dates:
+            query = query.order(date_column)
+        query = query.order('id').limit(page_size)
+
+        rows = query.execute().data or []
+        if not rows:
+            return
+        yield rows
+
+        # Never trust len(rows) < page_size - the server may cap below page_size
+        tail = rows[-1]
+        if date_column and not null_dates:
+            last = (tail[date_column], tail['id'])
+        else:
+            last = tail['id']
+
+
+def iter_table_batches(client, table, columns='*', date_column=None, page_size=PAGE_SIZE, filters=()):
+    """
+    Yield a table as lists of at most page_size rows, ordered by (date_column, id)
+    Rows with a NULL date can't sit in the keyset, so they come first, paged by id
+    filters: extra (operator, column, value) conditions, e.g. ('gte', 'updated_at', ts)
+    """
+    if date_column is None:
+        date_column = LEDGER_DATE_COLUMNS.get(table)
+    columns = _with_key_columns(columns, date_column)
+
+    if date_column:
+        yield from _iter_pages(client, table, columns, date_column, page_size, True, filters)
+    yield from _iter_pages(client, table, columns, date_column, page_size, False, filters)
+
+
+def chunked(values, size=KEY_CHUNK_SIZE):
+    """Distinct values in sorted chunks of at most size"""
+    values = sorted(set(values))
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def iter_keyed_batches(client, table, columns, key_column, keys, page_size=PAGE_SIZE, filters=()):
+    """Yield only the rows whose key_column is in keys, via chunked in_ filters"""
+    for chunk in chunked(keys):
+        yield from iter_table_batches(
+            client, table, columns, page_size=page_size,
+            filters=[*filters, ('in_', key_column, chunk)]
+        )
+
+
+def fetch_table(client, table, columns='*', date_column=None, page_size=PAGE_SIZE, filters=()):
+    """Load a whole table as one list (small tables / quick scripts)"""
+    rows = []
+    for batch in iter_table_batches(client, table, columns, date_column, page_size, filters):
+        rows.extend(batch)
+    return rows
+
+
+def _timed_fetch(client, table, options, fetch, empty):
+    """Fetch one source, capturing rows, elapsed time and any error"""
+    started = time.perf_counter()
+    try:
+        rows = fetch(client, table, **options)
+        error = None
+    except Exception as e:
+        rows, error = empty(table), e
+    stats = {'rows': len(rows), 'seconds': time.perf_counter() - started, 'error': error}
+    stats.update(getattr(rows, 'attrs', {}))  # fetcher-specific counters, e.g. delta_rows
+    return rows, stats
+
+
+def fetch_sources(client, sources, max_workers=None, fetch=fetch_table, empty=lambda table: []):
+    """
+    Fetch several tables concurrently on a thread pool
+    sources: list of table names, or {table: kwargs for fetch}
+    fetch: fetch_table (list of dicts) or any fetcher with the same call shape; the
+    builders pass a typed one (fetch_typed, fetch_snapshot, fetch_copy) that decodes
+    each batch as it arrives, so a worker never holds its whole table as dicts
+    Returns (rows_by_table, stats_by_table); a failed table comes back as empty(table) with its error
+    """
+    if not isinstance(sources, dict):
+        sources = {table: {} for table in sources}
+
+    rows_by_table, stats_by_table = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(sources) or 1) as pool:
+        futures = {
+            table: pool.submit(_timed_fetch, client, table, options, fetch, empty)
+            for table, options in sources.items()
+        }
+        for table, future in futures.items():
+            rows_by_table[table], stats_by_table[table] = future.result()
+    return rows_by_table, stats_by_table
+
+
+def print_fetch_summary(stats_by_table, wall_seconds=None):
+    """Per-source timing table for the builder console output"""
+    for table, stats in stats_by_table.items():
+        if stats['error'] is not None:
+            print(f"   ❌ {table:28} failed after {stats['seconds']:6.2f}s: {stats['error']}")
+        else:
+            delta = f"  ({stats['delta_rows']:,} changed)" if 'delta_rows' in stats else ''
+            print(f"   ⏱️  {table:28} {stats['rows']:>8,} rows  {stats['seconds']:6.2f}s{delta}")
+    if wall_seconds is not None:
+        slowest = max((s['seconds'] for s in stats_by_table.values()), default=0)
+        print(f"   ⏱️  {'fetch wall time':28} {wall_seconds:>14.2f}s (slowest source {slowest:.2f}s)")
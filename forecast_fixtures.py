@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Record/replay of Supabase responses for the cash forecast builders
+RecordingClient wraps a real supabase client and captures every query's
+response data; ReplayClient serves those captures through the same
+client.table(...)...execute() / client.rpc(...)...execute() interface, so a
+builder run can be profiled or diffed offline with no credentials.
+
+Fixtures are one gzip'd JSON file per table (or rpc function), keyed by the
+exact chain of builder calls that produced each response. A replayed run must
+issue the same queries as the recorded one: same window, and no snapshot cache
+(the snapshot's delta pull depends on local state).
+"""
+
+import gzip
+import json
+import os
+import threading
+from types import SimpleNamespace
+
+FIXTURE_DIR = 'forecast_fixtures'
+
+# Builder attributes that are properties rather than methods (query.not_.is_(...))
+_PROPERTY_STEPS = {'not_'}
+
+
+def _fixture_path(fixture_dir, name):
+    return os.path.join(fixture_dir, f'{name}.json.gz')
+
+
+def _step_key(steps):
+    return json.dumps(steps, sort_keys=True, default=str)
+
+
+class _Query:
+    """Records the builder chain; execute() is delegated to the owning client"""
+
+    def __init__(self, client, name, steps, target=None):
+        self._client = client
+        self._name = name
+        self._steps = steps
+        self._target = target
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        target = getattr(self._target, attr) if self._target is not None else None
+        if attr in _PROPERTY_STEPS:
+            return _Query(self._client, self._name, self._steps + [[attr]], target)
+
+        def step(*args, **kwargs):
+            result = target(*args, **kwargs) if target is not None else None
+            return _Query(self._client, self._name, self._steps + [[attr, list(args), kwargs]], result)
+        return step
+
+    def execute(self):
+        return self._client._execute(self._name, _step_key(self._steps), self._target)
+
+
+class ReplayClient:
+    """Serves recorded responses; an unrecorded query raises KeyError"""
+
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        self.fixture_dir = fixture_dir
+        self._fixtures = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name):
+        with self._lock:
+            if name not in self._fixtures:
+                path = _fixture_path(self.fixture_dir, name)
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"No fixture for {name} in {self.fixture_dir} (record it first)")
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    self._fixtures[name] = json.load(f)
+            return self._fixtures[name]
+
+    def _execute(self, name, key, target):
+        fixture = self._load(name)
+        if key not in fixture:
+            raise KeyError(f"Query on {name} is not in {self.fixture_dir} (record with the same options)")
+        return SimpleNamespace(data=fixture[key])
+
+    def table(self, table):
+        return _Query(self, table, [['table', [table], {}]])
+
+    def rpc(self, fn, params=None):
+        return _Query(self, f'rpc_{fn}', [['rpc', [fn, params], {}]])
+
+
+class RecordingClient(ReplayClient):
+    """Passes queries through to a real client and keeps each response for save()"""
+
+    def __init__(self, client, fixture_dir=FIXTURE_DIR):
+        super().__init__(fixture_dir)
+        self._client = client
+
+    def _execute(self, name, key, target):
+        response = target.execute()
+        with self._lock:
+            self._fixtures.setdefault(name, {})[key] = response.data
+        return response
+
+    def table(self, table):
+        return _Query(self, table, [['table', [table], {}]], self._client.table(table))
+
+    def rpc(self, fn, params=None):
+        return _Query(self, f'rpc_{fn}', [['rpc', [fn, params], {}]], self._client.rpc(fn, params))
+
+    def save(self):
+        """Write one fixture file per table/function touched; returns the response count"""
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        with self._lock:
+            for name, fixture in self._fixtures.items():
+                with gzip.open(_fixture_path(self.fixture_dir, name), 'wt', encoding='utf-8') as f:
+                    json.dump(fixture, f, default=str)
+            return sum(len(fixture) for fixture in self._fixtures.values())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+The canonical transaction table the forecast builders analyze and export
+Each source's typed columns are mapped straight into one columnar frame - no
+dict per row, no float() per amount. Money is held as int64 cents (sums are
+exact), dates as datetime64, and the low-cardinality text columns (Source,
+Category, Subcategory, GL code and name, Status, Categorized_By) as pandas
+Categoricals: one small code per row instead of a Python string object, which
+cuts memory several-fold and lets groupbys and pivots on them work on codes.
+"""
+
+import numpy as np
+import pandas as pd
+
+TRANSACTION_COLUMNS = [
+    'Source', 'Date', 'Vendor', 'Amount_Cents', 'Category', 'Subcategory', 'GL_Code', 'GL_Name',
+    'Balance_Cents', 'Due_Date', 'Status', 'Memo', 'Categorized_By', 'ID',
+]
+CATEGORICAL_COLUMNS = ['Source', 'Category', 'Subcategory', 'GL_Code', 'GL_Name', 'Status', 'Categorized_By']
+
+
+def to_cents(amounts):
+    """int64 cents of a money column (NaN -> 0), rounded half to even"""
+    dollars = pd.to_numeric(pd.Series(amounts), errors='coerce').to_numpy(dtype=np.float64)
+    return np.nan_to_num(np.rint(dollars * 100)).astype(np.int64)
+
+
+def dollars(cents):
+    """float64 dollars for display and export"""
+    return np.asarray(cents, dtype=np.int64) / 100
+
+
+def source_frame(source, ids, dates, vendors, amounts, categorized, memo='', balance=0, due_dates=pd.NaT,
+                 categorized_by='rule'):
+    """
+    TRANSACTION_COLUMNS for one source's rows, all arguments row-aligned or scalar
+    amounts/balance are dollars (sign kept; the caller decides what counts as an expense)
+    categorized: forecast_category_cache.RESULT_COLUMNS for the same rows
+    """
+    index = categorized.index
+    balance_cents = np.broadcast_to(to_cents(balance if np.ndim(balance) else [balance]), len(index))
+    frame = pd.DataFrame({
+        'Source': source,
+        'Date': pd.to_datetime(pd.Series(dates, index=index), errors='coerce'),
+        'Vendor': pd.Series(vendors, index=index, dtype=object).replace('', 'Unknown').fillna('Unknown'),
+        'Amount_Cents': to_cents(amounts),
+        'Category': categorized['category'].to_numpy(dtype=object),
+        'Subcategory': categorized['subcategory'].to_numpy(dtype=object),
+        'GL_Code': categorized['gl_code'].to_numpy(dtype=object),
+        'GL_Name': categorized['gl_name'].to_numpy(dtype=object),
+        'Balance_Cents': balance_cents,
+        'Due_Date': pd.to_datetime(pd.Series(due_dates, index=index), errors='coerce'),
+        'Status': np.where(balance_cents > 0, 'Unpaid', 'Paid'),
+        'Memo': pd.Series(memo, index=index, dtype=object).fillna(''),
+        'Categorized_By': categorized_by,
+        'ID': pd.Series(ids, index=index).astype(str),
+    }, index=index)
+    return frame[TRANSACTION_COLUMNS]
+
+
+def apply_overrides(frame, overrides, gl=None):
+    """
+    In place: rows whose ID has a gl_transaction_overrides row take its category
+    (title-cased, blank -> 'Uncategorized') and account type, GL re-derived with gl
+    The last override per transaction wins
+    """
+    by_transaction = overrides.drop_duplicates('transaction_id', keep='last').set_index('transaction_id')
+    rows = frame['ID'].isin(by_transaction.index).to_numpy()
+    if not rows.any():
+        return 0
+    matched = by_transaction.loc[frame.loc[rows, 'ID']]
+    category = matched['override_category'].fillna('').replace('', 'Uncategorized').str.title().to_numpy(dtype=object)
+    subcategory = matched['override_account_type'].to_numpy(dtype=object)
+    pairs = {pair: gl(*pair) if gl else ('', '') for pair in set(zip(category, subcategory))}
+    frame.loc[rows, 'Category'] = category
+    frame.loc[rows, 'Subcategory'] = subcategory
+    frame.loc[rows, 'GL_Code'] = [pairs[pair][0] for pair in zip(category, subcategory)]
+    frame.loc[rows, 'GL_Name'] = [pairs[pair][1] for pair in zip(category, subcategory)]
+    frame.loc[rows, 'Categorized_By'] = 'override'
+    return int(rows.sum())
+
+
+def transaction_frame(frames):
+    """One canonical table from source_frame() parts, low-cardinality columns as Categoricals"""
+    parts = [frame for frame in frames if len(frame)]
+    if not parts:
+        return pd.DataFrame({column: pd.Series(dtype=object) for column in TRANSACTION_COLUMNS})
+    df = pd.concat(parts, ignore_index=True)
+    return df.astype({column: 'category' for column in CATEGORICAL_COLUMNS})
+
+
+def set_labels(df, rows, column, values):
+    """
+    df.loc[rows, column] = values that works whether or not column is a Categorical
+    New labels are merged into the categories in sorted order, so sorting on the
+    column stays alphabetical
+    """
+    if isinstance(df[column].dtype, pd.CategoricalDtype):
+        categories = df[column].cat.categories
+        new = pd.Index(pd.unique(np.asarray(values, dtype=object))).difference(categories)
+        if len(new):
+            df[column] = df[column].cat.set_categories(sorted([*categories, *new]))
+    df.loc[rows, column] = values
+
+
+def print_frame_summary(df):
+    """Row count and in-memory size of the canonical table"""
+    size = df.memory_usage(deep=True).sum()
+    print(f"   🧱 Transaction table: {len(df):,} rows, {size / 1e6:,.1f} MB "
+          f"({len(CATEGORICAL_COLUMNS)} categorical columns, amounts in integer cents)")
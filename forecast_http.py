@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP transport for the forecast builders' Supabase client
+One pooled keep-alive httpx client for every fetch thread, bounded
+exponential-backoff retries on idempotent reads (read-only RPCs included), and
+per-request latency and byte counters that print as a summary at the end of a run.
+"""
+
+import random
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+from supabase import ClientOptions, create_client
+
+# Only reads are retried. RPC calls go out as POST, so only the read-only (STABLE)
+# functions below are retried; any other RPC, e.g. a write-back, is sent once
+RETRY_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+RETRY_RPC_FUNCTIONS = {'forecast_weekly_spend'}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 8.0
+
+POOL_LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=30)
+TIMEOUT = httpx.Timeout(120, connect=10)
+
+
+class TransportStats:
+    """Thread-safe per-endpoint request counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = defaultdict(lambda: {
+            'requests': 0, 'retries': 0, 'failures': 0, 'bytes': 0, 'latencies': [],
+        })
+
+    def record(self, endpoint, seconds=None, size=0, retry=False, failed=False):
+        with self._lock:
+            counters = self.endpoints[endpoint]
+            if retry:
+                counters['retries'] += 1
+                return
+            counters['requests'] += 1
+            counters['bytes'] += size
+            counters['failures'] += failed
+            if seconds is not None:
+                counters['latencies'].append(seconds)
+
+    @property
+    def requests(self):
+        return sum(c['requests'] for c in self.endpoints.values())
+
+
+def _endpoint(request):
+    """/rest/v1/quickbooks_bills -> quickbooks_bills, /rest/v1/rpc/fn -> rpc/fn"""
+    path = request.url.path
+    return path.split('/rest/v1/', 1)[-1] or path
+
+
+def _retryable(request, endpoint):
+    if request.method in RETRY_METHODS:
+        return True
+    return request.method == 'POST' and endpoint.startswith('rpc/') and endpoint[4:] in RETRY_RPC_FUNCTIONS
+
+
+def _backoff(attempt, response=None):
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_BACKOFF_SECONDS)
+    delay = min(BACKOFF_SECONDS * 2 ** attempt, MAX_BACKOFF_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class RetryingTransport(httpx.BaseTransport):
+    """
+    Retries idempotent reads and times every request
+    transport: the transport requests go out on (default: a connection-pooled
+    httpx.HTTPTransport built from kwargs)
+    """
+
+    def __init__(self, stats=None, max_retries=MAX_RETRIES, transport=None, **kwargs):
+        kwargs.setdefault('limits', POOL_LIMITS)
+        self.transport = transport if transport is not None else httpx.HTTPTransport(**kwargs)
+        self.stats = stats if stats is not None else TransportStats()
+        self.max_retries = max_retries
+
+    def _send(self, request, endpoint):
+        """One attempt; the body is read here so latency and size cover the whole download"""
+        started = time.perf_counter()
+        response = self.transport.handle_request(request)
+        try:
+            body = b''.join(response.iter_raw())  # raw = on-the-wire (possibly gzip'd) bytes
+        finally:
+            response.close()
+        self.stats.record(endpoint, time.perf_counter() - started, len(body),
+                          failed=response.status_code >= 400)
+        return httpx.Response(
+            response.status_code, headers=response.headers, content=body,
+            extensions=response.extensions, request=request,
+        )
+
+    def handle_request(self, request):
+        endpoint = _endpoint(request)
+        retries = self.max_retries if _retryable(request, endpoint) else 0
+        for attempt in range(retries + 1):
+            try:
+                response = self._send(request, endpoint)
+            except httpx.TransportError:
+                self.stats.record(endpoint, failed=True)
+                if attempt == retries:
+                    raise
+                time.sleep(_backoff(attempt))
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == retries:
+                    return response
+                time.sleep(_backoff(attempt, response))
+            self.stats.record(endpoint, retry=True)
+
+    def close(self):
+        self.transport.close()
+
+
+def create_pooled_client(url, key, stats=None, max_retries=MAX_RETRIES):
+    """create_client() on a shared pooled, retrying httpx client"""
+    transport = RetryingTransport(stats, max_retries)
+    http_client = httpx.Client(transport=transport, timeout=TIMEOUT)
+    client = create_client(url, key, options=ClientOptions(httpx_client=http_client))
+    client.transport_stats = transport.stats
+    return client
+
+
+def print_transport_summary(stats):
+    """Per-endpoint request/latency/byte table for the end of a builder run"""
+    if not stats.requests:
+        return
+    print("\n🌐 HTTP summary:")
+    total_bytes = 0
+    for endpoint, c in sorted(stats.endpoints.items()):
+        latencies = sorted(c['latencies'])
+        p50 = latencies[len(latencies) // 2] if latencies else 0
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0
+        total_bytes += c['bytes']
+        extra = ''
+        if c['retries'] or c['failures']:
+            extra = f"  {c['retries']} retries ({c['failures']} failed attempts)"
+        print(f"   {endpoint:28} {c['requests']:>5} req  {c['bytes'] / 1e6:8.2f} MB  "
+              f"p50 {p50 * 1000:6.0f}ms  p95 {p95 * 1000:6.0f}ms  total {sum(latencies):6.2f}s{extra}")
+    print(f"   {'all endpoints':28} {stats.requests:>5} req  {total_bytes / 1e6:8.2f} MB")
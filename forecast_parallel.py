@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Process-pool categorization for multi-year backfills
+Normalizing and scanning search texts is pure Python, so a backfill of several
+years of bank, Ramp and QB lines is bound to one core. match_rules() shards the
+rows by a stable hash of their canonical vendor, so every repeat of a payee
+lands in the same worker and hits that worker's memo, and matches the shards
+on a process pool. Each worker receives the compiled matcher once, through the
+pool initializer; results are put back in input order. The pool forks, and
+only on Linux: macOS's fork is unsafe once system frameworks are loaded, and
+spawn would re-run the builder script in every worker. Small inputs, a single
+worker or any other platform take the in-process path, which gives identical
+results.
+"""
+
+import os
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from forecast_vendors import canonical_vendor
+
+# Fewer rows to match than this and the pool costs more than it saves
+PARALLEL_MIN_ROWS = 50_000
+# Shards per worker, so one heavy vendor does not leave the other workers idle
+SHARDS_PER_WORKER = 4
+
+_worker_matcher = None
+
+
+def _init_worker(matcher):
+    global _worker_matcher
+    _worker_matcher = matcher
+
+
+def _match(matcher, texts):
+    """[(normalized text, winning rule index or None)] for texts"""
+    normalize = matcher.normalize or (lambda text: text)
+    results = []
+    for text in texts:
+        search_text = normalize(text)
+        results.append((search_text, matcher.rule(search_text, normalized=True)))
+    return results
+
+
+def _match_shard(texts):
+    return _match(_worker_matcher, texts)
+
+
+def shard_ids(keys, shards):
+    """Shard of each key: crc32 of its canonical vendor, stable across runs and processes"""
+    codes, uniques = pd.factorize(pd.Series(keys, dtype=object).fillna('').astype(str))
+    buckets = np.array([zlib.crc32(canonical_vendor(key).encode()) % shards for key in uniques], dtype=np.int64)
+    return buckets[codes] if len(uniques) else np.zeros(len(codes), dtype=np.int64)
+
+
+def resolve_workers(workers=None):
+    """Worker count for a --workers value (None = every core, never more); 1 off Linux"""
+    if not sys.platform.startswith('linux'):
+        return 1
+    cores = os.cpu_count() or 1
+    return max(min(workers if workers is not None else cores, cores), 1)
+
+
+def match_rules(matcher, texts, shard_keys=None, workers=None, min_rows=PARALLEL_MIN_ROWS):
+    """
+    [(normalized text, winning rule index or None)] for texts, in input order
+    shard_keys: row-aligned payee strings to shard on (default: the texts themselves)
+    Returns (results, processes used)
+    Callers holding a SQLite connection should close it first: a forked worker
+    inherits the open handle
+    """
+    texts = list(texts)
+    workers = resolve_workers(workers)
+    if workers == 1 or len(texts) < min_rows:
+        return _match(matcher, texts), 1
+
+    shards = workers * SHARDS_PER_WORKER
+    buckets = shard_ids(texts if shard_keys is None else list(shard_keys), shards)
+    positions = [np.flatnonzero(buckets == shard) for shard in range(shards)]
+    positions = [shard for shard in positions if len(shard)]
+
+    results = [None] * len(texts)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('fork'),
+                             initializer=_init_worker, initargs=(matcher,)) as pool:
+        futures = [pool.submit(_match_shard, [texts[i] for i in shard]) for shard in positions]
+        for shard, future in zip(positions, futures):
+            for i, result in zip(shard.tolist(), future.result()):
+                results[i] = result
+    return results, workers
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Direct Postgres backend for the cash forecast builders
+Streams each source with COPY (SELECT ...) TO STDOUT as CSV instead of paging
+PostgREST JSON, and casts it to the same typed frame as forecast_schemas.fetch_typed
+as it is parsed, COPY_CHUNK_ROWS rows at a time - the CSV is never buffered whole.
+
+Needs psycopg 3 (pip install "psycopg[binary]") and a DSN, normally DATABASE_URL.
+Works against any Postgres that has the create-*-table.sql tables, e.g. a local
+database seeded with psql -f create-bank-statements-table.sql etc.
+"""
+
+import io
+import os
+
+import pandas as pd
+
+from forecast_fetch import LEDGER_DATE_COLUMNS
+from forecast_schemas import SOURCE_SCHEMAS, coerce_frame, column_name, source_column, stack_frames
+
+# CSV rows parsed and typed per step of a COPY stream
+COPY_CHUNK_ROWS = 50000
+
+
+def _require_psycopg():
+    try:
+        import psycopg
+        from psycopg import sql
+    except ImportError:
+        print("❌ The postgres backend needs psycopg 3: pip install \"psycopg[binary]\"")
+        raise
+    return psycopg, sql
+
+
+def get_dsn():
+    """DSN for the postgres backend (FORECAST_DATABASE_URL overrides DATABASE_URL)"""
+    return os.getenv('FORECAST_DATABASE_URL') or os.getenv('DATABASE_URL')
+
+
+def copy_statement(table, since=None, until=None, keys=None):
+    """
+    COPY (SELECT <declared columns> ...) TO STDOUT, windowed on the table's date column
+    keys=(column, values) adds column = ANY(values) - one statement, no chunking needed
+    """
+    _, sql = _require_psycopg()
+
+    fields = sql.SQL(', ').join(
+        sql.SQL('{} AS {}').format(sql.Identifier(source_column(field)), sql.Identifier(column_name(field)))
+        for field, _ in SOURCE_SCHEMAS[table]
+    )
+    query = sql.SQL('SELECT {} FROM {}').format(fields, sql.Identifier(table))
+
+    date_column = LEDGER_DATE_COLUMNS.get(table)
+    conditions = []
+    if date_column and since:
+        conditions.append(sql.SQL('{} >= {}').format(sql.Identifier(date_column), sql.Literal(since)))
+    if date_column and until:
+        conditions.append(sql.SQL('{} <= {}').format(sql.Identifier(date_column), sql.Literal(until)))
+    if keys is not None:
+        key_column, values = keys
+        conditions.append(sql.SQL('{} = ANY({})').format(
+            sql.Identifier(key_column), sql.Literal(sorted(set(values)))
+        ))
+    if conditions:
+        query += sql.SQL(' WHERE ') + sql.SQL(' AND ').join(conditions)
+
+    order = [sql.Identifier(date_column)] if date_column else []
+    query += sql.SQL(' ORDER BY ') + sql.SQL(', ').join(order + [sql.Identifier('id')])
+
+    return sql.SQL('COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER true)').format(query)
+
+
+def fetch_copy(dsn, table, since=None, until=None, keys=None):
+    """
+    fetch_sources-compatible fetcher: pass the DSN where the other fetchers take a client
+    One connection per call, so sources can stream in parallel
+    """
+    psycopg, _ = _require_psycopg()
+
+    with psycopg.connect(dsn) as conn:
+        with conn.cursor() as cursor:
+            with cursor.copy(copy_statement(table, since, until, keys)) as copy:
+                return read_copy_csv(table, io.BufferedReader(_CopyStream(copy)))
+
+
+class _CopyStream(io.RawIOBase):
+    """Read-only file over a COPY's chunks, so read_csv pulls the stream as it parses"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(bytes(chunk))
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def read_copy_csv(table, stream, chunk_rows=COPY_CHUNK_ROWS):
+    """Typed frame from a COPY ... (FORMAT csv, HEADER true) byte stream, chunk_rows at a time"""
+    # Everything as text first; coerce_frame applies the declared kinds
+    with pd.read_csv(stream, dtype=str, keep_default_na=False, na_values=[''], chunksize=chunk_rows) as reader:
+        return stack_frames(table, (coerce_frame(table, chunk) for chunk in reader))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Polars engine for the forecast summary tables (--engine polars)
+The transaction table is handed to Polars through Arrow - the int64 cents and
+datetime64 columns are shared, not copied - and the rollup, By Category, Labor
+Summary and Weekly by GL Code stages run as one lazy query plan on Polars'
+multi-threaded executor. The results are returned as the same pandas frames
+forecast_views.summary_tables() builds, and check_parity() compares the two.
+
+Needs polars and pyarrow (pip install polars pyarrow); the pandas engine does not.
+Categorization stays on the shared CategoryCache either way: the rule matcher is
+Python and its results are already cached per transaction.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecast_frame import dollars
+from forecast_views import FAMILIES, ROLLUP_KEYS
+from forecast_views import summary_tables as pandas_summary_tables
+
+ENGINES = ['pandas', 'polars']
+
+
+def _require_polars():
+    try:
+        import polars as pl
+    except ImportError:
+        print("❌ The polars engine needs polars and pyarrow: pip install polars pyarrow")
+        raise
+    return pl
+
+
+def _lazy_rollup(pl, df):
+    """The category/subcategory/GL/vendor/week rollup as a lazy frame with string keys"""
+    text_keys = ROLLUP_KEYS[:-1]
+    frame = pl.from_pandas(df[text_keys + ['Date', 'Amount_Cents']].reset_index(drop=True))
+    return (
+        frame.lazy()
+        .with_columns([pl.col(key).cast(pl.String) for key in text_keys])
+        .with_columns(pl.col('Date').dt.truncate('1w').alias('Week'))
+        .group_by(ROLLUP_KEYS)
+        .agg(pl.col('Amount_Cents').sum(), pl.len().alias('Rows'))
+    )
+
+
+def _by_category(pl, rollup):
+    return (
+        rollup.group_by('Category')
+        .agg(pl.col('Rows').sum().alias('count'), pl.col('Amount_Cents').sum())
+        .sort('Category')
+        .sort('Amount_Cents', descending=True, maintain_order=True)
+    )
+
+
+def _labor_summary(pl, rollup):
+    keys = ['Category', 'Subcategory', 'GL_Code', 'Canonical_Vendor']
+    return (
+        rollup.filter(pl.col('Category').str.contains(FAMILIES['Labor']))
+        .group_by(keys)
+        .agg(pl.col('Amount_Cents').sum())
+        .sort(keys)
+        .sort(['Category', 'Amount_Cents'], descending=[False, True], maintain_order=True)
+    )
+
+
+def _weekly(pl, rollup):
+    return (
+        rollup.filter((pl.col('GL_Code') != '') & pl.col('Week').is_not_null())
+        .group_by(['GL_Code', 'GL_Name', 'Category', 'Week'])
+        .agg(pl.col('Amount_Cents').sum())
+    )
+
+
+def summary_tables(df):
+    """forecast_views.summary_tables() computed by Polars, returned as identical pandas frames"""
+    pl = _require_polars()
+    rollup = _lazy_rollup(pl, df).cache()
+    by_category, labor, weekly = pl.collect_all([
+        _by_category(pl, rollup), _labor_summary(pl, rollup), _weekly(pl, rollup),
+    ])
+    tables = {}
+
+    index = pd.Index(by_category['Category'].to_numpy().astype(object), name='Category')
+    tables['By Category'] = pd.DataFrame({'count': by_category['count'].to_numpy().astype(np.int64),
+                                          'sum': dollars(by_category['Amount_Cents'].to_numpy())}, index=index)
+
+    if labor.height:
+        labor_summary = pd.DataFrame({
+            key: labor[key].to_numpy().astype(object) for key in ['Category', 'Subcategory', 'GL_Code', 'Canonical_Vendor']
+        })
+        labor_summary['Amount'] = dollars(labor['Amount_Cents'].to_numpy())
+        tables['Labor Summary'] = labor_summary
+
+    if weekly.height:
+        keys = ['GL_Code', 'GL_Name', 'Category']
+        wide = weekly.sort('Week').pivot(on='Week', index=keys, values='Amount_Cents').fill_null(0).sort(keys)
+        weeks = [column for column in wide.columns if column not in keys]
+        cents = wide.select(weeks).to_numpy().astype(np.int64)
+        total = cents.sum(axis=1)
+        order = np.argsort(-total, kind='stable')
+        row_index = pd.MultiIndex.from_arrays([wide[key].to_numpy().astype(object) for key in keys], names=keys)
+        columns = pd.DatetimeIndex(pd.to_datetime(weekly['Week'].unique().sort().to_numpy()), name='Week')
+        pivot = pd.DataFrame(dollars(cents), index=row_index, columns=columns)
+        pivot['Total'] = dollars(total)
+        tables['Weekly by GL Code'] = pivot.iloc[order]
+    return tables
+
+
+def engine_summaries(df, engine='pandas'):
+    """The summary tables from the chosen engine (see ENGINES)"""
+    if engine == 'polars':
+        return summary_tables(df)
+    return pandas_summary_tables(df)
+
+
+def _differences(expected, actual):
+    """Names of the tables that are not identical (values, dtypes, index and column labels)"""
+    different = []
+    for name in expected.keys() | actual.keys():
+        left, right = expected.get(name), actual.get(name)
+        if left is None or right is None:
+            different.append(name)
+            continue
+        try:
+            pd.testing.assert_frame_equal(left, right, check_exact=True)
+        except AssertionError:
+            different.append(name)
+    return sorted(different)
+
+
+def check_parity(df):
+    """Run both engines on df and report whether every summary table is identical"""
+    started = time.perf_counter()
+    expected = pandas_summary_tables(df)
+    pandas_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = summary_tables(df)
+    polars_seconds = time.perf_counter() - started
+
+    different = _differences(expected, actual)
+    if different:
+        print(f"   ❌ Engine parity: {', '.join(different)} differ between pandas and polars")
+    else:
+        print(f"   ✅ Engine parity: {len(expected)} summary tables identical "
+              f"(pandas {pandas_seconds:.2f}s, polars {polars_seconds:.2f}s)")
+    return not different
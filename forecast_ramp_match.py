@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Ramp card charges matched to the QuickBooks expenses and bills that book them
+QuickBooks rows are hashed on (amount in cents, date bucket), with buckets as
+wide as the match window, so a charge's candidates are the rows in its own
+bucket and the two beside it at the same amount: three hash lookups per charge
+and O(n) expected time, however many months are reconciled at once. Charges
+whose canonical payee agrees are matched first; the rest, where several
+candidates share an amount, are scored on payee overlap and date distance, and
+every QuickBooks row is claimed by at most one charge. Charges already marked
+matched, by hand or by an earlier run, are left alone, and so are the
+QuickBooks rows they claim.
+
+The results go back to ramp_transactions (is_matched, matched_qb_transaction_id,
+matched_at) in chunks through match_ramp_transactions()
+(create-match-ramp-transactions-function.sql), which only marks charges still
+unmatched when the write lands: a charge matched by hand between the read and
+the write, or whose QuickBooks row was claimed meanwhile, is skipped.
+"""
+
+import json
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from forecast_frame import dollars, to_cents
+from forecast_vendors import canonical_vendor
+
+RAMP_TABLE = 'ramp_transactions'
+RAMP_MATCH_FILE = 'BDI_Ramp_QB_Matches.xlsx'
+
+MATCH_WRITE_FUNCTION = 'match_ramp_transactions'
+
+MATCH_WINDOW_DAYS = 3
+WRITE_CHUNK_SIZE = 500
+
+# Payee overlap outweighs a day or two of posting lag
+VENDOR_WEIGHT = 2.0
+# More QB rows than this at one amount in one bucket: too ambiguous to match on amount
+AMBIGUOUS_BUCKET_ROWS = 25
+
+MATCH_COLUMNS = ['id', 'transaction_date', 'payee', 'amount', 'qb_source', 'qb_id', 'qb_vendor', 'qb_date',
+                 'days_apart', 'vendor_score', 'candidates']
+
+
+def ramp_charges(ramp):
+    """Unmatched Ramp charges: id, date, payee, cents"""
+    charges = ramp[(ramp['charge_usd'] > 0) & ~ramp['is_matched'] & ramp['transaction_date'].notna()]
+    return pd.DataFrame({
+        'id': charges['id'].to_numpy(),
+        'date': charges['transaction_date'].to_numpy(),
+        'vendor': charges['payee'].to_numpy(),
+        'cents': to_cents(charges['charge_usd']),
+    })
+
+
+def qb_candidates(bills, expenses, claimed=()):
+    """QB expenses and bills no Ramp row has claimed yet: qb_source, qb_id, date, vendor, cents"""
+    frames = [
+        pd.DataFrame({'qb_source': source, 'qb_id': rows['id'].to_numpy(), 'date': rows[date].to_numpy(),
+                      'vendor': rows['vendor_name'].to_numpy(), 'cents': to_cents(rows['total_amount'].abs())})
+        for source, rows, date in [('QB Expense', expenses, 'expense_date'), ('QB Bill', bills, 'bill_date')]
+    ]
+    qb = pd.concat(frames, ignore_index=True)
+    return qb[(qb['cents'] > 0) & qb['date'].notna() & ~qb['qb_id'].isin(set(claimed))].reset_index(drop=True)
+
+
+def _canonical(names):
+    """canonical_vendor() of each name, computed once per distinct name"""
+    codes, uniques = pd.factorize(pd.Series(names, dtype=object).fillna(''))
+    canonical = np.array([canonical_vendor(name) for name in uniques], dtype=object)
+    return canonical[codes] if len(uniques) else np.array([], dtype=object)
+
+
+def _vendor_scores(left, right):
+    """Jaccard overlap of the canonical payee words, each distinct name split once"""
+    words = {}
+
+    def tokens(name):
+        if name not in words:
+            words[name] = frozenset(name.split())
+        return words[name]
+
+    scores = []
+    for a, b in zip(left, right):
+        a, b = tokens(a), tokens(b)
+        scores.append(len(a & b) / len(a | b) if a and b else 0.0)
+    return np.array(scores, dtype=np.float64)
+
+
+def candidate_pairs(charges, qb, window=MATCH_WINDOW_DAYS, by=('cents',), max_bucket_rows=None):
+    """
+    Every (charge, QB row) pair agreeing on by, no more than window days apart
+    Hash joins on (*by, bucket) against the charge's bucket and its neighbours;
+    QB buckets holding more than max_bucket_rows rows are left out
+    """
+    by = list(by)
+    width = window + 1
+    charge_days = charges['date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    qb_days = qb['date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    left = charges[by].assign(charge=np.arange(len(charges)), bucket=charge_days // width)
+    right = qb[by].assign(row=np.arange(len(qb)), bucket=qb_days // width)
+    if max_bucket_rows is not None:
+        right = right[right.groupby(by + ['bucket'])['row'].transform('size') <= max_bucket_rows]
+
+    pairs = pd.concat([
+        left.assign(bucket=left['bucket'] + offset).merge(right, on=by + ['bucket'])[['charge', 'row']]
+        for offset in (-1, 0, 1)
+    ], ignore_index=True)
+    pairs['days_apart'] = np.abs(charge_days[pairs['charge']] - qb_days[pairs['row']])
+    return pairs[pairs['days_apart'] <= window].reset_index(drop=True)
+
+
+def _assign(pairs, charges, qb, window):
+    """
+    Score the pairs and keep the best one per charge and per QB row
+    A charge with a single candidate takes it; with several, only a candidate
+    whose payee overlaps the charge's
+    """
+    pairs['vendor_score'] = _vendor_scores(charges['canonical'].to_numpy()[pairs['charge']],
+                                           qb['canonical'].to_numpy()[pairs['row']])
+    pairs['candidates'] = pairs.groupby('charge')['row'].transform('size')
+    pairs['score'] = VENDOR_WEIGHT * pairs['vendor_score'] + 1 - pairs['days_apart'] / (window + 1)
+    pairs = pairs[(pairs['candidates'] == 1) | (pairs['vendor_score'] > 0)]
+
+    # Best pairs first (ties: closest date, then input order); each side used once
+    order = np.lexsort((pairs['row'], pairs['charge'], pairs['days_apart'], -pairs['score']))
+    matched_charges, matched_rows, keep = set(), set(), []
+    for i, charge, row in zip(order.tolist(), pairs['charge'].to_numpy()[order].tolist(),
+                              pairs['row'].to_numpy()[order].tolist()):
+        if charge not in matched_charges and row not in matched_rows:
+            matched_charges.add(charge)
+            matched_rows.add(row)
+            keep.append(i)
+    return pairs.iloc[keep]
+
+
+def match_ramp(ramp, bills, expenses, window=MATCH_WINDOW_DAYS):
+    """
+    One QuickBooks row per unmatched Ramp charge, as MATCH_COLUMNS
+    First pass: same cents and canonical vendor. Second pass, over what is left:
+    same cents only, scored on payee overlap. A key repeated more than
+    AMBIGUOUS_BUCKET_ROWS times in one bucket cannot be told apart and is
+    skipped rather than paired with every charge that shares it
+    """
+    claimed = ramp.loc[ramp['is_matched'], 'matched_qb_transaction_id']
+    charges = ramp_charges(ramp)
+    qb = qb_candidates(bills, expenses, claimed[claimed != ''])
+    charges['canonical'] = _canonical(charges['vendor'])
+    qb['canonical'] = _canonical(qb['vendor'])
+
+    first = candidate_pairs(charges, qb, window, by=['cents', 'canonical'], max_bucket_rows=AMBIGUOUS_BUCKET_ROWS)
+    first = _assign(first, charges, qb, window)
+    left_charges = np.setdiff1d(np.arange(len(charges)), first['charge'].to_numpy())
+    left_rows = np.setdiff1d(np.arange(len(qb)), first['row'].to_numpy())
+    second = candidate_pairs(charges.iloc[left_charges], qb.iloc[left_rows], window,
+                             max_bucket_rows=AMBIGUOUS_BUCKET_ROWS)
+    second['charge'], second['row'] = left_charges[second['charge']], left_rows[second['row']]
+    best = pd.concat([first, _assign(second, charges, qb, window)]).sort_values('charge')
+
+    charge, row = best['charge'].to_numpy(), best['row'].to_numpy()
+    return pd.DataFrame({
+        'id': charges['id'].to_numpy()[charge],
+        'transaction_date': charges['date'].to_numpy()[charge],
+        'payee': charges['vendor'].to_numpy()[charge],
+        'amount': dollars(charges['cents'].to_numpy()[charge]),
+        'qb_source': qb['qb_source'].to_numpy()[row],
+        'qb_id': qb['qb_id'].to_numpy()[row],
+        'qb_vendor': qb['vendor'].to_numpy()[row],
+        'qb_date': qb['date'].to_numpy()[row],
+        'days_apart': best['days_apart'].to_numpy(),
+        'vendor_score': best['vendor_score'].to_numpy().round(3),
+        'candidates': best['candidates'].to_numpy(),
+    }, columns=MATCH_COLUMNS)
+
+
+def qb_window(since, until, window=MATCH_WINDOW_DAYS):
+    """
+    QuickBooks fetch bounds for a Ramp window: window days wider on each side,
+    so a charge on the window's edge still sees every row it could match
+    """
+    def shift(day, days):
+        return (date.fromisoformat(day) + timedelta(days=days)).isoformat() if day else day
+    return shift(since, -window), shift(until, window)
+
+
+def match_rows(matches):
+    """match_ramp_transactions() payload rows for the matched charges"""
+    return [{'id': ramp_id, 'matched_qb_transaction_id': qb_id}
+            for ramp_id, qb_id in zip(matches['id'], matches['qb_id'])]
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def write_matches(client, matches, matched_at, chunk_size=WRITE_CHUNK_SIZE):
+    """
+    Write the matches through PostgREST RPC, chunk_size rows per call
+    Returns the rows actually marked; charges matched since the read are skipped
+    """
+    written = 0
+    for chunk in _chunks(match_rows(matches), chunk_size):
+        result = client.rpc(MATCH_WRITE_FUNCTION, {'p_matches': chunk, 'p_matched_at': matched_at}).execute()
+        written += int(result.data or 0)
+    return written
+
+
+def write_matches_pg(dsn, matches, matched_at, chunk_size=WRITE_CHUNK_SIZE):
+    """Write the matches over a direct Postgres connection (--backend postgres), one transaction per chunk"""
+    from forecast_pg import _require_psycopg
+
+    psycopg, _ = _require_psycopg()
+    written = 0
+    with psycopg.connect(dsn) as conn:
+        for chunk in _chunks(match_rows(matches), chunk_size):
+            with conn.transaction():
+                with conn.cursor() as cursor:
+                    cursor.execute(f'SELECT {MATCH_WRITE_FUNCTION}(%s::jsonb, %s::timestamptz)',
+                                   (json.dumps(chunk), matched_at))
+                    written += cursor.fetchone()[0]
+    return written
+
+
+def print_match_summary(ramp, matches, seconds=None):
+    """Matched / ambiguous / left-over charge counts for a run"""
+    charges = int(((ramp['charge_usd'] > 0) & ~ramp['is_matched']).sum())
+    already = int(ramp['is_matched'].sum())
+    ambiguous = int((matches['candidates'] > 1).sum())
+    timing = f" in {seconds:.2f}s" if seconds is not None else ''
+    print(f"   🔗 Ramp → QB: {len(matches):,} of {charges:,} unmatched charges matched{timing} "
+          f"(${matches['amount'].sum():,.2f}; {ambiguous:,} chosen among several candidates)")
+    by_source = matches['qb_source'].value_counts()
+    if len(by_source):
+        print(f"      {', '.join(f'{source} {count:,}' for source, count in by_source.items())}; "
+              f"{already:,} already matched rows left as they were")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Coverage and shadowing report for the builders' keyword rule tables
+First match wins, so a short keyword early in the table ('mtn', 'ups', 'ach',
+'wire') silently takes transactions from longer rules below it and matches
+inside unrelated words. profile_rules() replays the categorizer over a run's
+search texts and reports, per rule: rows and dollars won, rows where it was
+present but lost, the rules it beat, matching time, and whether it is dead
+(never wins in the data) or statically unreachable (an earlier keyword is a
+substring of it).
+
+Run directly for the static half of the report, straight from the source:
+    python forecast_rule_profile.py forecast_ruleset.json
+which also lists keys repeated inside one table (for a builder .py, inside one
+dict literal - Python keeps the first position and the last value, so the
+earlier entry is silently replaced).
+"""
+
+import ast
+import json
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from forecast_rules import PRIORITY_ORDER, RuleMatcher
+
+PROFILE_FILE = 'BDI_Rule_Profile.xlsx'
+
+
+def static_shadows(matcher):
+    """{rule: earlier rule whose keyword is a substring of it} - rules that can never win"""
+    if matcher.priority != PRIORITY_ORDER:
+        return {}  # under longest-match a contained keyword never beats its container
+    shadowed = {}
+    for later, keyword in enumerate(matcher.keywords):
+        for earlier in range(later):
+            if matcher.keywords[earlier] in keyword:
+                shadowed[later] = earlier
+                break
+    return shadowed
+
+
+def profile_rules(matcher, texts, amounts=None):
+    """
+    One row per rule, in table order
+    Each distinct text is matched once and weighted by its row count and dollars;
+    Scan_ms is the categorizer's matching time on the distinct texts a rule won
+    """
+    texts = pd.Series(texts, dtype=object).fillna('')
+    if amounts is None:
+        amounts = np.zeros(len(texts))
+    amounts = pd.to_numeric(pd.Series(amounts).reset_index(drop=True), errors='coerce').fillna(0).abs()
+    codes, uniques = pd.factorize(texts.reset_index(drop=True))
+    rows = np.bincount(codes, minlength=len(uniques))
+    dollars = np.bincount(codes, weights=amounts.to_numpy(dtype=float), minlength=len(uniques))
+
+    count = len(matcher)
+    hits, won, present, lost = (np.zeros(count, dtype=np.int64) for _ in range(4))
+    won_dollars, scan_seconds = np.zeros(count), np.zeros(count)
+    beaten = [Counter() for _ in range(count)]
+    examples = [''] * count
+    unmatched_rows = 0
+
+    for unique, text in enumerate(uniques):
+        normalized = matcher.normalize(text) if matcher.normalize is not None else text
+        started = time.perf_counter()
+        matcher._scan(normalized)
+        elapsed = time.perf_counter() - started
+
+        found = matcher.matches(text)
+        if not found:
+            unmatched_rows += rows[unique]
+            continue
+        winner = found[0]
+        hits[winner] += rows[unique]
+        won[winner] += 1
+        won_dollars[winner] += dollars[unique]
+        scan_seconds[winner] += elapsed
+        if not examples[winner]:
+            examples[winner] = normalized[:80]
+        for loser in found[1:]:
+            present[loser] += rows[unique]
+            lost[loser] += rows[unique]
+            beaten[winner][loser] += rows[unique]
+        present[winner] += rows[unique]
+
+    unreachable = static_shadows(matcher)
+    keywords = matcher.keywords
+    report = pd.DataFrame({
+        'Rule': range(1, count + 1),
+        'Keyword': keywords,
+        'Value': [str(value) for value in matcher.values],
+        'Hits': hits,
+        'Dollars': won_dollars.round(2),
+        'Distinct_Texts': won,
+        'Present': present,
+        'Lost': lost,
+        'Shadows': [', '.join(f"{keywords[loser]} ({n})" for loser, n in counter.most_common(5))
+                    for counter in beaten],
+        'Unreachable_Behind': [keywords[unreachable[i]] if i in unreachable else '' for i in range(count)],
+        'Scan_ms': (scan_seconds * 1000).round(3),
+        'Dead': hits == 0,
+        'Example': examples,
+    })
+    report.attrs['unmatched_rows'] = int(unmatched_rows)
+    report.attrs['rows'] = int(len(texts))
+    return report
+
+
+def print_rule_profile(report, top=10):
+    """Console summary of a profile_rules() report"""
+    total = report.attrs.get('rows', 0)
+    print(f"\n   🔬 RULE PROFILE: {len(report)} rules over {total:,} rows "
+          f"({report.attrs.get('unmatched_rows', 0):,} matched nothing)")
+    print(f"      {'keyword':30} {'hits':>6} {'dollars':>14} {'lost':>6}  shadows")
+    for _, rule in report.sort_values('Hits', ascending=False).head(top).iterrows():
+        print(f"      {rule['Keyword'][:30]:30} {rule['Hits']:6,} ${rule['Dollars']:>13,.2f} "
+              f"{rule['Lost']:6,}  {rule['Shadows'][:60]}")
+
+    dead = report[report['Dead']]
+    if not dead.empty:
+        print(f"\n      💀 {len(dead)} dead rules (never won): {', '.join(dead['Keyword'])}")
+    unreachable = report[report['Unreachable_Behind'] != '']
+    for _, rule in unreachable.iterrows():
+        print(f"      ⛔ '{rule['Keyword']}' can never win: '{rule['Unreachable_Behind']}' comes first")
+
+
+def literal_rule_tables(path, suffix='_RULES'):
+    """
+    {name: [keyword, ...]} for every module-level NAME_RULES = {...} literal in a builder,
+    read with ast so the builder is not executed
+    Keys keep their source repeats, which a live dict would have collapsed
+    """
+    with open(path) as source:
+        tree = ast.parse(source.read(), path)
+    tables = {}
+    for node in tree.body:
+        if not (isinstance(node, ast.Assign) and isinstance(node.value, ast.Dict)):
+            continue
+        for target in node.targets:
+            if isinstance(target, ast.Name) and target.id.endswith(suffix):
+                tables[target.id] = [
+                    key.value for key in node.value.keys
+                    if isinstance(key, ast.Constant) and isinstance(key.value, str)
+                ]
+    return tables
+
+
+def _keywords(sections):
+    return [rule[0] for rules in sections.values() for rule in rules]
+
+
+def ruleset_tables(path):
+    """
+    {label: {'VENDOR_RULES': [keyword, ...], 'FALLBACK_RULES': [...]}} from a forecast_ruleset.json,
+    repeats kept: the shared rules, then each rule set as its builder compiles it
+    """
+    with open(path) as source:
+        spec = json.load(source)
+    shared = {'VENDOR_RULES': _keywords(spec['vendor_rules'])}
+    fallback = {'FALLBACK_RULES': _keywords(spec['fallback_rules'])}
+    tables = {path: {**shared, **fallback}}
+    for name, rule_set in spec.get('rule_sets', {}).items():
+        tables[f'{path} [{name}]'] = {**shared, f'{name.upper()} VENDOR_RULES': _keywords(rule_set['vendor_rules']),
+                                      **fallback}
+    return tables
+
+
+def profile_tables(label, tables):
+    """Print the repeated and never-winning keywords of one builder's rule tables"""
+    print(f"\n📄 {label}: {', '.join(tables) or 'no *_RULES tables'}")
+    for name, keys in tables.items():
+        repeated = [key for key, n in Counter(keys).items() if n > 1]
+        if repeated:
+            print(f"   🔁 {name} repeats {', '.join(repr(key) for key in repeated)}")
+    if tables:
+        # Checked as if concatenated, in source order - how the builders compile them
+        matcher = RuleMatcher(*({key: name for key in keys} for name, keys in tables.items()))
+        for later, earlier in static_shadows(matcher).items():
+            print(f"   ⛔ '{matcher.keywords[later]}' ({matcher.values[later]}) "
+                  f"can never win: '{matcher.keywords[earlier]}' comes first")
+
+
+def main(paths):
+    for path in paths:
+        labelled = ruleset_tables(path) if path.endswith('.json') else {path: literal_rule_tables(path)}
+        for label, tables in labelled.items():
+            profile_tables(label, tables)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(f"usage: {sys.argv[0]} RULESET.json|BUILDER.py [...]")
+        sys.exit(2)
+    main(sys.argv[1:])
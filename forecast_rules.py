@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Compiled keyword rules for the forecast builders' categorizers
+The builders' {keyword: value} rule dicts are compiled once into an
+Aho-Corasick automaton, so each transaction is categorized in a single pass over
+its search text - the cost no longer grows with the number of rules.
+match_many() categorizes whole columns at once, matching each distinct text once.
+Results are memoized per search text in a bounded LRU, so the few hundred
+repeating payees (Paylocity, Deel, AWS, Flexport...) cost a dict lookup; with a
+normalize function the rules and the memo key on the normalized payee text.
+"""
+
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Which rule wins when several keywords occur in the same text
+PRIORITY_ORDER = 'order'      # first rule in the table (what `for keyword in RULES: if keyword in text` does)
+PRIORITY_LONGEST = 'longest'  # longest keyword, ties to the earlier rule
+
+# Distinct search texts remembered per matcher (0 disables the memo)
+MATCH_CACHE_SIZE = 16384
+
+
+class RuleMatcher:
+    """
+    Substring rules compiled into a DFA
+    rule_maps: one or more ordered {keyword: value} dicts, checked as if concatenated
+    (a keyword repeated in a later dict never wins, same as the loops it replaces)
+    normalize: optional text -> text function applied to keywords at compile time and
+    to every search text before matching (e.g. forecast_vendors.normalize_payee), so
+    rules and the memo key on the normalized text; without it the memo key is the
+    search text itself
+    Texts are scanned with a space at each end, so a keyword that starts or ends
+    with a space (' rent', ' qa ') matches a whole word, at the ends of the text
+    too; keywords without edge spaces match exactly as a plain `in` test would
+    """
+
+    def __init__(self, *rule_maps, priority=PRIORITY_ORDER, cache_size=MATCH_CACHE_SIZE, normalize=None):
+        if priority not in (PRIORITY_ORDER, PRIORITY_LONGEST):
+            raise ValueError(f"Unknown rule priority: {priority}")
+        self.priority = priority
+        self.normalize = normalize
+
+        keywords, self.values = [], []
+        seen = set()
+        for rule_map in rule_maps:
+            for keyword, value in rule_map.items():
+                if normalize is not None:
+                    keyword = normalize(keyword)
+                # A keyword normalized to nothing would match every text
+                if keyword and keyword not in seen:
+                    seen.add(keyword)
+                    keywords.append(keyword)
+                    self.values.append(value)
+        self.keywords = keywords
+
+        # rank[i] = position of rule i under the priority; lower rank wins
+        if priority == PRIORITY_LONGEST:
+            order = sorted(range(len(keywords)), key=lambda i: (-len(keywords[i]), i))
+        else:
+            order = range(len(keywords))
+        self._rule_at_rank = list(order)
+        rank = {rule: position for position, rule in enumerate(order)}
+
+        self._compile([(keyword, rank[i]) for i, keyword in enumerate(keywords)])
+        self.cache_size = cache_size
+        self._winner = lru_cache(maxsize=cache_size)(self._scan)
+
+    def __getstate__(self):
+        # The compiled DFA pickles as plain lists and dicts; the memo starts empty
+        state = self.__dict__.copy()
+        del state['_winner']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._winner = lru_cache(maxsize=self.cache_size)(self._scan)
+
+    def _compile(self, ranked_keywords):
+        # Trie
+        goto, best, ends = [{}], [None], [()]
+        for keyword, rank in ranked_keywords:
+            state = 0
+            for ch in keyword:
+                if ch not in goto[state]:
+                    goto.append({})
+                    best.append(None)
+                    ends.append(())
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            ends[state] += (rank,)
+            if best[state] is None or rank < best[state]:
+                best[state] = rank
+
+        # Failure links, breadth first. Each state's best rank folds in its
+        # failure state's, and goto is completed into a full DFA so matching
+        # never has to walk failure links
+        fail = [0] * len(goto)
+        queue = deque([0])
+        while queue:
+            state = queue.popleft()
+            children = list(goto[state].items())
+            if state:
+                for ch, target in goto[fail[state]].items():
+                    goto[state].setdefault(ch, target)
+            for ch, child in children:
+                fail[child] = goto[fail[state]].get(ch, 0) if state else 0
+                inherited = best[fail[child]]
+                if inherited is not None and (best[child] is None or inherited < best[child]):
+                    best[child] = inherited
+                queue.append(child)
+
+        self._goto = goto
+        self._best = best
+        self._fail = fail
+        self._ends = ends
+
+    def _scan(self, text):
+        """Rank of the winning rule in text (None = no match)"""
+        goto, best = self._goto, self._best
+        state, winner = 0, best[0]
+        for ch in f' {text} ':
+            state = goto[state].get(ch, 0)
+            rank = best[state]
+            if rank is not None and (winner is None or rank < winner):
+                winner = rank
+                if winner == 0:
+                    break
+        return winner
+
+    def matches(self, text):
+        """
+        Indexes of every rule whose keyword occurs in text, winner first
+        Not memoized and walks failure links - for profiling, not categorizing
+        """
+        if self.normalize is not None:
+            text = self.normalize(text)
+        goto, fail, ends = self._goto, self._fail, self._ends
+        found, state = set(), 0
+        for ch in f' {text} ':
+            state = goto[state].get(ch, 0)
+            suffix = state
+            while suffix:
+                found.update(ends[suffix])
+                suffix = fail[suffix]
+        return [self._rule_at_rank[rank] for rank in sorted(found)]
+
+    def rule(self, text, normalized=False):
+        """
+        Index of the winning rule found in text, or None
+        normalized: text has already been through normalize (e.g. a stored search text)
+        """
+        if self.normalize is not None and not normalized:
+            text = self.normalize(text)
+        winner = self._winner(text)
+        if winner is None:
+            return None
+        return self._rule_at_rank[winner]
+
+    def match(self, text, default=None):
+        """Value of the winning rule found in text, or default"""
+        rule = self.rule(text)
+        if rule is None:
+            return default
+        return self.values[rule]
+
+    def cache_info(self):
+        """functools.lru_cache statistics of the search-text memo (hits, misses, maxsize, currsize)"""
+        return self._winner.cache_info()
+
+    def match_many(self, texts, default=None, fields=None):
+        """
+        match() over a column of texts, each distinct text matched once
+        Returns an object array of values; fields=n splits n-tuple values into n arrays
+        """
+        codes, uniques = pd.factorize(pd.Series(texts, dtype=object))
+        values = [self.match(text, default) for text in uniques]
+        if fields is None:
+            matched = np.empty(len(values), dtype=object)
+            matched[:] = values
+            return matched[codes]
+        return tuple(
+            np.array([value[i] for value in values], dtype=object)[codes]
+            for i in range(fields)
+        )
+
+    def __len__(self):
+        return len(self.keywords)
+
+
+def print_cache_summary(*matchers):
+    """Memo hit/miss line for the end of a builder run"""
+    for matcher in matchers:
+        info = matcher.cache_info()
+        lookups = info.hits + info.misses
+        if lookups:
+            print(f"\n🧠 Categorization memo: {info.hits:,} hits / {info.misses:,} misses "
+                  f"({info.hits / lookups:.1%} hit rate, {info.currsize:,} distinct texts cached)")
+
+
+def _as_text(column, index):
+    if not isinstance(column, pd.Series):
+        return pd.Series(str(column), index=index, dtype=object)
+    # numpy's astype(str) calls str() per element: None -> 'None', like an f-string
+    return pd.Series(np.asarray(column, dtype=object).astype(str), index=index, dtype=object)
+
+
+def search_texts(*columns):
+    """
+    Row-wise f"{a} {b} {c}".lower() over row-aligned Series (scalars are broadcast)
+    The vectorized counterpart of the search_text the per-row categorizers build
+    """
+    index = next(column.index for column in columns if isinstance(column, pd.Series))
+    parts = [_as_text(column, index) for column in columns]
+    if len(index) == 0:
+        return pd.Series([], index=index, dtype=object)
+    return parts[0].str.cat(parts[1:], sep=' ').str.lower()
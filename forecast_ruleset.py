@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+The categorization ruleset shared by every forecast builder
+forecast_ruleset.json holds the vendor rules, fallback rules and GL code table
+(grouped into named sections, in priority order). The first load compiles it -
+rule matcher plus GL lookup - and pickles the result to .forecast_cache/ under
+the file's hash; later loads unpickle that artifact until the file changes.
+Its rule_sets are keyword tables kept for the builders that had them
+(iteration2, real_data): a builder loading one gets its vendor rules after the
+shared ones, ahead of the fallbacks. override_categories maps the bookkeeper's
+coarse gl_transaction_overrides categories ('opex', 'labor') to the family of
+ruleset categories they fall in. Builders that don't ask for one - the
+iteration 3 builder among them - categorize with the shared rules alone.
+Rules match the raw lowercased search text: normalize_payee drops numeric tokens,
+so '334843 boundless' would become plain 'boundless' and catch every Boundless
+transfer, wire and refund - it is for vendor grouping only.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+
+from forecast_rules import RuleMatcher
+from forecast_snapshot import SNAPSHOT_DIR
+
+RULESET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'forecast_ruleset.json')
+
+# Bump when Ruleset or RuleMatcher internals change: old artifacts are then ignored
+COMPILER_VERSION = '3'
+
+# What the rules are matched against; CategoryCache normalize_version for the
+# builders, so search texts cached under another version are matched again
+MATCH_TEXT_VERSION = 'raw'
+
+UNCATEGORIZED = ('Uncategorized', '')
+
+
+def _flatten(sections):
+    """{section: [[key, a, b], ...]} -> {key: (a, b)} in file order"""
+    return {key: (a, b) for rules in sections.values() for key, a, b in rules}
+
+
+class Ruleset:
+    """
+    Compiled forecast_ruleset.json
+    vendor_rules / fallback_rules: {keyword: (category, subcategory)}, checked in that order
+    gl_codes: {category: {'gl_code', 'gl_name'}}
+    override_categories: {override category: ruleset category prefix}
+    rule_set: name of the spec's rule_sets entry whose vendor rules follow the shared ones (None = none)
+    """
+
+    def __init__(self, spec, file_hash, rule_set=None):
+        self.version = spec['version']
+        self.file_hash = file_hash
+        self.rule_set = rule_set
+        self.vendor_rules = _flatten(spec['vendor_rules'])
+        if rule_set is not None:
+            if rule_set not in spec.get('rule_sets', {}):
+                raise KeyError(f"forecast_ruleset.json has no rule set {rule_set!r}")
+            for keyword, value in _flatten(spec['rule_sets'][rule_set]['vendor_rules']).items():
+                self.vendor_rules.setdefault(keyword, value)
+        self.fallback_rules = _flatten(spec['fallback_rules'])
+        self.gl_codes = {
+            category: {'gl_code': gl_code, 'gl_name': gl_name}
+            for category, (gl_code, gl_name) in _flatten(spec['gl_codes']).items()
+        }
+        self.gl_subcategory_fallbacks = [tuple(pair) for pair in spec.get('gl_subcategory_fallbacks', [])]
+        self.override_categories = spec.get('override_categories', {})
+        self.matcher = RuleMatcher(self.vendor_rules, self.fallback_rules)
+
+    def categorize(self, search_text):
+        """(category, subcategory) of the first matching rule, or ('Uncategorized', '')"""
+        return self.matcher.match(search_text, UNCATEGORIZED)
+
+    def gl_code(self, category, subcategory=''):
+        """(gl_code, gl_name) for a category, then by subcategory fallbacks; ('', '') if unmapped"""
+        if category in self.gl_codes:
+            return self.gl_codes[category]['gl_code'], self.gl_codes[category]['gl_name']
+        for marker, mapped in self.gl_subcategory_fallbacks:
+            if subcategory and marker in subcategory and mapped in self.gl_codes:
+                return self.gl_codes[mapped]['gl_code'], self.gl_codes[mapped]['gl_name']
+        return '', ''
+
+    def override_label(self, category, account_type=''):
+        """
+        (category, subcategory) in this ruleset's terms for an override's category and
+        account type, or None when no ruleset category fits (e.g. 'revenue', 'loans')
+        Within the override's family, a rule with that subcategory wins, then a GL
+        category named after it ('Engineering' -> 'Labor - R&D - Engineering')
+        """
+        prefix = self.override_categories.get(str(category or '').strip().lower())
+        account = str(account_type or '').strip()
+        if prefix is None or not account:
+            return None
+        wanted = account.lower()
+        for rule_category, subcategory in self.matcher.values:
+            if rule_category.startswith(prefix) and subcategory.lower() == wanted:
+                return rule_category, subcategory
+        for gl_category in self.gl_codes:
+            if gl_category.startswith(prefix) and wanted in gl_category.lower().split(' - ')[1:]:
+                return gl_category, account
+        return None
+
+    def __len__(self):
+        return len(self.matcher)
+
+
+def load_ruleset(path=RULESET_FILE, snapshot_dir=SNAPSHOT_DIR, rule_set=None):
+    """
+    The compiled ruleset: from the cached artifact when the file is unchanged, else compiled and cached
+    rule_set: a rule_sets entry to add after the shared vendor rules (None = shared rules only)
+    """
+    with open(path, 'rb') as source:
+        raw = source.read()
+    file_hash = hashlib.sha256(raw + f'|{COMPILER_VERSION}'.encode()).hexdigest()[:16]
+    name = rule_set or 'shared'
+    artifact = os.path.join(snapshot_dir, f'ruleset-{name}-{file_hash}.pickle')
+
+    if os.path.exists(artifact):
+        try:
+            with open(artifact, 'rb') as cached:
+                return pickle.load(cached)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass  # unreadable or from an older layout: recompile below
+
+    ruleset = Ruleset(json.loads(raw), file_hash, rule_set)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(snapshot_dir, f'ruleset-{name}-*.pickle')):
+        os.remove(stale)
+    partial = f'{artifact}.tmp'
+    with open(partial, 'wb') as out:
+        pickle.dump(ruleset, out, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(partial, artifact)
+    return ruleset
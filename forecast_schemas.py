@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Declared source schemas for the cash forecast builders
+Only the columns the builders actually read are requested, and each batch is
+decoded straight into typed column arrays (no select('*'), no dict-per-row)
+"""
+
+import numpy as np
+import pandas as pd
+
+from forecast_fetch import iter_keyed_batches, iter_table_batches, window_filters
+
+# Column kinds:
+#   'str'   -> object array, NULL -> ''
+#   'money' -> float64, NULL -> 0.0
+#   'date'  -> datetime64[ns], NULL -> NaT
+#   'bool'  -> bool array, NULL -> False
+# 'alias:column' renames in the select (PostgREST syntax), e.g. the reserved word "class"
+SOURCE_SCHEMAS = {
+    'gl_transaction_overrides': [
+        ('id', 'str'),
+        ('transaction_id', 'str'),
+        ('override_category', 'str'),
+        ('override_account_type', 'str'),
+    ],
+    'quickbooks_bills': [
+        ('id', 'str'),
+        ('bill_date', 'date'),
+        ('due_date', 'date'),
+        ('vendor_name', 'str'),
+        ('total_amount', 'money'),
+        ('balance', 'money'),
+    ],
+    'quickbooks_expenses': [
+        ('id', 'str'),
+        ('expense_date', 'date'),
+        ('vendor_name', 'str'),
+        ('memo', 'str'),
+        ('total_amount', 'money'),
+    ],
+    'bank_statements': [
+        ('id', 'str'),
+        ('transaction_date', 'date'),
+        ('description', 'str'),
+        ('amount', 'money'),
+    ],
+    'ramp_transactions': [
+        ('id', 'str'),
+        ('transaction_date', 'date'),
+        ('payee', 'str'),
+        ('memo', 'str'),
+        ('txn_class:class', 'str'),
+        ('charge_usd', 'money'),
+        ('payment_usd', 'money'),
+        ('is_matched', 'bool'),
+        ('matched_qb_transaction_id', 'str'),
+    ],
+}
+
+
+def column_name(field):
+    """Output name of a schema field ('alias:column' -> 'alias')"""
+    return field.split(':', 1)[0]
+
+
+def source_column(field):
+    """Database column of a schema field ('alias:column' -> 'column')"""
+    return field.split(':', 1)[-1]
+
+
+def select_columns(table):
+    """PostgREST select clause for a source"""
+    return ','.join(field for field, _ in SOURCE_SCHEMAS[table])
+
+
+# JSON true, COPY's 't' and SQLite's 1 (snapshots)
+_TRUE = {'true', 't', '1'}
+
+
+def _parse_dates(values):
+    """
+    Naive datetime64 of date / timestamp / timestamptz text, unparseable -> NaT
+    Offsets are converted to UTC first, so a timestamptz reads the same from
+    PostgREST JSON and from COPY whatever the session time zone
+    """
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', utc=True, format='ISO8601')
+    return parsed.dt.tz_localize(None).to_numpy()
+
+
+def _decode_column(values, kind):
+    if kind == 'bool':
+        return np.array([v is not None and str(v).lower() in _TRUE for v in values], dtype=bool)
+    if kind == 'money':
+        return np.array([0.0 if v is None else float(v) for v in values], dtype=np.float64)
+    if kind == 'date':
+        return _parse_dates(values)
+    return np.array(['' if v is None else str(v) for v in values], dtype=object)
+
+
+def decode_rows(table, rows):
+    """Decode a list of PostgREST rows into a typed DataFrame"""
+    columns = {}
+    for field, kind in SOURCE_SCHEMAS[table]:
+        name = column_name(field)
+        columns[name] = _decode_column([row.get(name) for row in rows], kind)
+    return pd.DataFrame(columns)
+
+
+def coerce_frame(table, frame):
+    """Cast an already columnar frame (e.g. parsed from a COPY stream) to the declared kinds"""
+    columns = {}
+    for field, kind in SOURCE_SCHEMAS[table]:
+        name = column_name(field)
+        values = frame[name]
+        if kind == 'money':
+            columns[name] = pd.to_numeric(values, errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+        elif kind == 'date':
+            columns[name] = _parse_dates(values)
+        elif kind == 'bool':
+            columns[name] = values.fillna('').astype(str).str.lower().isin(_TRUE).to_numpy()
+        else:
+            columns[name] = values.fillna('').astype(str).to_numpy(dtype=object)
+    return pd.DataFrame(columns)
+
+
+def empty_frame(table):
+    """Typed, zero-row frame for a source (used when a fetch fails)"""
+    return decode_rows(table, [])
+
+
+def stack_frames(table, frames):
+    """
+    One typed frame from typed parts (decode_rows / coerce_frame output) as they arrive
+    Only each part's column arrays are kept, and the parts are joined one column
+    at a time, so the peak is about one typed copy of the table
+    """
+    names = [column_name(field) for field, _ in SOURCE_SCHEMAS[table]]
+    parts = {name: [] for name in names}
+    for frame in frames:
+        for name in names:
+            parts[name].append(frame[name])
+    if not parts[names[0]]:
+        return empty_frame(table)
+    return pd.DataFrame({name: pd.concat(parts.pop(name), ignore_index=True) for name in names}, copy=False)
+
+
+def decode_batches(table, batches):
+    """Typed frame from an iterable of row batches, each decoded as soon as it is read"""
+    return stack_frames(table, (decode_rows(table, batch) for batch in batches))
+
+
+def fetch_typed(client, table, since=None, until=None, keys=None, **options):
+    """
+    Fetch only the declared columns of a source, decoding batch by batch
+    since/until push a date window into the query (see forecast_fetch.window_filters)
+    keys=(column, values) fetches just the rows whose column is in values
+    """
+    filters = list(options.pop('filters', ())) + window_filters(table, since, until)
+    if keys is not None:
+        key_column, values = keys
+        batches = iter_keyed_batches(client, table, select_columns(table), key_column, values,
+                                     filters=filters, **options)
+    else:
+        batches = iter_table_batches(client, table, select_columns(table), filters=filters, **options)
+    return decode_batches(table, batches)
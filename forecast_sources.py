@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Backend selection and the two-stage source fetch for the cash forecast builders
+Stage 1 pulls the four ledger tables side by side; stage 2 pulls only the
+gl_transaction_overrides rows whose transaction_id is one of the QB bill/expense
+ids just fetched, instead of the whole overrides table
+"""
+
+from forecast_fetch import LEDGER_SOURCES, OVERRIDES_TABLE, fetch_sources
+from forecast_pg import fetch_copy
+from forecast_schemas import empty_frame, fetch_typed
+from forecast_snapshot import fetch_snapshot
+
+# Only QuickBooks rows can carry a GL override
+OVERRIDE_KEY_SOURCES = ['quickbooks_bills', 'quickbooks_expenses']
+
+
+def source_fetcher(backend, supabase=None, dsn=None, snapshot=True, full_refresh=False):
+    """(client, fetch, options) for fetch_sources, per --backend / --no-snapshot / --full-refresh"""
+    if backend == 'postgres':
+        return dsn, fetch_copy, {}
+    if not snapshot:
+        return supabase, fetch_typed, {}
+    return supabase, fetch_snapshot, {'full_refresh': full_refresh}
+
+
+def fetch_forecast_sources(client, fetch, options=None, since=None, until=None):
+    """
+    Fetch the ledger sources, then the overrides that apply to them
+    Returns (frames_by_table, stats_by_table) like fetch_sources
+    """
+    options = {**(options or {}), 'since': since, 'until': until}
+    fetched, stats = fetch_sources(
+        client, {table: options for table in LEDGER_SOURCES}, fetch=fetch, empty=empty_frame
+    )
+
+    ids = set()
+    for table in OVERRIDE_KEY_SOURCES:
+        ids.update(fetched[table]['id'])
+    override_options = {**options, 'keys': ('transaction_id', ids)}
+    override_fetched, override_stats = fetch_sources(
+        client, {OVERRIDES_TABLE: override_options}, fetch=fetch, empty=empty_frame
+    )
+    fetched.update(override_fetched)
+    stats.update(override_stats)
+    return fetched, stats
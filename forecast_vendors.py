@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Canonical vendors for bank, Ramp and QuickBooks payee strings
+Bank descriptions embed account, phone and trace numbers ('boundless1364227403',
+'cable television9186939000') and wire/ACH boilerplate, so one payee shows up
+under dozens of raw strings. normalize_payee() strips the reference numbers and
+punctuation; canonical_vendor() also drops the wire/ACH prefixes and corporate
+suffixes. VendorIndex persists raw string -> canonical vendor id in SQLite, so
+ids are stable across runs and each raw string is canonicalized once. Ids are
+assigned by SQLite itself, so concurrent runs agree on them.
+"""
+
+import os
+import re
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from forecast_snapshot import SNAPSHOT_DIR
+
+VENDOR_INDEX_FILE = 'vendors.sqlite'
+
+# Bump whenever the rules below change: stored aliases are then re-derived
+CANONICAL_VERSION = '1'
+
+_PUNCTUATION = re.compile(r'[^a-z0-9&]+')
+# Standalone numbers (dates, amounts, check numbers) and runs of 4+ digits glued
+# to a word (account, phone and trace numbers)
+_REFERENCE = re.compile(r'\b\d+\b|\d{4,}')
+_SPACES = re.compile(r'\s+')
+
+CHANNEL_PREFIXES = [
+    'outgoing wire', 'incoming wire', 'wire out', 'wire in', 'wire transfer', 'wire',
+    'ach debit', 'ach credit', 'ach pmt', 'ach',
+    'orig co name', 'online transfer to', 'online transfer from', 'online payment to',
+    'debit card purchase', 'pos purchase', 'pos debit', 'checkcard', 'recurring payment',
+    'payment to', 'transfer to', 'transfer from', 'xfer to', 'xfer from',
+]
+CORPORATE_SUFFIXES = ['inc', 'llc', 'llp', 'ltd', 'corp', 'corporation', 'co', 'limited', 'pte', 'gmbh']
+
+_CHANNEL = re.compile(
+    r'^(?:(?:' + '|'.join(re.escape(p) for p in sorted(CHANNEL_PREFIXES, key=len, reverse=True)) + r')\b\s*)+'
+)
+_SUFFIX = re.compile(r'(?:\s+(?:' + '|'.join(CORPORATE_SUFFIXES) + r'))+$')
+
+UNKNOWN_VENDOR = 'unknown'
+
+
+def normalize_payee(text):
+    """
+    Lowercase, punctuation to spaces, reference numbers dropped, whitespace collapsed
+    Keeps every word, so substring rules ('wire', 'ach') still see the channel
+    """
+    text = _PUNCTUATION.sub(' ', str(text).lower())
+    return _SPACES.sub(' ', _REFERENCE.sub(' ', text)).strip()
+
+
+def canonical_vendor(text):
+    """normalize_payee() without the wire/ACH prefix and corporate suffix: the payee alone"""
+    normalized = normalize_payee(text)
+    name = _SUFFIX.sub('', _CHANNEL.sub('', normalized)).strip()
+    # A bare 'WIRE OUT 0412' has no payee left; keep the channel rather than lump it with 'unknown'
+    return name or normalized or UNKNOWN_VENDOR
+
+
+class VendorIndex:
+    """
+    Persisted raw payee string -> canonical vendor id
+    Loaded whole on open; resolve() canonicalizes only strings not seen before,
+    registering new vendors as it goes, and save() writes the new aliases back
+    """
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR):
+        self.path = os.path.join(snapshot_dir, VENDOR_INDEX_FILE)
+        self._new_aliases = {}
+
+        os.makedirs(snapshot_dir, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            conn.execute('CREATE TABLE IF NOT EXISTS vendors (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS aliases (raw TEXT PRIMARY KEY, vendor_id INTEGER NOT NULL)')
+
+            # New canonicalization rules: the stored names may no longer be canonical, so start over
+            stored = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if stored is None or stored[0] != CANONICAL_VERSION:
+                conn.execute('DELETE FROM aliases')
+                conn.execute('DELETE FROM vendors')
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (CANONICAL_VERSION,))
+            conn.commit()
+
+            self.names = dict(conn.execute('SELECT id, name FROM vendors'))
+            self._ids = {name: vendor_id for vendor_id, name in self.names.items()}
+            self._aliases = dict(conn.execute('SELECT raw, vendor_id FROM aliases'))
+        finally:
+            conn.close()
+
+    def _register(self, names):
+        """
+        Ids of vendors not in the index yet, taken from SQLite in one transaction
+        A name another run registered since load gets that run's id
+        """
+        names = [name for name in dict.fromkeys(names) if name not in self._ids]
+        if not names:
+            return
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                conn.executemany('INSERT OR IGNORE INTO vendors (name) VALUES (?)', ((name,) for name in names))
+                for name in names:
+                    vendor_id = conn.execute('SELECT id FROM vendors WHERE name = ?', (name,)).fetchone()[0]
+                    self.names[vendor_id] = name
+                    self._ids[name] = vendor_id
+        finally:
+            conn.close()
+
+    def vendor_id(self, raw):
+        """Canonical vendor id for one raw string, registering it if new"""
+        raw = '' if raw is None else str(raw)
+        vendor_id = self._aliases.get(raw)
+        if vendor_id is None:
+            name = canonical_vendor(raw)
+            self._register([name])
+            vendor_id = self._aliases[raw] = self._new_aliases[raw] = self._ids[name]
+        return vendor_id
+
+    def resolve(self, column):
+        """
+        (vendor ids, canonical names) arrays for a column of raw strings
+        Each distinct raw string is looked up once
+        """
+        raw = pd.Series(column, dtype=object).fillna('')
+        codes, uniques = pd.factorize(raw)
+        self._register(canonical_vendor(value) for value in uniques if str(value) not in self._aliases)
+        ids = np.array([self.vendor_id(value) for value in uniques], dtype=np.int64)
+        names = np.empty(len(ids), dtype=object)
+        names[:] = [self.names[vendor_id] for vendor_id in ids]
+        return ids[codes], names[codes]
+
+    def save(self):
+        """Write aliases first seen since load (vendors are written as they are registered); returns their number"""
+        if not self._new_aliases:
+            return 0
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.executemany('INSERT OR REPLACE INTO aliases VALUES (?, ?)', self._new_aliases.items())
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        saved = len(self._new_aliases)
+        self._new_aliases = {}
+        return saved
+
+    def __len__(self):
+        return len(self.names)
+
+
+def print_vendor_summary(raw, ids):
+    """Raw-string vs canonical-vendor line for a builder run"""
+    print(f"   🏷️  {pd.Series(raw, dtype=object).nunique():,} raw payee strings → "
+          f"{len(np.unique(ids)):,} canonical vendors")
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Every sheet of the bookkeeper workbook from one pass over the transaction table
+Category families ('Labor', 'OpEx', 'NRE|R&D'...) are tested once per distinct
+category, not once per row per sheet; dates are formatted and bucketed into
+weeks once per distinct date. The table is grouped by category a single time:
+detail sheets are slices of those groups, and the summary sheets (Labor
+Summary, Weekly by GL Code) are re-aggregations of one
+category/subcategory/GL/vendor/week rollup. Adding a sheet adds a slice, not
+another scan of the full frame.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from forecast_frame import dollars, to_cents
+from forecast_neighbors import suggest_categories, vendor_category_index
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# Sheet family -> pattern searched in the Category (a category can be in several)
+FAMILIES = {
+    'Labor': 'Labor',
+    'OpEx': 'OpEx',
+    'Inventory': 'Inventory',
+    'NRE_RD': 'NRE|R&D',
+    'Operations': 'Operations',
+}
+
+ROLLUP_KEYS = ['Category', 'Subcategory', 'GL_Code', 'GL_Name', 'Canonical_Vendor', 'Week']
+
+
+def _per_date(dates, convert, missing=np.nan):
+    """convert() applied to the distinct dates only, broadcast back (NaT -> missing)"""
+    codes, uniques = pd.factorize(pd.Series(dates))
+    converted = np.asarray(convert(pd.DatetimeIndex(uniques)))
+    if converted.dtype.kind != 'M':
+        converted = converted.astype(object)
+    # factorize codes NaT as -1, which picks the appended missing value
+    return np.append(converted, [missing])[codes]
+
+
+def date_columns(df):
+    """Formatted Date/Due_Date and Week label ('2025-01-06/2025-01-12'), each computed once"""
+    return pd.DataFrame({
+        'Date_Text': _per_date(df['Date'], lambda days: days.strftime(DATE_FORMAT)),
+        'Due_Date_Text': _per_date(df['Due_Date'], lambda days: days.strftime(DATE_FORMAT)),
+        'Week_Label': _per_date(df['Date'], lambda days: days.to_period('W').astype(str)),
+    }, index=df.index)
+
+
+def family_categories(categories):
+    """{family: the categories in it}, each pattern tested once per distinct category"""
+    return {family: [category for category in categories if re.search(pattern, str(category))]
+            for family, pattern in FAMILIES.items()}
+
+
+def _rows(groups, categories):
+    """Positions of the rows in any of categories, in table order"""
+    members = [groups[category] for category in categories if category in groups]
+    return np.sort(np.concatenate(members)) if members else np.array([], dtype=np.int64)
+
+
+def _detail(df, dates, rows, columns):
+    """Detail sheet: the rows in table order, dates swapped for their formatted text"""
+    detail = df.iloc[rows][columns].copy()
+    if 'Date' in columns:
+        detail['Date'] = dates['Date_Text'].iloc[rows].to_numpy()
+    if 'Due_Date' in columns:
+        detail['Due_Date'] = dates['Due_Date_Text'].iloc[rows].to_numpy()
+    return detail
+
+
+def week_starts(dates):
+    """Monday of each date's week (NaT stays NaT)"""
+    return _per_date(dates, lambda days: days.to_period('W').start_time, np.datetime64('NaT'))
+
+
+def _weekly_pivot(cents):
+    """[GL_Code, GL_Name, Category] x Week dollars from cents indexed by those four, plus Total, largest first"""
+    table = cents.unstack('Week', fill_value=0).sort_index().sort_index(axis=1)
+    total = table.sum(axis=1)
+    pivot = pd.DataFrame(dollars(table), index=table.index, columns=table.columns)
+    pivot['Total'] = dollars(total)
+    return pivot.iloc[np.argsort(-total.to_numpy(), kind='stable')]
+
+
+def summary_tables(df):
+    """
+    {'By Category', 'Labor Summary', 'Weekly by GL Code'} from one
+    category/subcategory/GL/vendor/week rollup of the transaction table
+    Keys come back as plain strings, totals are summed in cents and ties keep key
+    order, so forecast_polars.summary_tables() returns identical frames
+    """
+    keyed = df[ROLLUP_KEYS[:-1] + ['Amount_Cents']].assign(Week=week_starts(df['Date']), Rows=1)
+    rollup = keyed.groupby(ROLLUP_KEYS, observed=True, dropna=False)[['Amount_Cents', 'Rows']].sum().reset_index()
+    rollup = rollup.astype({key: object for key in ROLLUP_KEYS[:-1]})
+    tables = {}
+
+    by_category = rollup.groupby('Category')[['Rows', 'Amount_Cents']].sum()
+    by_category = by_category.iloc[np.argsort(-by_category['Amount_Cents'].to_numpy(), kind='stable')]
+    tables['By Category'] = pd.DataFrame({'count': by_category['Rows'],
+                                          'sum': dollars(by_category['Amount_Cents'])}, index=by_category.index)
+
+    labor = rollup[rollup['Category'].str.contains(FAMILIES['Labor'], regex=True)]
+    if not labor.empty:
+        labor_summary = labor.groupby(['Category', 'Subcategory', 'GL_Code', 'Canonical_Vendor'],
+                                      dropna=False)['Amount_Cents'].sum().reset_index()
+        labor_summary['Amount'] = dollars(labor_summary.pop('Amount_Cents'))
+        tables['Labor Summary'] = labor_summary.sort_values(['Category', 'Amount'], ascending=[True, False],
+                                                            ignore_index=True)
+
+    weekly = rollup[(rollup['GL_Code'] != '') & rollup['Week'].notna()]
+    if not weekly.empty:
+        tables['Weekly by GL Code'] = _weekly_pivot(
+            weekly.groupby(['GL_Code', 'GL_Name', 'Category', 'Week'])['Amount_Cents'].sum()
+        )
+    return tables
+
+
+def aggregate_tables(weekly):
+    """
+    {'By Category', 'Weekly by GL Code'} from server-side weekly totals (Week,
+    Category, GL_Code, GL_Name, Amount, txn_count - forecast_aggregates rows),
+    built the way summary_tables() builds them from transactions, so a
+    summary-only workbook's sheets have the full workbook's layout
+    """
+    rollup = weekly.assign(Amount_Cents=to_cents(weekly['Amount']), Rows=weekly['txn_count'])
+    tables = {}
+
+    by_category = rollup.groupby('Category')[['Rows', 'Amount_Cents']].sum()
+    by_category = by_category.iloc[np.argsort(-by_category['Amount_Cents'].to_numpy(), kind='stable')]
+    tables['By Category'] = pd.DataFrame({'count': by_category['Rows'],
+                                          'sum': dollars(by_category['Amount_Cents'])}, index=by_category.index)
+
+    dated = rollup[(rollup['GL_Code'] != '') & rollup['Week'].notna()]
+    if not dated.empty:
+        tables['Weekly by GL Code'] = _weekly_pivot(
+            dated.groupby(['GL_Code', 'GL_Name', 'Category', 'Week'])['Amount_Cents'].sum()
+        )
+    return tables
+
+
+def workbook_views(df, summaries=None, duplicates=None):
+    """
+    [(sheet name, frame, write index)] for the v4 bookkeeper workbook, in sheet order
+    df: the analyzed transaction table, sorted newest first, with Amount/Balance
+    dollars, Amount_Cents and Canonical_Vendor; empty views are left out
+    summaries: summary_tables() output from either engine (computed here if None)
+    duplicates: the rows forecast_dedup.dedupe_sources() dropped (sheet left out if None)
+    """
+    df = df.reset_index(drop=True)
+    dates = date_columns(df)
+    groups = df.groupby('Category', observed=True, sort=False).indices
+    families = family_categories(groups)
+    if summaries is None:
+        summaries = summary_tables(df)
+    views = []
+
+    # Sheet 1: All Expenses (Master List)
+    export_columns = ['Date', 'Source', 'Vendor', 'Category', 'Subcategory', 'GL_Code', 'GL_Name', 'Amount',
+                      'Status', 'Balance', 'Due_Date', 'Categorized_By']
+    if 'Linked_IDs' in df:
+        export_columns.append('Linked_IDs')
+    views.append(('All Expenses', _detail(df, dates, np.arange(len(df)), export_columns), False))
+
+    # Sheet 2: LABOR DETAILED (for payroll breakdown) + Labor Summary by Category
+    labor_rows = _rows(groups, families['Labor'])
+    if len(labor_rows):
+        labor_detail = _detail(df, dates, labor_rows, ['Date', 'Vendor', 'Category', 'Subcategory', 'GL_Code', 'Amount', 'Status'])
+        labor_detail['Week'] = dates['Week_Label'].iloc[labor_rows].to_numpy()
+        labor_detail = labor_detail.sort_values('Category', kind='stable')
+        views.append(('Labor Detail', labor_detail, False))
+        views.append(('Labor Summary', summaries['Labor Summary'], False))
+
+    # Sheets 3-6: OPEX DETAILED, INVENTORY/COGS, NRE/R&D, Operations (Repair Center)
+    for sheet, family, columns in [
+        ('OpEx Detail', 'OpEx', ['Date', 'Vendor', 'Subcategory', 'GL_Code', 'Amount']),
+        ('Inventory_COGS', 'Inventory', ['Date', 'Vendor', 'Subcategory', 'GL_Code', 'Amount', 'Status', 'Balance', 'Due_Date']),
+        ('NRE_RD', 'NRE_RD', ['Date', 'Vendor', 'Subcategory', 'GL_Code', 'Amount']),
+        ('Operations', 'Operations', ['Date', 'Vendor', 'Subcategory', 'GL_Code', 'Amount']),
+    ]:
+        rows = _rows(groups, families[family])
+        if len(rows):
+            views.append((sheet, _detail(df, dates, rows, columns), False))
+
+    # Sheet 7: Weekly Summary by GL Code
+    if 'Weekly by GL Code' in summaries:
+        views.append(('Weekly by GL Code', summaries['Weekly by GL Code'], True))
+
+    # Sheet 8: Cross-source duplicates, each against the record it was folded into
+    if duplicates is not None and len(duplicates):
+        views.append(('Duplicates Removed', duplicates.assign(
+            Date=duplicates['Date'].dt.strftime(DATE_FORMAT),
+            Kept_Date=duplicates['Kept_Date'].dt.strftime(DATE_FORMAT),
+        ), False))
+
+    # Sheet 9: Uncategorized (Needs Review)
+    uncategorized = _rows(groups, ['Uncategorized'])
+    if len(uncategorized):
+        uncat_df = _detail(df, dates, uncategorized, ['Date', 'Vendor', 'Canonical_Vendor', 'Amount', 'Source'])
+        # Closest already-categorized vendors, as a starting point for the bookkeeper
+        neighbors = vendor_category_index(df)
+        if len(neighbors):
+            uncat_df = uncat_df.join(suggest_categories(neighbors, uncat_df['Canonical_Vendor']))
+        uncat_df = uncat_df.sort_values('Amount', ascending=False)
+        views.append(('Needs Review', uncat_df, False))
+
+    return views
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Match Ramp charges to QuickBooks expenses and bills
+Fills ramp_transactions.is_matched / matched_qb_transaction_id / matched_at for
+every charge with a QuickBooks row at the same amount within a few days (see
+forecast_ramp_match). Rows already marked matched - before the run or while it
+was matching - are never touched.
+"""
+
+import argparse
+import atexit
+import os
+import time
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from forecast_fetch import fetch_sources, print_fetch_summary, resolve_window
+from forecast_http import create_pooled_client, print_transport_summary
+from forecast_pg import get_dsn
+from forecast_ramp_match import (MATCH_WINDOW_DAYS, RAMP_MATCH_FILE, WRITE_CHUNK_SIZE, match_ramp,
+                                 print_match_summary, qb_window, write_matches, write_matches_pg)
+from forecast_schemas import empty_frame
+from forecast_sources import source_fetcher
+
+MATCH_SOURCES = ['ramp_transactions', 'quickbooks_expenses', 'quickbooks_bills']
+
+parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+parser.add_argument('--backend', choices=['supabase', 'postgres'],
+                    default=os.getenv('FORECAST_BACKEND', 'supabase'),
+                    help='supabase = PostgREST (+ local snapshots); postgres = COPY over DATABASE_URL')
+parser.add_argument('--full-refresh', action='store_true',
+                    help='discard the local snapshots in .forecast_cache/ and re-download every table')
+parser.add_argument('--no-snapshot', action='store_true',
+                    help='read straight from Supabase, bypassing the local snapshots')
+parser.add_argument('--since', help='first transaction date to match (YYYY-MM-DD)')
+parser.add_argument('--until', help='last transaction date to match (YYYY-MM-DD)')
+parser.add_argument('--weeks-back', type=int,
+                    help='match this many whole weeks before the current week (ignored with --since)')
+parser.add_argument('--window', type=int, default=MATCH_WINDOW_DAYS,
+                    help=f'days a QuickBooks row may be from its Ramp charge (default {MATCH_WINDOW_DAYS})')
+parser.add_argument('--chunk-size', type=int, default=WRITE_CHUNK_SIZE,
+                    help=f'matches per write-back call (default {WRITE_CHUNK_SIZE})')
+parser.add_argument('--dry-run', action='store_true',
+                    help=f'only save the matches to {RAMP_MATCH_FILE}; write nothing back')
+args = parser.parse_args()
+
+load_dotenv('.env.local')
+
+SUPABASE_URL = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
+SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+DATABASE_URL = get_dsn()
+
+if args.backend == 'postgres':
+    if not DATABASE_URL:
+        print("❌ Missing DATABASE_URL for the postgres backend")
+        exit(1)
+elif not SUPABASE_URL or not SUPABASE_KEY:
+    print("❌ Missing Supabase credentials")
+    exit(1)
+
+supabase = None
+if args.backend == 'supabase':
+    supabase = create_pooled_client(SUPABASE_URL, SUPABASE_KEY)
+    atexit.register(print_transport_summary, supabase.transport_stats)
+
+print("=" * 80)
+print("🔗 RAMP → QUICKBOOKS MATCHING")
+print("=" * 80)
+
+# =============================================================================
+# PULL DATA
+# =============================================================================
+print("\n1️⃣ Pulling Ramp and QuickBooks rows from BOSS...")
+
+since, until = resolve_window(args.since, args.until, args.weeks_back)
+if since or until:
+    print(f"   📅 Window: {since or 'start'} → {until or 'latest'}")
+
+fetch_started = time.perf_counter()
+client, fetch, fetch_options = source_fetcher(
+    args.backend, supabase, DATABASE_URL, snapshot=not args.no_snapshot, full_refresh=args.full_refresh
+)
+# QuickBooks rows up to --window days outside the Ramp window can still match a charge inside it
+qb_since, qb_until = qb_window(since, until, args.window)
+options = {table: {**fetch_options, 'since': qb_since, 'until': qb_until} for table in MATCH_SOURCES}
+options['ramp_transactions'] = {**fetch_options, 'since': since, 'until': until}
+fetched, fetch_stats = fetch_sources(client, options, fetch=fetch, empty=empty_frame)
+print_fetch_summary(fetch_stats, time.perf_counter() - fetch_started)
+
+failed = [table for table, stats in fetch_stats.items() if stats['error']]
+if failed:
+    # A missing QB table would leave every charge unmatched, not wrongly matched - but say so and stop
+    print(f"   ❌ Could not fetch {', '.join(failed)}; nothing matched")
+    exit(1)
+
+ramp = fetched['ramp_transactions']
+
+# =============================================================================
+# MATCH
+# =============================================================================
+print(f"\n2️⃣ Matching {len(ramp):,} Ramp rows...")
+
+match_started = time.perf_counter()
+matches = match_ramp(ramp, fetched['quickbooks_bills'], fetched['quickbooks_expenses'], args.window)
+print_match_summary(ramp, matches, time.perf_counter() - match_started)
+
+report = matches.copy()
+report['transaction_date'] = report['transaction_date'].dt.strftime('%Y-%m-%d')
+report['qb_date'] = report['qb_date'].dt.strftime('%Y-%m-%d')
+report.to_excel(RAMP_MATCH_FILE, index=False)
+print(f"   ✅ Matches saved: {RAMP_MATCH_FILE}")
+
+# =============================================================================
+# WRITE BACK
+# =============================================================================
+if args.dry_run:
+    print("\n3️⃣ Dry run: ramp_transactions left unchanged")
+elif matches.empty:
+    print("\n3️⃣ Nothing to write back")
+else:
+    print(f"\n3️⃣ Writing {len(matches):,} matches to ramp_transactions...")
+    matched_at = datetime.now(timezone.utc).isoformat()
+    write_started = time.perf_counter()
+    if args.backend == 'postgres':
+        written = write_matches_pg(DATABASE_URL, matches, matched_at, args.chunk_size)
+    else:
+        written = write_matches(supabase, matches, matched_at, args.chunk_size)
+    chunks = -(-len(matches) // args.chunk_size)
+    print(f"   ✅ {written:,} rows marked matched in {chunks:,} chunks ({time.perf_counter() - write_started:.2f}s)")
+    if written < len(matches):
+        print(f"   ⚠️  {len(matches) - written:,} charges were matched (or their QB rows claimed) since the read; "
+              f"left as they were")
+
+print("\n" + "=" * 80)
+print("✅ RAMP MATCHING COMPLETE")
+print("=" * 80)
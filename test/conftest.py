@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The forecast_* modules live at the repo root, next to the builders that import them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,90 @@
+"""In-memory stand-in for the supabase client's PostgREST query builder"""
+
+import re
+
+# (date, id) keyset: "<col>.gt."<date>",and(<col>.eq."<date>",id.gt."<id>")"
+_KEYSET = re.compile(r'^(\w+)\.gt\."(.*)",and\(\1\.eq\."(.*)",id\.gt\."(.*)"\)$')
+
+
+class Query:
+    """The slice of the PostgREST query builder _iter_pages uses, over in-memory rows"""
+
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+        self.negate = False
+        self.order_by = []
+        self.page = None
+
+    def select(self, columns):
+        # 'alias:column' renames, as PostgREST does
+        self.columns = [column.strip().split(':', 1) for column in columns.split(',')]
+        return self
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def is_(self, column, value):
+        negate, self.negate = self.negate, False
+        self.rows = [row for row in self.rows if (row[column] is None) != negate]
+        return self
+
+    def gte(self, column, value):
+        self.rows = [row for row in self.rows if row[column] is not None and row[column] >= value]
+        return self
+
+    def lte(self, column, value):
+        self.rows = [row for row in self.rows if row[column] is not None and row[column] <= value]
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.rows = [row for row in self.rows if row[column] in values]
+        return self
+
+    def gt(self, column, value):
+        self.rows = [row for row in self.rows if row[column] > value]
+        return self
+
+    def or_(self, expression):
+        self.client.keysets.append(expression)
+        # Unquoted values would not parse: the timestamp's ':' and '.' are PostgREST syntax
+        column, after, same, last_id = _KEYSET.match(expression).groups()
+        assert after == same
+        self.rows = [row for row in self.rows
+                     if row[column] > after or (row[column] == after and row['id'] > last_id)]
+        return self
+
+    def order(self, column):
+        self.order_by.append(column)
+        return self
+
+    def limit(self, count):
+        self.page = count
+        return self
+
+    def execute(self):
+        rows = sorted(self.rows, key=lambda row: tuple(row[column] for column in self.order_by))
+        data = [{field[0]: row[field[-1]] for field in self.columns} for row in rows[:self.page]]
+        self.client.pages.append(data)
+        return type('Result', (), {'data': data})()
+
+
+class FakeClient:
+    """
+    table(name) queries over a list of row dicts (or {table: rows}); records each
+    keyset filter, returned page and queried table
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.keysets = []
+        self.pages = []
+        self.tables = []
+
+    def table(self, name):
+        self.tables.append(name)
+        rows = self.rows[name] if isinstance(self.rows, dict) else self.rows
+        return Query(self, list(rows))
@@ -0,0 +1,186 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from forecast_aggregates import WEEKLY_SPEND_COLUMNS, WEEKLY_SPEND_FUNCTION, rules_payload
+from forecast_rules import RuleMatcher, search_texts
+from forecast_ruleset import UNCATEGORIZED, load_ruleset
+from forecast_vendors import normalize_payee
+from forecast_views import aggregate_tables, summary_tables, week_starts
+
+# One fixture for both paths: the rows as they sit in Postgres (NULLs and all)
+FIXTURE = {
+    'quickbooks_bills': [
+        {'id': 'b1', 'bill_date': '2025-01-06', 'vendor_name': 'Gryphon Networks', 'total_amount': 12000.0},
+        {'id': 'b2', 'bill_date': '2025-01-05', 'vendor_name': 'Office Rent October', 'total_amount': 4500.0},
+        {'id': 'b3', 'bill_date': None, 'vendor_name': 'MTN High-Technology', 'total_amount': 90000.0},
+    ],
+    'quickbooks_expenses': [
+        {'id': 'e1', 'expense_date': '2025-01-07', 'vendor_name': 'Paylocity', 'memo': None, 'total_amount': 3100.25},
+        {'id': 'e2', 'expense_date': '2025-01-08', 'vendor_name': None, 'memo': 'FedEx shipping', 'total_amount': 88.4},
+        {'id': 'e3', 'expense_date': '2025-01-12', 'vendor_name': 'Salesforce.com', 'memo': '', 'total_amount': 0.0},
+    ],
+    'bank_statements': [
+        {'id': 's1', 'transaction_date': '2025-01-06', 'description': 'WIRE/OUT 0412 BOUNDLESS DEVICES',
+         'amount': -25.0},
+        {'id': 's2', 'transaction_date': '2025-01-06', 'description': '334843 BOUNDLESS PAYROLL', 'amount': -52000.0},
+        {'id': 's3', 'transaction_date': '2025-01-13', 'description': 'CORPORATE XFER TO BOUNDLESS DEVICES INC',
+         'amount': -10000.0},
+        {'id': 's4', 'transaction_date': '2025-01-13', 'description': 'BOUNDLESS DEVICES INC REFUND', 'amount': 300.0},
+        {'id': 's5', 'transaction_date': '2025-01-14', 'description': 'XFER FROM CURRENT ACCOUNT', 'amount': -700.0},
+    ],
+    'ramp_transactions': [
+        {'id': 'r1', 'transaction_date': '2025-01-09', 'payee': 'Zoom.us', 'memo': None, 'class': None,
+         'charge_usd': 15.99, 'payment_usd': None},
+        {'id': 'r2', 'transaction_date': '2025-01-19', 'payee': 'Amazon Web Services', 'memo': 'October',
+         'class': 'R&D', 'charge_usd': 0.0, 'payment_usd': -410.0},
+        {'id': 'r3', 'transaction_date': '2025-01-20', 'payee': 'Warehouse Lease', 'memo': None, 'class': None,
+         'charge_usd': 2500.0, 'payment_usd': None},
+    ],
+}
+
+
+@pytest.fixture(scope='module')
+def matcher(tmp_path_factory):
+    return load_ruleset(snapshot_dir=str(tmp_path_factory.mktemp('forecast_cache'))).matcher
+
+
+def _frame(table):
+    return pd.DataFrame(FIXTURE[table])
+
+
+def _text(value):
+    # Typed source frames hold NULL text as '' (forecast_schemas 'str')
+    return value.fillna('')
+
+
+def _python_texts():
+    """Each source's search texts, built as the builders build them"""
+    bills, expenses = _frame('quickbooks_bills'), _frame('quickbooks_expenses')
+    bank, ramp = _frame('bank_statements'), _frame('ramp_transactions')
+    return [
+        search_texts(_text(bills['vendor_name']), _text(bills['vendor_name']), ''),
+        search_texts(_text(expenses['vendor_name']), _text(expenses['vendor_name']), _text(expenses['memo'])),
+        search_texts(_text(bank['description']), _text(bank['description']), ''),
+        search_texts(_text(ramp['payee']), _text(ramp['memo']), _text(ramp['class'])),
+    ]
+
+
+def _python_weekly(matcher):
+    """The builders' path: search_texts() through the RuleMatcher, summed per Monday week"""
+    bills, expenses = _frame('quickbooks_bills'), _frame('quickbooks_expenses')
+    bank, ramp = _frame('bank_statements'), _frame('ramp_transactions')
+    ramp_amount = ramp['charge_usd'].where(ramp['charge_usd'] != 0, ramp['payment_usd']).fillna(0)
+    parts = zip(
+        ['QB Bill', 'QB Expense', 'Bank', 'Ramp'],
+        [bills['bill_date'], expenses['expense_date'], bank['transaction_date'], ramp['transaction_date']],
+        # Bank credits are income, not spend
+        [bills['total_amount'], expenses['total_amount'], bank['amount'].where(bank['amount'] < 0, 0), ramp_amount],
+        _python_texts(),
+    )
+    rows = []
+    for source, dates, amounts, texts in parts:
+        for date, amount, text in zip(dates, amounts.abs(), texts):
+            if pd.isna(date) or amount <= 0:
+                continue
+            category, subcategory = matcher.match(text, UNCATEGORIZED)
+            week = pd.Timestamp(date).to_period('W').start_time
+            rows.append((week, source, category, subcategory, amount))
+    frame = pd.DataFrame(rows, columns=['week_start', 'source', 'category', 'subcategory', 'amount'])
+    return (frame.groupby(['week_start', 'source', 'category', 'subcategory'])
+            .agg(amount=('amount', 'sum'), txn_count=('amount', 'size')).reset_index())
+
+
+def _sql_first_rule(payload, text):
+    """forecast_weekly_spend()'s rule lookup: lowest ordinal non-empty keyword with position() > 0"""
+    for keyword, category, subcategory in payload:
+        if keyword and keyword in f' {text} ':
+            return category, subcategory
+    return UNCATEGORIZED
+
+
+@pytest.mark.parametrize('rule_set', [None, 'iteration2', 'real_data'])
+def test_payload_picks_the_same_rule_as_the_matcher(tmp_path, rule_set):
+    matcher = load_ruleset(snapshot_dir=str(tmp_path), rule_set=rule_set).matcher
+    payload = rules_payload(matcher)
+    texts = [text for texts in _python_texts() for text in texts]
+    # Every keyword on its own and inside a longer text, plus the fixture's texts
+    texts += [keyword for keyword, _, _ in payload] + [f'paid {keyword} inv 1001' for keyword, _, _ in payload]
+    for text in texts:
+        assert _sql_first_rule(payload, text) == matcher.match(text, UNCATEGORIZED), text
+
+
+def test_payload_drops_repeated_and_empty_keywords():
+    matcher = RuleMatcher({'': ('Everything', ''), 'aws': ('OpEx', 'AWS')}, {'aws': ('Other', '')})
+    assert rules_payload(matcher) == [['aws', 'OpEx', 'AWS']]
+
+
+def test_payload_refuses_a_normalizing_matcher():
+    with pytest.raises(ValueError):
+        rules_payload(RuleMatcher({'aws': ('OpEx', 'AWS')}, normalize=normalize_payee))
+
+
+TEMP_TABLES = {
+    'quickbooks_bills': 'id TEXT, bill_date DATE, vendor_name TEXT, total_amount NUMERIC',
+    'quickbooks_expenses': 'id TEXT, expense_date DATE, vendor_name TEXT, memo TEXT, total_amount NUMERIC',
+    'bank_statements': 'id TEXT, transaction_date DATE, description TEXT, amount NUMERIC',
+    'ramp_transactions': ('id TEXT, transaction_date DATE, payee TEXT, memo TEXT, class TEXT, '
+                          'charge_usd NUMERIC, payment_usd NUMERIC'),
+    'gl_transaction_overrides': 'id SERIAL, transaction_id TEXT, override_category TEXT, override_account_type TEXT',
+}
+
+
+@pytest.mark.skipif(not os.getenv('DATABASE_URL'), reason='needs DATABASE_URL with forecast_weekly_spend() installed')
+def test_sql_and_python_weekly_spend_agree(matcher):
+    psycopg = pytest.importorskip('psycopg')
+    with psycopg.connect(os.environ['DATABASE_URL']) as conn:
+        with conn.cursor() as cursor:
+            # Temporary tables shadow the real ones for this session only (pg_temp comes first)
+            for table, columns in TEMP_TABLES.items():
+                cursor.execute(f'CREATE TEMP TABLE {table} ({columns}) ON COMMIT DROP')
+            for table, rows in FIXTURE.items():
+                columns = list(rows[0])
+                quoted = ', '.join(f'"{column}"' for column in columns)
+                cursor.executemany(f'INSERT INTO {table} ({quoted}) VALUES ({", ".join(["%s"] * len(columns))})',
+                                   [tuple(row[column] for column in columns) for row in rows])
+            cursor.execute(
+                f'SELECT {", ".join(WEEKLY_SPEND_COLUMNS)} FROM {WEEKLY_SPEND_FUNCTION}(%s::jsonb) '
+                'ORDER BY week_start, source, category, subcategory',
+                (json.dumps(rules_payload(matcher)),),
+            )
+            server = pd.DataFrame(cursor.fetchall(), columns=WEEKLY_SPEND_COLUMNS)
+        conn.rollback()
+
+    server['week_start'] = pd.to_datetime(server['week_start'])
+    server['amount'] = server['amount'].astype(float)
+    expected = _python_weekly(matcher).sort_values(['week_start', 'source', 'category', 'subcategory'])
+    pd.testing.assert_frame_equal(server.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False)
+
+
+def test_summary_only_tables_match_the_full_workbook(matcher, tmp_path):
+    ruleset = load_ruleset(snapshot_dir=str(tmp_path))
+    rows = [
+        ('2025-01-06', 'paylocity payroll', 3_100.25), ('2025-01-08', 'paylocity payroll', 3_100.25),
+        ('2025-01-07', 'zoom.us', 15.99), ('2025-01-14', 'amazon web services', 410.0),
+        ('2025-01-15', 'cooley llp legal', 0.5), ('2025-01-15', 'unknown payee', 77.0),
+    ]
+    df = pd.DataFrame(rows, columns=['Date', 'Vendor', 'Amount'])
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['Category'], df['Subcategory'] = matcher.match_many(df['Vendor'], UNCATEGORIZED, fields=2)
+    gl = [ruleset.gl_code(c, s) for c, s in zip(df['Category'], df['Subcategory'])]
+    df['GL_Code'], df['GL_Name'] = [code for code, _ in gl], [name for _, name in gl]
+    df['Canonical_Vendor'] = df['Vendor']
+    df['Amount_Cents'] = (df['Amount'] * 100).round().astype('int64')
+
+    # What forecast_weekly_spend() returns for these rows, GL-coded as the summary-only run does
+    weekly = (df.assign(Week=week_starts(df['Date']))
+              .groupby(['Week', 'Category', 'Subcategory', 'GL_Code', 'GL_Name'])
+              .agg(Amount=('Amount', 'sum'), txn_count=('Amount', 'size')).reset_index())
+
+    full, summary = summary_tables(df), aggregate_tables(weekly)
+    for name in ['By Category', 'Weekly by GL Code']:
+        pd.testing.assert_frame_equal(summary[name], full[name], check_names=False)
+
@@ -0,0 +1,80 @@
+import sqlite3
+
+import pandas as pd
+
+from forecast_category_cache import CategoryCache, changed_keywords, ruleset_fingerprint
+from forecast_rules import RuleMatcher
+
+RULES = {
+    'paylocity': ('Labor - Payroll', 'Payroll'),
+    'google ads': ('OpEx - Marketing', 'Advertising'),
+    'google': ('OpEx - IT/Software', 'Google Workspace'),
+    'aws': ('OpEx - IT/Software', 'Cloud'),
+    'flexport': ('COGS - Freight', 'Freight'),
+}
+TEXTS = pd.Series([
+    'paylocity payroll 0301',
+    'google ads march',
+    'google workspace',
+    'aws invoice',
+    'flexport shipment 12',
+    'coffee shop',
+], index=[f'row-{i}' for i in range(6)])
+
+
+def _gl(category, subcategory):
+    return f'GL {category}', subcategory
+
+
+def _cache(tmp_path, rules):
+    return CategoryCache('test', RuleMatcher(rules), gl=_gl, snapshot_dir=str(tmp_path))
+
+
+def _categorize(cache):
+    return cache.categorize('Bank', TEXTS.index, TEXTS)
+
+
+def test_changed_keywords():
+    old = ruleset_fingerprint(RuleMatcher(RULES))
+    edited = dict(RULES, aws=('OpEx - IT/Software', 'Hosting'))
+    assert changed_keywords(old, ruleset_fingerprint(RuleMatcher(edited))) == {'aws'}
+    added = dict(RULES, coffee=('OpEx - Meals', 'Meals'))
+    assert changed_keywords(old, ruleset_fingerprint(RuleMatcher(added))) == {'coffee'}
+    swapped = {key: RULES[key] for key in ['paylocity', 'google', 'google ads', 'aws', 'flexport']}
+    assert changed_keywords(old, ruleset_fingerprint(RuleMatcher(swapped))) == {'google', 'google ads'}
+
+
+def test_second_run_is_all_cache_hits(tmp_path):
+    first = _categorize(_cache(tmp_path, RULES))
+    cache = _cache(tmp_path, RULES)
+    second = _categorize(cache)
+    pd.testing.assert_frame_equal(first, second)
+    assert cache.stats['cached'] == len(TEXTS) and cache.stats['matched'] == 0
+
+
+def test_editing_one_keyword_rematches_only_its_rows(tmp_path):
+    before = _categorize(_cache(tmp_path, RULES))
+
+    edited = dict(RULES, aws=('OpEx - IT/Software', 'Hosting'))
+    cache = _cache(tmp_path, edited)
+    assert cache.stats['rematched'] == 1
+    after = _categorize(cache)
+    assert cache.stats['cached'] == len(TEXTS) and cache.stats['matched'] == 0
+
+    changed = (before != after).any(axis=1)
+    assert changed[changed].index.tolist() == ['row-3']
+    assert after.loc['row-3', 'subcategory'] == 'Hosting'
+    # The targeted rematch lands where a cold run would
+    pd.testing.assert_frame_equal(after, _categorize(_cache(tmp_path / 'cold', edited)))
+
+
+def test_row_under_another_ruleset_is_a_miss(tmp_path):
+    cache = _cache(tmp_path, RULES)
+    _categorize(cache)
+    with sqlite3.connect(cache.path) as conn:
+        conn.execute("UPDATE results SET ruleset_hash = 'other', category = 'Stale' WHERE id = 'row-0'")
+
+    cache = _cache(tmp_path, RULES)
+    result = _categorize(cache)
+    assert cache.stats['matched'] == 1 and cache.stats['cached'] == len(TEXTS) - 1
+    assert result.loc['row-0', 'category'] == 'Labor - Payroll'
@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from forecast_classifier import MIN_TRAINING_ROWS, MODEL_FILE, OverrideClassifier, features, fill_uncategorized
+from forecast_ruleset import load_ruleset
+
+TRAINING = [
+    ('Gryphon Technologies', 'firmware sprint', 12_000.0, 'Labor', 'Engineering'),
+    ('Gryphon Technologies', 'firmware milestone', 9_500.0, 'Labor', 'Engineering'),
+    ('Cooley LLP', 'legal retainer', 4_000.0, 'Opex', 'Legal Services'),
+    ('Cooley LLP', 'legal review', 3_500.0, 'Opex', 'Legal Services'),
+    ('TUV Rheinland', 'certification testing', 7_000.0, 'Nre', 'Certification Testing'),
+    ('TUV Rheinland', 'certification lab', 6_500.0, 'Nre', 'Certification Testing'),
+    ('Acme Distributors', 'customer payment', 2_000.0, 'Revenue', 'Sales'),
+] * 4
+
+
+def _frame(misses):
+    rows = [(vendor, memo, amount, category, subcategory, 'override')
+            for vendor, memo, amount, category, subcategory in TRAINING]
+    rows += [(vendor, memo, amount, 'Uncategorized', '', 'rule') for vendor, memo, amount in misses]
+    return pd.DataFrame(rows, columns=['Vendor', 'Memo', 'Amount', 'Category', 'Subcategory', 'Categorized_By'])
+
+
+def test_features_bucket_the_amount():
+    assert features('Cooley LLP retainer', 4_000) == ['cooley', 'llp', 'retainer', 'cooley llp', 'llp retainer',
+                                                       'amount:1e3']
+    assert features('', 0)[-1] == 'amount:1e0'
+
+
+def test_override_labels_map_onto_ruleset_categories(tmp_path):
+    ruleset = load_ruleset(snapshot_dir=str(tmp_path))
+    assert ruleset.override_label('Opex', 'Legal Services') == ('OpEx - Professional Services', 'Legal Services')
+    assert ruleset.override_label('Labor', 'Engineering') == ('Labor - R&D - Engineering', 'Engineering')
+    assert ruleset.override_label('Nre', 'Certification Testing') == ('NRE - Certification', 'Certification Testing')
+    assert ruleset.override_label('Revenue', 'Sales') is None
+    assert ruleset.override_label('Opex', '') is None
+
+
+def test_fill_uncategorized_trains_on_mapped_labels(tmp_path):
+    ruleset = load_ruleset(snapshot_dir=str(tmp_path))
+    df = _frame([('Gryphon Technologies', 'firmware sprint 3', 11_000.0),
+                 ('Cooley LLP', 'legal retainer', 4_200.0),
+                 ('Unknown Payee', '', 55.0)])
+    relabelled, trained_on = fill_uncategorized(df, snapshot_dir=str(tmp_path), label_map=ruleset.override_label)
+
+    # The revenue overrides have no ruleset category and are left out
+    assert trained_on == 24
+    assert relabelled == 2
+    misses = df.iloc[-3:]
+    assert misses['Category'].tolist() == ['Labor - R&D - Engineering', 'OpEx - Professional Services',
+                                           'Uncategorized']
+    assert misses['Categorized_By'].tolist() == ['model', 'model', 'rule']
+    # A row with no known word never clears the threshold, whatever its amount
+    assert misses['Model_Confidence'].iloc[2] == 0
+
+
+def test_confidence_threshold(tmp_path):
+    df = _frame([('Gryphon Cooley', 'firmware legal', 5_000.0)])
+    fill_uncategorized(df, snapshot_dir=str(tmp_path), min_confidence=1.0)
+    assert df['Categorized_By'].iloc[-1] == 'rule'
+    confidence = df['Model_Confidence'].iloc[-1]
+    assert 0 < confidence < 1
+
+    df = _frame([('Gryphon Cooley', 'firmware legal', 5_000.0)])
+    relabelled, _ = fill_uncategorized(df, snapshot_dir=str(tmp_path), min_confidence=confidence)
+    assert relabelled == 1 and df['Categorized_By'].iloc[-1] == 'model'
+
+
+def test_saved_model_serves_runs_with_few_overrides(tmp_path):
+    ruleset = load_ruleset(snapshot_dir=str(tmp_path))
+    fill_uncategorized(_frame([]), snapshot_dir=str(tmp_path), label_map=ruleset.override_label)
+    assert os.path.exists(os.path.join(str(tmp_path), MODEL_FILE))
+
+    # A narrow window with too few overrides to train on
+    narrow = _frame([('Cooley LLP', 'legal review', 3_900.0)]).iloc[-(MIN_TRAINING_ROWS // 2):].copy()
+    relabelled, trained_on = fill_uncategorized(narrow, snapshot_dir=str(tmp_path), label_map=ruleset.override_label)
+    assert trained_on == 0
+    assert relabelled == 1
+    assert narrow['Category'].iloc[-1] == 'OpEx - Professional Services'
+
+
+def test_save_load_round_trip(tmp_path):
+    texts = [f'{vendor} {memo}' for vendor, memo, *_ in TRAINING]
+    amounts = [amount for _, _, amount, *_ in TRAINING]
+    labels = [(category, subcategory) for *_, category, subcategory in TRAINING]
+    model = OverrideClassifier.fit(texts, amounts, labels)
+    model.save(str(tmp_path))
+    loaded = OverrideClassifier.load(str(tmp_path))
+
+    probe = ['cooley llp legal', 'tuv rheinland lab', 'nobody']
+    expected, expected_confidence = model.predict(probe, [4_000, 7_000, 10])
+    got, confidence = loaded.predict(probe, [4_000, 7_000, 10])
+    assert got.tolist() == expected.tolist()
+    assert np.allclose(confidence, expected_confidence)
+    assert OverrideClassifier.load(str(tmp_path / 'empty')) is None
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from forecast_dedup import DUPLICATE_COLUMNS, dedupe_sources, match_duplicates
+
+
+def _frame(rows):
+    """Analyzed rows from (source, date, vendor_id, cents, due_date, balance_cents)"""
+    frame = pd.DataFrame(rows, columns=['Source', 'Date', 'Vendor_ID', 'Amount_Cents', 'Due_Date', 'Balance_Cents'])
+    frame['Date'] = pd.to_datetime(frame['Date'])
+    frame['Due_Date'] = pd.to_datetime(frame['Due_Date'])
+    frame['Vendor'] = frame['Vendor_ID']
+    frame['Canonical_Vendor'] = frame['Vendor_ID']
+    frame['ID'] = [str(i) for i in range(len(frame))]
+    return frame
+
+
+def test_exact_bill_and_bank_pair():
+    df = _frame([
+        ('QB Bill', '2025-03-03', 'gryphon', 1_250_000, None, 0),
+        ('Bank', '2025-03-05', 'gryphon', 1_250_000, None, 0),
+    ])
+    kept_by, days_apart, cents_apart, same_vendor = match_duplicates(df)
+    assert kept_by.tolist() == [-1, 0]
+    assert days_apart[1] == 2 and cents_apart[1] == 0 and same_vendor[1]
+
+
+def test_near_misses_stay_separate():
+    df = _frame([
+        ('QB Bill', '2025-03-03', 'gryphon', 1_000_000, None, 0),
+        ('Bank', '2025-03-04', 'gryphon', 1_006_000, None, 0),   # $60 off: over 0.5%
+        ('Ramp', '2025-03-14', 'gryphon', 1_000_000, None, 0),   # 11 days after
+    ])
+    assert match_duplicates(df, days=7)[0].tolist() == [-1, -1, -1]
+
+
+def test_amount_tolerance_allows_wire_fees():
+    df = _frame([
+        ('QB Bill', '2025-03-03', 'gryphon', 1_000_000, None, 0),
+        ('Bank', '2025-03-04', 'gryphon', 1_004_000, None, 0),   # $40 of fees: inside 0.5%
+    ])
+    kept_by, _, cents_apart, _ = match_duplicates(df)
+    assert kept_by.tolist() == [-1, 0]
+    assert cents_apart[1] == 4_000
+
+
+def test_payment_anywhere_before_the_due_date():
+    df = _frame([
+        ('QB Bill', '2025-03-01', 'deel', 500_000, '2025-03-31', 0),
+        ('Bank', '2025-03-28', 'deel', 500_000, None, 0),
+        ('Ramp', '2025-04-10', 'deel', 500_000, None, 0),        # 10 days past due
+    ])
+    kept_by, days_apart, _, _ = match_duplicates(df, days=7)
+    assert kept_by.tolist() == [-1, 0, -1]
+    assert days_apart[1] == 0
+
+
+def test_unpaid_bill_is_not_matched():
+    df = _frame([
+        ('QB Bill', '2025-03-01', 'deel', 500_000, '2025-03-31', 500_000),
+        ('Bank', '2025-03-03', 'deel', 500_000, None, 0),
+    ])
+    assert match_duplicates(df)[0].tolist() == [-1, -1]
+
+
+def test_same_source_and_expenses_never_pair():
+    df = _frame([
+        ('QB Bill', '2025-03-03', 'aws', 80_000, None, 0),
+        ('QB Bill', '2025-03-03', 'aws', 80_000, None, 0),
+        ('QB Expense', '2025-03-04', 'aws', 80_000, None, 0),
+        ('Bank', '2025-03-10', 'rent', 300_000, None, 0),
+        ('Bank', '2025-03-10', 'rent', 300_000, None, 0),
+    ])
+    assert match_duplicates(df)[0].tolist() == [-1] * 5
+
+
+def test_vendor_agnostic_match_needs_the_exact_amount():
+    df = _frame([
+        ('QB Bill', '2025-03-03', 'gryphon technologies', 2_500_000, None, 0),
+        ('Bank', '2025-03-04', 'gryphon tech wire out', 2_500_000, None, 0),
+        ('QB Bill', '2025-03-03', 'flexport', 900_000, None, 0),
+        ('Bank', '2025-03-04', 'flexport inc wire', 900_500, None, 0),  # within tolerance, vendors differ
+    ])
+    kept_by, _, _, same_vendor = match_duplicates(df)
+    assert kept_by.tolist() == [-1, 0, -1, -1]
+    assert not same_vendor[1]
+
+
+def test_tie_break_prefers_the_same_vendor_then_the_closest_date():
+    df = _frame([
+        ('QB Bill', '2025-03-03', 'other', 100_000, None, 0),
+        ('QB Bill', '2025-03-01', 'deel', 100_000, None, 0),
+        ('QB Bill', '2025-03-06', 'deel', 100_000, None, 0),
+        ('Bank', '2025-03-06', 'deel', 100_000, None, 0),
+    ])
+    kept_by, days_apart, _, same_vendor = match_duplicates(df)
+    assert kept_by[3] == 2
+    assert days_apart[3] == 0 and same_vendor[3]
+
+
+def test_each_bill_takes_one_bank_and_one_ramp_row():
+    df = _frame([
+        ('QB Bill', '2025-03-03', 'deel', 100_000, None, 0),
+        ('Bank', '2025-03-04', 'deel', 100_000, None, 0),
+        ('Bank', '2025-03-05', 'deel', 100_000, None, 0),
+        ('Ramp', '2025-03-05', 'deel', 100_000, None, 0),
+    ])
+    assert match_duplicates(df)[0].tolist() == [-1, 0, -1, 0]
+
+
+def test_dedupe_keeps_the_bill_on_the_cash_date():
+    df = _frame([
+        ('QB Bill', '2025-03-01', 'deel', 500_000, '2025-03-31', 0),
+        ('Ramp', '2025-03-20', 'deel', 500_000, None, 0),
+        ('Bank', '2025-03-24', 'deel', 500_000, None, 0),
+        ('QB Expense', '2025-03-02', 'aws', 80_000, None, 0),
+    ])
+    kept, duplicates = dedupe_sources(df)
+    assert kept['Source'].tolist() == ['QB Bill', 'QB Expense']
+    bill = kept.iloc[0]
+    assert bill['Date'] == pd.Timestamp('2025-03-24')  # the bank's date before Ramp's
+    assert bill['Linked_IDs'] == 'Ramp 1; Bank 2'
+    assert kept.iloc[1]['Date'] == pd.Timestamp('2025-03-02')
+
+    assert list(duplicates.columns) == DUPLICATE_COLUMNS
+    assert duplicates['Kept_ID'].tolist() == ['0', '0']
+    assert (duplicates['Kept_Date'] == pd.Timestamp('2025-03-01')).all()
+    assert np.isclose(kept['Amount_Cents'].sum(), 580_000)
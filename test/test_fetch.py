@@ -0,0 +1,30 @@
+from forecast_fetch import fetch_table, iter_table_batches
+from postgrest_fake import FakeClient
+
+# Five rows share one timestamp, so every page boundary at size 2 falls inside a run of equal dates
+ROWS = [
+    {'id': 'a1', 'updated_at': None, 'amount': 1},
+    {'id': 'b1', 'updated_at': '2025-03-01T09:30:00.5+00:00', 'amount': 2},
+    *({'id': f'c{i}', 'updated_at': '2025-03-02T10:00:00+00:00', 'amount': 3 + i} for i in range(5)),
+    {'id': 'a2', 'updated_at': '2025-03-03T00:00:00+00:00', 'amount': 8},
+]
+
+
+def test_keyset_pages_through_duplicate_dates():
+    client = FakeClient(ROWS)
+    batches = list(iter_table_batches(client, 'ledger', 'amount', date_column='updated_at', page_size=2))
+    rows = [row for batch in batches for row in batch]
+
+    # NULL dates first, then (date, id) order, every row exactly once
+    assert [row['id'] for row in rows] == ['a1', 'b1', 'c0', 'c1', 'c2', 'c3', 'c4', 'a2']
+    assert all(len(batch) <= 2 for batch in batches)
+    assert client.keysets[0] == ('updated_at.gt."2025-03-02T10:00:00+00:00",'
+                                 'and(updated_at.eq."2025-03-02T10:00:00+00:00",id.gt."c0")')
+
+
+def test_fetch_table_keeps_key_columns_and_filters():
+    client = FakeClient(ROWS)
+    rows = fetch_table(client, 'ledger', 'amount', date_column='updated_at', page_size=3,
+                       filters=[('gte', 'amount', 4)])
+    assert [row['id'] for row in rows] == ['c1', 'c2', 'c3', 'c4', 'a2']
+    assert set(rows[0]) == {'amount', 'id', 'updated_at'}
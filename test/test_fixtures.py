@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from forecast_fetch import iter_table_batches
+from forecast_fixtures import RecordingClient, ReplayClient
+from postgrest_fake import FakeClient
+
+ROWS = [
+    {'id': 'r0', 'transaction_date': None, 'amount': 0.5},
+    *({'id': f'r{i}', 'transaction_date': f'2025-03-0{1 + i // 3}', 'amount': float(i)} for i in range(1, 8)),
+]
+
+
+def _read(client):
+    return list(iter_table_batches(client, 'bank_statements', 'amount', page_size=3,
+                                   filters=[('gte', 'amount', 1.0)]))
+
+
+def test_recorded_run_replays_offline(tmp_path):
+    fixture_dir = str(tmp_path / 'fixtures')
+    recorder = RecordingClient(FakeClient(ROWS), fixture_dir)
+    recorded = _read(recorder)
+    # The empty NULL-date page, three keyset pages and the empty page that ends them
+    assert recorder.save() == 5
+    assert os.listdir(fixture_dir) == ['bank_statements.json.gz']
+
+    replayed = _read(ReplayClient(fixture_dir))
+    assert replayed == recorded
+    assert [row['id'] for batch in replayed for row in batch] == [f'r{i}' for i in range(1, 8)]
+
+
+def test_replay_rejects_queries_it_never_saw(tmp_path):
+    fixture_dir = str(tmp_path / 'fixtures')
+    recorder = RecordingClient(FakeClient(ROWS), fixture_dir)
+    _read(recorder)
+    recorder.save()
+
+    replay = ReplayClient(fixture_dir)
+    with pytest.raises(KeyError):
+        list(iter_table_batches(replay, 'bank_statements', 'amount', page_size=2))
+    with pytest.raises(FileNotFoundError):
+        list(iter_table_batches(replay, 'ramp_transactions', 'amount'))
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from forecast_frame import (CATEGORICAL_COLUMNS, TRANSACTION_COLUMNS, apply_overrides, dollars, set_labels,
+                            source_frame, to_cents, transaction_frame)
+
+
+def _categorized(index, category='OpEx - Other', subcategory='Other'):
+    return pd.DataFrame({'category': category, 'subcategory': subcategory, 'gl_code': '6000',
+                         'gl_name': 'Operating Expenses'}, index=index)
+
+
+def _bills():
+    index = pd.Index([7, 3, 5])
+    return source_frame('QB Bill', ['b1', 'b2', 'b3'], ['2025-03-01', None, '2025-03-03'], ['Flexport', '', None],
+                        [0.1, 0.2, 1234.565], _categorized(index), balance=pd.Series([0.1, 0, 0], index=index),
+                        due_dates=['2025-03-15', None, None])
+
+
+def test_to_cents_rounds_to_whole_cents():
+    assert to_cents([1.005, 0.125, None, '2.5', -3.999, 'n/a']).tolist() == [100, 12, 0, 250, -400, 0]
+    assert to_cents([0.1] * 3).sum() == 30
+    assert dollars(to_cents([19.99, 0.01])).tolist() == [19.99, 0.01]
+
+
+def test_source_frame_maps_one_source():
+    frame = _bills()
+    assert frame.columns.tolist() == TRANSACTION_COLUMNS
+    assert frame.index.tolist() == [7, 3, 5]
+    assert frame['Amount_Cents'].tolist() == [10, 20, 123456]
+    assert frame['Vendor'].tolist() == ['Flexport', 'Unknown', 'Unknown']
+    assert frame['Status'].tolist() == ['Unpaid', 'Paid', 'Paid']
+    assert frame['Date'].isna().tolist() == [False, True, False]
+    assert frame['Memo'].tolist() == ['', '', ''] and frame['Categorized_By'].tolist() == ['rule'] * 3
+
+
+def test_transaction_frame_stores_labels_as_categoricals():
+    bank = source_frame('Bank', ['k1'], ['2025-03-02'], ['WIRE OUT'], [50.0], _categorized(pd.Index([0])))
+    df = transaction_frame([_bills(), bank.iloc[:0], bank])
+    assert df.index.tolist() == [0, 1, 2, 3]
+    assert all(isinstance(df[column].dtype, pd.CategoricalDtype) for column in CATEGORICAL_COLUMNS)
+    assert df['Amount_Cents'].dtype == np.int64 and df['Amount_Cents'].sum() == 128486
+    assert df['Source'].cat.categories.tolist() == ['Bank', 'QB Bill']
+    assert transaction_frame([]).columns.tolist() == TRANSACTION_COLUMNS
+
+
+def test_set_labels_adds_new_categories_in_order():
+    df = transaction_frame([_bills()])
+    set_labels(df, df.index[:2], 'Category', ['Labor - Payroll', 'Inventory - Freight'])
+    assert df['Category'].tolist() == ['Labor - Payroll', 'Inventory - Freight', 'OpEx - Other']
+    assert df['Category'].cat.categories.tolist() == ['Inventory - Freight', 'Labor - Payroll', 'OpEx - Other']
+    set_labels(df, df.index[2:], 'Memo', ['plain column'])
+    assert df['Memo'].iloc[2] == 'plain column'
+
+
+def test_overrides_replace_rule_labels():
+    frame = _bills()
+    overrides = pd.DataFrame({'transaction_id': ['b3', 'b1', 'b3', 'zz'],
+                              'override_category': ['labor', 'opex', '', 'nre'],
+                              'override_account_type': ['Engineering', 'Legal', 'Misc', 'Lab']})
+    assert apply_overrides(frame, overrides, lambda category, sub: (f'{category}/{sub}', sub.upper())) == 2
+    # The last override per transaction wins; a blank category is Uncategorized
+    assert frame['Category'].tolist() == ['Opex', 'OpEx - Other', 'Uncategorized']
+    assert frame['GL_Code'].tolist() == ['Opex/Legal', '6000', 'Uncategorized/Misc']
+    assert frame['Categorized_By'].tolist() == ['override', 'rule', 'override']
+    assert apply_overrides(frame, overrides.iloc[3:]) == 0
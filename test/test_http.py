@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+pytest.importorskip('supabase')
+
+import forecast_http  # noqa: E402
+from forecast_http import RetryingTransport, TransportStats  # noqa: E402
+
+BASE = 'https://boss.example.supabase.co/rest/v1'
+
+
+def _client(statuses, monkeypatch, max_retries=3):
+    """httpx client whose server answers with statuses in turn (then 200), and the calls it saw"""
+    monkeypatch.setattr(forecast_http, '_backoff', lambda attempt, response=None: 0)
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.url.path, request.content))
+        status = statuses[len(calls) - 1] if len(calls) <= len(statuses) else 200
+        # A stream, not content=: the transport reads the raw body itself
+        body = json.dumps([{'ok': status == 200}]).encode()
+        return httpx.Response(status, headers={'Content-Type': 'application/json'}, stream=httpx.ByteStream(body))
+
+    transport = RetryingTransport(TransportStats(), max_retries, transport=httpx.MockTransport(handler))
+    return httpx.Client(transport=transport), transport.stats, calls
+
+
+def test_reads_are_retried_until_they_succeed(monkeypatch):
+    client, stats, calls = _client([503, 502], monkeypatch)
+    response = client.get(f'{BASE}/quickbooks_bills', params={'select': 'id'})
+    assert response.status_code == 200 and response.json() == [{'ok': True}]
+    assert len(calls) == 3
+    counters = stats.endpoints['quickbooks_bills']
+    assert counters['requests'] == 3 and counters['retries'] == 2 and counters['failures'] == 2
+
+
+def test_read_only_rpc_posts_are_retried(monkeypatch):
+    client, stats, calls = _client([503], monkeypatch)
+    response = client.post(f'{BASE}/rpc/forecast_weekly_spend', json={'p_since': '2025-01-06'})
+    assert response.status_code == 200
+    assert [method for method, _, _ in calls] == ['POST', 'POST']
+    # The body is sent again unchanged
+    assert calls[0][2] == calls[1][2]
+    assert json.loads(calls[1][2]) == {'p_since': '2025-01-06'}
+    assert stats.endpoints['rpc/forecast_weekly_spend']['retries'] == 1
+
+
+def test_write_rpcs_are_sent_once(monkeypatch):
+    client, stats, calls = _client([503], monkeypatch)
+    response = client.post(f'{BASE}/rpc/match_ramp_transactions', json={'p_matches': []})
+    assert response.status_code == 503
+    assert len(calls) == 1
+    assert stats.endpoints['rpc/match_ramp_transactions']['retries'] == 0
+
+
+def test_retries_are_bounded(monkeypatch):
+    client, stats, calls = _client([500] * 10, monkeypatch, max_retries=2)
+    assert client.get(f'{BASE}/ramp_transactions').status_code == 500
+    assert len(calls) == 3
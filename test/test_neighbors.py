@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_neighbors import NearestVendors, char_ngrams, suggest_categories, vendor_category_index
+
+VENDORS = pd.DataFrame({
+    'Canonical_Vendor': ['gryphon technologies', 'gryphon technologies', 'paylocity', 'amazon web services',
+                         'flexport', 'deel', 'google workspace', 'coffee shop'],
+    'Category': ['Labor - R&D - Engineering', 'OpEx - Professional Services', 'Labor - G&A - Payroll',
+                 'OpEx - IT/Software - AWS', 'Inventory - Freight', 'Labor - G&A - Payroll',
+                 'OpEx - IT/Software - Other', 'Uncategorized'],
+    'Amount': [9000.0, 100.0, 5000.0, 800.0, 1200.0, 3000.0, 60.0, 12.0],
+})
+
+
+def test_char_ngrams_pad_the_edges():
+    assert char_ngrams('deel') == {' de': 1, 'dee': 1, 'eel': 1, 'el ': 1}
+    assert char_ngrams('') == {'  ': 1}
+
+
+def test_query_ranks_the_closest_vendor_first():
+    index = NearestVendors(['gryphon technologies', 'paylocity', 'flexport', 'deel'],
+                           ['Labor', 'Payroll', 'Freight', 'Payroll'])
+    neighbors = index.query('gryphon tech wire')
+    assert neighbors[0][:2] == ('gryphon technologies', 'Labor')
+    assert 0 < neighbors[0][2] <= 1
+    assert index.query('gryphon technologies')[0][2] == pytest.approx(1.0, abs=1e-5)
+    assert index.query('zzzz') == []
+    assert len(index.query('paylocity payroll', k=2)) <= 2
+
+
+def test_results_match_a_brute_force_cosine():
+    names = ['gryphon technologies', 'paylocity', 'flexport', 'deel', 'deel inc', 'google', 'google workspace']
+    index = NearestVendors(names, names)
+    query = 'google cloud'
+    weights = [index._weights(char_ngrams(name)) for name in names]
+    target = index._weights(char_ngrams(query))
+    brute = sorted(((sum(w.get(g, 0) * v for g, v in target.items()), i) for i, w in enumerate(weights)),
+                   key=lambda item: (-item[0], item[1]))
+    expected = [(names[i], sim) for sim, i in brute if sim > 0][:3]
+    got = [(name, sim) for name, _, sim in index.query(query)]
+    assert [name for name, _ in got] == [name for name, _ in expected]
+    assert np.allclose([sim for _, sim in got], [sim for _, sim in expected], atol=1e-5)
+
+
+def test_vendor_index_labels_each_vendor_with_its_top_spend_category():
+    index = vendor_category_index(VENDORS)
+    assert 'coffee shop' not in index.names
+    assert len(index) == 6
+    assert dict(zip(index.names, index.labels))['gryphon technologies'] == 'Labor - R&D - Engineering'
+
+
+def test_suggest_categories_per_distinct_vendor():
+    index = vendor_category_index(VENDORS)
+    review = pd.Series(['gryphon tech', 'paylocity corp', 'gryphon tech', 'qqqq'], index=[10, 11, 12, 13])
+    suggestions = suggest_categories(index, review)
+    assert list(suggestions.columns) == ['Suggested_Category', 'Similarity', 'Similar_Vendors']
+    assert suggestions.index.tolist() == [10, 11, 12, 13]
+    assert suggestions.loc[10, 'Suggested_Category'] == 'Labor - R&D - Engineering'
+    assert suggestions.loc[11, 'Suggested_Category'] == 'Labor - G&A - Payroll'
+    assert suggestions.loc[10].tolist() == suggestions.loc[12].tolist()
+    assert suggestions.loc[13, 'Suggested_Category'] == '' and np.isnan(suggestions.loc[13, 'Similarity'])
+    assert suggestions.loc[10, 'Similar_Vendors'].startswith('gryphon technologies (')
+
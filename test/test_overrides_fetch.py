@@ -0,0 +1,47 @@
+import forecast_fetch
+from forecast_schemas import fetch_typed
+from forecast_sources import fetch_forecast_sources
+from postgrest_fake import FakeClient
+
+
+def _tables(bill_ids, expense_ids, override_ids):
+    bills = [{'id': id, 'bill_date': '2025-03-03', 'due_date': None, 'vendor_name': 'Flexport',
+              'total_amount': 10.0, 'balance': 0.0} for id in bill_ids]
+    expenses = [{'id': id, 'expense_date': '2025-03-04', 'vendor_name': 'Deel', 'memo': '',
+                 'total_amount': 5.0} for id in expense_ids]
+    overrides = [{'id': f'o-{id}', 'transaction_id': id, 'override_category': 'opex',
+                  'override_account_type': 'Legal Services'} for id in override_ids]
+    return {'quickbooks_bills': bills, 'quickbooks_expenses': expenses, 'bank_statements': [],
+            'ramp_transactions': [], 'gl_transaction_overrides': overrides}
+
+
+def test_only_overrides_of_fetched_qb_rows_are_pulled():
+    # Overrides for a bank row and for bills outside this fetch must stay on the server
+    client = FakeClient(_tables(['b1', 'b2'], ['e1'], ['b1', 'e1', 'bank9', 'old-bill']))
+    fetched, stats = fetch_forecast_sources(client, fetch_typed)
+
+    assert sorted(fetched['gl_transaction_overrides']['transaction_id']) == ['b1', 'e1']
+    assert stats['gl_transaction_overrides']['rows'] == 2
+    override_pages = [page for page in client.pages if page and 'transaction_id' in page[0]]
+    assert sorted(row['transaction_id'] for page in override_pages for row in page) == ['b1', 'e1']
+    # Stage 2 runs after the ledger tables
+    assert client.tables.index('gl_transaction_overrides') > max(
+        client.tables.index(table) for table in ('quickbooks_bills', 'quickbooks_expenses'))
+
+
+def test_override_keys_are_chunked(monkeypatch):
+    chunked = forecast_fetch.chunked
+    monkeypatch.setattr(forecast_fetch, 'chunked', lambda values: chunked(values, 2))
+    ids = [f'b{i}' for i in range(5)]
+    client = FakeClient(_tables(ids, [], ids))
+    fetched, _ = fetch_forecast_sources(client, fetch_typed)
+    assert sorted(fetched['gl_transaction_overrides']['transaction_id']) == ids
+    # Three in_ chunks, each one page of rows and the empty page that ends it
+    assert client.tables.count('gl_transaction_overrides') == 6
+
+
+def test_no_qb_rows_means_no_override_rows():
+    client = FakeClient(_tables([], [], ['b1']))
+    fetched, stats = fetch_forecast_sources(client, fetch_typed)
+    assert fetched['gl_transaction_overrides'].empty
+    assert stats['gl_transaction_overrides']['error'] is None
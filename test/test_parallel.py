@@ -0,0 +1,57 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from forecast_category_cache import RESULT_COLUMNS, CategoryCache
+import forecast_parallel
+from forecast_parallel import PARALLEL_MIN_ROWS, match_rules, shard_ids
+from forecast_ruleset import load_ruleset
+
+PAYEES = [
+    'WIRE OUT 0412 Gryphon Technologies LLC', 'PAYLOCITY PAYROLL 1364227403', 'Amazon Web Services',
+    'GOOGLE *ADS 9186939000', 'Google Workspace', 'Flexport Inc', 'Deel Inc', 'coffee shop 22',
+    'ACH DEBIT MTN HIGH-TECHNOLOGY', 'boundless1364227403',
+]
+
+
+def _texts(count):
+    return pd.Series([f'{PAYEES[i % len(PAYEES)]} {i % 97}' for i in range(count)],
+                     index=[f'row-{i}' for i in range(count)])
+
+
+class _Matcher:
+    normalize = None
+
+    def rule(self, text, normalized=False):
+        return 0 if 'google' in text else None
+
+
+def test_shards_are_stable_per_vendor():
+    buckets = shard_ids(['Deel Inc', 'DEEL, INC.', 'Flexport'], 8)
+    assert buckets[0] == buckets[1]
+    assert shard_ids(['Deel Inc', 'DEEL, INC.', 'Flexport'], 8).tolist() == buckets.tolist()
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='the pool only forks on Linux')
+def test_pool_matches_the_single_process_path(tmp_path, monkeypatch):
+    # Two workers even on a one-core runner
+    monkeypatch.setattr(forecast_parallel.os, 'cpu_count', lambda: 2)
+    ruleset = load_ruleset(snapshot_dir=str(tmp_path))
+    matcher = ruleset.matcher
+    texts = _texts(PARALLEL_MIN_ROWS + 1_000)
+
+    results = {}
+    for workers in (1, 2):
+        cache = CategoryCache(f'workers{workers}', matcher, gl=ruleset.gl_code,
+                              snapshot_dir=str(tmp_path), workers=workers)
+        results[workers] = cache.categorize('Bank', texts.index, texts, shard_keys=texts)
+        assert cache.stats['processes'] == workers
+    assert list(results[2].columns) == RESULT_COLUMNS
+    pd.testing.assert_frame_equal(results[1], results[2])
+
+
+def test_small_inputs_stay_in_process():
+    matched, processes = match_rules(_Matcher(), ['google ads', 'aws'], workers=4)
+    assert processes == 1
+    assert matched == [('google ads', 0), ('aws', None)]
@@ -0,0 +1,106 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_pg import _CopyStream, read_copy_csv
+from forecast_schemas import SOURCE_SCHEMAS, column_name, decode_rows
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+# COPY (...) TO STDOUT WITH (FORMAT csv, HEADER true) output: NULL is an empty
+# field, an empty string is "" - both read back as '' for text columns
+FIXTURES = {
+    'ramp_transactions': 'ramp_transactions_copy.csv',
+    'quickbooks_bills': 'quickbooks_bills_copy.csv',
+}
+
+
+def _copy_bytes(table):
+    with open(os.path.join(DATA_DIR, FIXTURES[table]), 'rb') as source:
+        return source.read()
+
+
+def _read(table, chunk_rows=2, piece=7):
+    """The fixture through fetch_copy's parse path, as a stream of small COPY chunks"""
+    data = _copy_bytes(table)
+    chunks = [data[start:start + piece] for start in range(0, len(data), piece)]
+    return read_copy_csv(table, io.BufferedReader(_CopyStream(chunks)), chunk_rows=chunk_rows)
+
+
+def _assert_declared_kinds(table, frame):
+    assert list(frame.columns) == [column_name(field) for field, _ in SOURCE_SCHEMAS[table]]
+    for field, kind in SOURCE_SCHEMAS[table]:
+        column = frame[column_name(field)]
+        if kind == 'money':
+            assert column.dtype == np.float64, field
+        elif kind == 'date':
+            assert np.issubdtype(column.dtype, np.datetime64), field
+        elif kind == 'bool':
+            assert column.dtype == bool, field
+        else:
+            assert pd.api.types.is_string_dtype(column.dtype), field
+            assert not column.isna().any(), field
+
+
+@pytest.mark.parametrize('table', list(FIXTURES))
+def test_copy_frame_has_the_declared_kinds(table):
+    _assert_declared_kinds(table, _read(table))
+
+
+@pytest.mark.parametrize('table', list(FIXTURES))
+def test_chunking_does_not_change_the_frame(table):
+    pd.testing.assert_frame_equal(_read(table, chunk_rows=1, piece=1), _read(table, chunk_rows=10000, piece=65536))
+
+
+def test_copy_text_money_and_bools():
+    frame = _read('ramp_transactions').set_index('id')
+    # NULL and "" alike are ''; quoting, embedded commas and newlines survive
+    assert frame.loc['r1', 'memo'] == '' and frame.loc['r1', 'txn_class'] == ''
+    assert frame.loc['r2', 'payee'] == ''
+    assert frame.loc['r3', 'payee'] == 'Baker & Hostetler, LLP'
+    assert frame.loc['r3', 'memo'] == 'line 1\nline 2'
+    assert frame.loc['r4', 'memo'] == '"quoted" memo'
+    assert frame.loc['r4', 'matched_qb_transaction_id'] == ''
+    # Money strings to float, NULL to 0.0
+    assert frame['charge_usd'].tolist() == [15.99, 0.0, 1234567.89, -0.5]
+    assert frame['payment_usd'].tolist() == [0.0, -410.0, 0.0, 0.0]
+    assert frame['is_matched'].tolist() == [False, True, True, False]
+    assert pd.isna(frame.loc['r4', 'transaction_date'])
+
+
+def test_copy_timestamptz_reads_as_utc():
+    frame = _read('quickbooks_bills').set_index('id')
+    assert frame.loc['b1', 'bill_date'] == pd.Timestamp('2025-01-06')
+    assert frame.loc['b2', 'bill_date'] == pd.Timestamp('2025-03-10 07:30')
+    assert frame.loc['b2', 'due_date'] == pd.Timestamp('2025-03-10 08:00')
+    assert frame.loc['b3', 'bill_date'] == pd.Timestamp('2025-01-31')
+    assert pd.isna(frame.loc['b3', 'due_date'])
+    assert frame.loc['b3', 'vendor_name'] == '' and frame.loc['b3', 'total_amount'] == 0.0
+
+
+@pytest.mark.parametrize('table', list(FIXTURES))
+def test_copy_matches_the_postgrest_decode(table):
+    """The same rows as PostgREST JSON (NULL -> None) decode to the same frame"""
+    raw = pd.read_csv(io.BytesIO(_copy_bytes(table)), dtype=str, keep_default_na=False)
+    rows = [{name: (value if value != '' else None) for name, value in row.items()}
+            for row in raw.to_dict('records')]
+    pd.testing.assert_frame_equal(_read(table), decode_rows(table, rows))
+
+
+def test_header_only_copy_is_an_empty_typed_frame():
+    header = _copy_bytes('ramp_transactions').split(b'\n', 1)[0] + b'\n'
+    frame = read_copy_csv('ramp_transactions', io.BytesIO(header))
+    assert frame.empty
+    _assert_declared_kinds('ramp_transactions', frame)
+
+
+@pytest.mark.skipif(not os.getenv('DATABASE_URL'), reason='needs DATABASE_URL')
+def test_fetch_copy_against_postgres():
+    pytest.importorskip('psycopg')
+    from forecast_pg import fetch_copy
+
+    frame = fetch_copy(os.environ['DATABASE_URL'], 'ramp_transactions', since='2099-01-01')
+    _assert_declared_kinds('ramp_transactions', frame)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import forecast_views
+from forecast_frame import dollars, source_frame, transaction_frame
+
+forecast_polars = pytest.importorskip('forecast_polars')
+pytest.importorskip('polars')
+pytest.importorskip('pyarrow')
+
+RULES = [
+    ('Labor - G&A - Payroll', 'Payroll Processing', '6150', 'Payroll Taxes & Benefits'),
+    ('Labor - R&D - Engineering', 'Engineering Services', '9100', 'R&D - Firmware Development'),
+    ('Labor - Operations - Support', 'Customer Support', '6210', 'Salaries - Customer Support'),
+    ('Inventory - Freight', 'Freight Services', '5030', 'COGS - Freight & Shipping'),
+    ('OpEx - Banking', 'Wire Fees', '6350', 'Bank Fees & Wire Charges'),
+    ('Internal Transfer', 'Tide Rock Transfer', '', ''),
+    ('Uncategorized', '', '', ''),
+]
+
+
+def _categorized(picks, index):
+    return pd.DataFrame({
+        'category': [RULES[i][0] for i in picks],
+        'subcategory': [RULES[i][1] for i in picks],
+        'rule': '',
+        'gl_code': [RULES[i][2] for i in picks],
+        'gl_name': [RULES[i][3] for i in picks],
+    }, index=index)
+
+
+def _source(source, rows, seed):
+    rng = np.random.default_rng(seed)
+    index = pd.RangeIndex(rows)
+    # Sundays, Mondays and the turn of the year: rows either side of a week boundary
+    dates = pd.Series(pd.to_datetime('2024-12-28') + pd.to_timedelta(rng.integers(0, 21, rows), unit='D'))
+    dates[rng.random(rows) < 0.05] = pd.NaT
+    vendors = pd.Series(rng.choice(['Paylocity', 'Gryphon', 'Flexport', 'Chase', 'Deel'], rows), dtype=object)
+    vendors[rng.random(rows) < 0.1] = np.nan
+    amounts = rng.choice([0.0, 0.01, 19.99, 1250.5, 40000.0], rows)
+    return source_frame(source, [f'{source}-{i}' for i in range(rows)], dates, vendors, amounts,
+                        _categorized(rng.integers(0, len(RULES), rows), index))
+
+
+@pytest.fixture
+def transactions():
+    df = transaction_frame([_source('QB Expense', 300, 1), _source('Bank', 200, 2), _source('Ramp', 100, 3)])
+    df = df.sort_values('Date', ascending=False)
+    df['Amount'] = dollars(df['Amount_Cents'])
+    df['Canonical_Vendor'] = df['Vendor'].str.lower().where(df['Vendor'] != 'Unknown')
+    return df
+
+
+def _assert_same_tables(df):
+    expected = forecast_views.summary_tables(df)
+    actual = forecast_polars.summary_tables(df)
+    assert list(expected) == list(actual)
+    for name in expected:
+        pd.testing.assert_frame_equal(expected[name], actual[name], check_exact=True, obj=name)
+
+
+def test_summary_tables_match_pandas(transactions):
+    assert isinstance(transactions['Category'].dtype, pd.CategoricalDtype)
+    assert transactions['Canonical_Vendor'].isna().any()
+    assert (transactions['Amount_Cents'] == 0).any()
+    _assert_same_tables(transactions)
+
+
+def test_summary_tables_match_pandas_without_labor_or_gl(transactions):
+    _assert_same_tables(transactions[transactions['Category'] == 'Internal Transfer'])
+
+
+def test_check_parity(transactions):
+    assert forecast_polars.check_parity(transactions)
@@ -0,0 +1,63 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from forecast_ramp_match import MATCH_WRITE_FUNCTION, match_rows, qb_window, write_matches
+
+MATCHES = pd.DataFrame({
+    'id': ['00000000-0000-0000-0000-000000000001', '00000000-0000-0000-0000-000000000002',
+           '00000000-0000-0000-0000-000000000003'],
+    'qb_id': ['qb-1', 'qb-2', 'qb-3'],
+})
+
+
+class _FakeRpc:
+    """client.rpc(...).execute() that marks every row but the ids in skip"""
+
+    def __init__(self, skip=()):
+        self.calls = []
+        self.skip = set(skip)
+
+    def rpc(self, function, params):
+        self.calls.append((function, params))
+        marked = sum(row['id'] not in self.skip for row in params['p_matches'])
+        return type('Query', (), {'execute': lambda _: type('Result', (), {'data': marked})()})()
+
+
+def test_qb_window_is_wider_by_the_match_window():
+    assert qb_window('2025-03-01', '2025-03-31', 3) == ('2025-02-26', '2025-04-03')
+    assert qb_window(None, '2025-12-30', 3) == (None, '2026-01-02')
+    assert qb_window(None, None, 3) == (None, None)
+
+
+def test_write_matches_chunks_through_the_guarded_function():
+    client = _FakeRpc(skip={MATCHES['id'][1]})
+    written = write_matches(client, MATCHES, '2025-04-01T00:00:00+00:00', chunk_size=2)
+    assert [function for function, _ in client.calls] == [MATCH_WRITE_FUNCTION] * 2
+    assert [len(params['p_matches']) for _, params in client.calls] == [2, 1]
+    assert written == 2
+
+
+@pytest.mark.skipif(not os.getenv('DATABASE_URL'), reason='needs DATABASE_URL with match_ramp_transactions() installed')
+def test_guard_skips_rows_matched_since_the_read():
+    psycopg = pytest.importorskip('psycopg')
+    ids = list(MATCHES['id'])
+    with psycopg.connect(os.environ['DATABASE_URL']) as conn:
+        with conn.cursor() as cursor:
+            # A temporary ramp_transactions shadows the real one for this session (pg_temp comes first)
+            cursor.execute('CREATE TEMP TABLE ramp_transactions (id UUID PRIMARY KEY, is_matched BOOLEAN, '
+                           'matched_qb_transaction_id TEXT, matched_at TIMESTAMP, updated_at TIMESTAMPTZ)')
+            cursor.executemany('INSERT INTO ramp_transactions VALUES (%s, %s, %s, NULL, NULL)', [
+                (ids[0], False, None),
+                (ids[1], True, 'qb-by-hand'),                         # matched by hand since the read
+                (ids[2], False, None),
+                ('00000000-0000-0000-0000-000000000009', True, 'qb-3'),  # qb-3 claimed meanwhile
+            ])
+            cursor.execute(f'SELECT {MATCH_WRITE_FUNCTION}(%s::jsonb)',
+                           (json.dumps(match_rows(MATCHES)),))
+            assert cursor.fetchone()[0] == 1
+            cursor.execute('SELECT id::TEXT, matched_qb_transaction_id FROM ramp_transactions ORDER BY id')
+            assert cursor.fetchall()[:3] == [(ids[0], 'qb-1'), (ids[1], 'qb-by-hand'), (ids[2], None)]
+        conn.rollback()
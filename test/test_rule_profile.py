@@ -0,0 +1,46 @@
+from forecast_rule_profile import literal_rule_tables, profile_rules, profile_tables, static_shadows
+from forecast_rules import PRIORITY_LONGEST, RuleMatcher
+
+RULES = {'wire': 'Transfer', 'google': 'IT', 'google ads': 'Marketing', 'ups': 'Shipping', 'deel': 'Payroll'}
+
+
+def test_profile_counts_wins_losses_and_shadows():
+    texts = ['google ads q3', 'google ads q3', 'wire out google', 'groups dinner', 'cafe']
+    amounts = [100.0, -50.0, 10.0, 20.0, 5.0]
+    report = profile_rules(RuleMatcher(RULES), texts, amounts).set_index('Keyword')
+
+    assert report.attrs == {'unmatched_rows': 1, 'rows': 5}
+    assert report.loc['google', ['Hits', 'Dollars', 'Distinct_Texts']].tolist() == [2, 150.0, 1]
+    assert report.loc['google', 'Shadows'] == 'google ads (2)'
+    # 'wire' comes first, so the transfer to google is a Transfer
+    assert report.loc['wire', 'Shadows'] == 'google (1)'
+    assert report.loc['google', ['Present', 'Lost']].tolist() == [3, 1]
+    assert report.loc['google ads', ['Hits', 'Present', 'Lost']].tolist() == [0, 2, 2]
+    assert report.loc['google ads', 'Unreachable_Behind'] == 'google'
+    # A short keyword matching inside an unrelated word
+    assert report.loc['ups', 'Example'] == 'groups dinner'
+    assert report['Dead'].to_dict() == {'wire': False, 'google': False, 'google ads': True, 'ups': False,
+                                        'deel': True}
+
+
+def test_static_shadows_only_apply_to_first_match():
+    assert static_shadows(RuleMatcher(RULES)) == {2: 1}
+    assert static_shadows(RuleMatcher(RULES, priority=PRIORITY_LONGEST)) == {}
+    report = profile_rules(RuleMatcher(RULES, priority=PRIORITY_LONGEST), ['google ads q3']).set_index('Keyword')
+    assert report.loc['google ads', 'Hits'] == 1 and report.loc['google', 'Lost'] == 1
+
+
+def test_builder_tables_keep_repeated_keys(tmp_path, capsys):
+    builder = tmp_path / 'builder.py'
+    builder.write_text(
+        "VENDOR_RULES = {'mtn': 'a', 'aws': 'b', 'mtn': 'c'}\n"
+        "CATEGORY_RULES = {'mtn high-technology': 'd'}\n"
+        "OTHER = {'x': 1}\n"
+    )
+    tables = literal_rule_tables(str(builder))
+    assert tables == {'VENDOR_RULES': ['mtn', 'aws', 'mtn'], 'CATEGORY_RULES': ['mtn high-technology']}
+
+    profile_tables('builder.py', tables)
+    out = capsys.readouterr().out
+    assert "VENDOR_RULES repeats 'mtn'" in out
+    assert "'mtn high-technology' (CATEGORY_RULES) can never win: 'mtn' comes first" in out
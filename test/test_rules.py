@@ -0,0 +1,135 @@
+import pickle
+import random
+
+import pandas as pd
+import pytest
+
+from forecast_ruleset import load_ruleset
+from forecast_rules import PRIORITY_LONGEST, RuleMatcher, print_cache_summary, search_texts
+from forecast_vendors import normalize_payee
+
+FILLER = ['wire', 'out', 'ach', 'payment', 'inc', 'llc', '0412', 'invoice', 'march', '-', '*', '#', '']
+
+
+def _naive(rules, text, default=None):
+    """The loop RuleMatcher replaces, over the space-padded text it scans"""
+    padded = f' {text} '
+    for keyword, value in rules:
+        if keyword in padded:
+            return value
+    return default
+
+
+def _naive_longest(rules, text, default=None):
+    padded = f' {text} '
+    found = [(-len(keyword), position) for position, (keyword, _) in enumerate(rules) if keyword in padded]
+    return rules[min(found)[1]][1] if found else default
+
+
+def _fuzzed_texts(keywords, count, seed):
+    """Texts of whole, clipped and glued keywords among filler, so overlaps and near misses are common"""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(0, 5)):
+            keyword = rng.choice(keywords)
+            roll = rng.random()
+            if roll < 0.4:
+                parts.append(keyword)
+            elif roll < 0.6:
+                parts.append(keyword[:rng.randint(0, len(keyword))])
+            elif roll < 0.8:
+                parts.append(keyword[rng.randint(0, len(keyword)):])
+            else:
+                parts.append(rng.choice(FILLER))
+        texts.append(rng.choice(['', ' ']).join(parts))
+    return texts
+
+
+@pytest.mark.parametrize('rule_set', [None, 'iteration2', 'real_data'])
+def test_matcher_agrees_with_the_ordered_loop(tmp_path, rule_set):
+    matcher = load_ruleset(snapshot_dir=str(tmp_path), rule_set=rule_set).matcher
+    rules = list(zip(matcher.keywords, matcher.values))
+    overlaps = ['mtn high-technology', 'mtn', 'google ads', 'google', 'ads by google',
+                'mtn high-technology google ads', 'googleads', 'xmtn']
+    for text in overlaps + _fuzzed_texts(matcher.keywords, 3000, seed=len(rules)):
+        assert matcher.match(text, 'none') == _naive(rules, text, 'none'), text
+
+
+def test_longest_priority_agrees_with_the_naive_scan(tmp_path):
+    ruleset = load_ruleset(snapshot_dir=str(tmp_path))
+    matcher = RuleMatcher(ruleset.vendor_rules, ruleset.fallback_rules, priority=PRIORITY_LONGEST)
+    rules = list(zip(matcher.keywords, matcher.values))
+    assert matcher.match('google ads q3') == ruleset.vendor_rules['google ads']
+    for text in _fuzzed_texts(matcher.keywords, 3000, seed=7):
+        assert matcher.match(text, 'none') == _naive_longest(rules, text, 'none'), text
+
+
+def test_edge_space_keywords_match_whole_words():
+    rules = {' rent ': 'rent', ' qa': 'qa', 'ads': 'ads', 'ach': 'ach'}
+    matcher = RuleMatcher(rules)
+    ordered = list(rules.items())
+    for text in ['rent', 'office rent march', 'parent co', 'rental', 'qa contractor', 'aqa',
+                 'google ads', 'ach rent', 'rent ach', 'qa', 'reach']:
+        assert matcher.match(text) == _naive(ordered, text), text
+    assert matcher.match('rental') is None
+    assert matcher.match('office rent') == 'rent'
+
+
+def test_search_texts_match_the_per_row_f_string():
+    vendor = pd.Series(['Flexport', None, 'AWS', 'Deel Inc', ''], index=[4, 9, 2, 7, 1])
+    memo = pd.Series(['Freight MAR', 'wire', None, 12.5, ''], index=vendor.index)
+    texts = search_texts(vendor, vendor, memo)
+    assert texts.index.tolist() == vendor.index.tolist()
+    assert texts.tolist() == [f"{v} {v} {m}".lower() for v, m in zip(vendor, memo)]
+    # Scalars broadcast, as the bills' '' memo does
+    assert search_texts(vendor, '').tolist() == [f"{v} ".lower() for v in vendor]
+    assert search_texts(vendor.iloc[:0], '').empty
+
+
+def test_match_many_agrees_with_match_per_row(tmp_path):
+    ruleset = load_ruleset(snapshot_dir=str(tmp_path))
+    matcher = ruleset.matcher
+    texts = _fuzzed_texts(matcher.keywords, 2000, seed=12) * 2
+    default = ('Uncategorized', '')
+    assert matcher.match_many(texts, default).tolist() == [matcher.match(text, default) for text in texts]
+
+    categories, subcategories = matcher.match_many(texts, default, fields=2)
+    assert list(zip(categories, subcategories)) == [matcher.match(text, default) for text in texts]
+    assert categories.dtype == object and len(matcher.match_many([], default, fields=2)[0]) == 0
+
+
+def test_repeated_texts_are_served_from_the_memo():
+    matcher = RuleMatcher({'paylocity': 'payroll', 'flexport': 'freight'})
+    texts = ['paylocity payroll', 'flexport inv 1', 'paylocity payroll', 'cafe'] * 5
+    assert [matcher.match(text) for text in texts] == ['payroll', 'freight', 'payroll', None] * 5
+    info = matcher.cache_info()
+    assert (info.misses, info.hits, info.currsize) == (3, 17, 3)
+
+    # A pickled matcher (e.g. sent to a worker) starts with an empty memo
+    restored = pickle.loads(pickle.dumps(matcher))
+    assert restored.cache_info().currsize == 0
+    assert restored.match('flexport inv 1') == 'freight'
+
+
+def test_normalized_payees_share_one_memo_entry():
+    matcher = RuleMatcher({'WIRE OUT - Paylocity': 'payroll', 'amazon web': 'aws'}, normalize=normalize_payee)
+    assert matcher.keywords == ['wire out paylocity', 'amazon web']
+    texts = ['WIRE OUT - PAYLOCITY #0412', 'wire out paylocity 0519', 'Wire Out: Paylocity', 'AMAZON-WEB 88']
+    assert [matcher.match(text) for text in texts] == ['payroll', 'payroll', 'payroll', 'aws']
+    assert matcher.cache_info().misses == 2 and matcher.cache_info().hits == 2
+    # Stored search texts are already normalized
+    assert matcher.rule('amazon web', normalized=True) == 1
+
+
+def test_memo_can_be_disabled(capsys):
+    matcher = RuleMatcher({'deel': 'contractors'}, cache_size=0)
+    assert [matcher.match('deel inc') for _ in range(3)] == ['contractors'] * 3
+    assert matcher.cache_info().hits == 0 and matcher.cache_info().currsize == 0
+
+    memoized = RuleMatcher({'deel': 'contractors'})
+    memoized.match_many(['deel inc'] * 4 + ['deel'])
+    memoized.match('deel inc')
+    print_cache_summary(memoized)
+    assert '1 hits / 2 misses' in capsys.readouterr().out
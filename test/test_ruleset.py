@@ -0,0 +1,108 @@
+import csv
+import os
+
+import pytest
+
+from forecast_ruleset import load_ruleset
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+@pytest.fixture(scope='module')
+def ruleset(tmp_path_factory):
+    return load_ruleset(snapshot_dir=str(tmp_path_factory.mktemp('forecast_cache')))
+
+
+@pytest.mark.parametrize('text, expected', [
+    # Payroll keywords carry account numbers; every other Boundless line is not payroll
+    ('paylocity', ('Labor - G&A - Payroll', 'Payroll Taxes')),
+    ('334843 boundless', ('Labor - G&A - Payroll', 'Payroll Processing')),
+    ('boundless1364227403', ('Labor - G&A - Payroll', 'Payroll Processing')),
+    ('corporate xfer to boundless devices inc', ('Internal Transfer', 'Internal Transfer')),
+    ('tide rock boundless devices', ('Internal Transfer', 'Tide Rock Transfer')),
+    ('wire/out 0412 boundless devices', ('OpEx - Banking', 'Wire Fees')),
+    ('boundless devices inc refund', ('Uncategorized', '')),
+])
+def test_rules_match_the_raw_search_text(ruleset, text, expected):
+    assert ruleset.categorize(text) == expected
+
+
+def test_shared_rules_categorize_as_the_v4_builder_did(ruleset):
+    """Search texts from every builder's keyword tables, categorized by the pre-ruleset v4 smart_categorize"""
+    with open(os.path.join(DATA_DIR, 'v4_baseline_categories.csv'), newline='') as source:
+        baseline = list(csv.DictReader(source))
+    changed = [(row['search_text'], ruleset.categorize(row['search_text']))
+               for row in baseline if ruleset.categorize(row['search_text']) != (row['category'], row['subcategory'])]
+    assert not changed
+
+
+@pytest.fixture(scope='module')
+def iteration2(tmp_path_factory):
+    return load_ruleset(snapshot_dir=str(tmp_path_factory.mktemp('forecast_cache')), rule_set='iteration2')
+
+
+@pytest.fixture(scope='module')
+def real_data(tmp_path_factory):
+    return load_ruleset(snapshot_dir=str(tmp_path_factory.mktemp('forecast_cache')), rule_set='real_data')
+
+
+@pytest.mark.parametrize('text, expected', [
+    # Keywords carried over from the iteration 2 builder, after the shared rules
+    ('office rent october', ('OpEx - Rent/Facilities', 'Rent')),
+    ('rent', ('OpEx - Rent/Facilities', 'Rent')),
+    ('warehouse lease', ('OpEx - Rent/Facilities', 'Lease')),
+    ('fedex shipping', ('Inventory - Freight', 'FedEx')),
+    ('ups', ('Inventory - Freight', 'UPS')),
+    ('salesforce.com', ('OpEx - IT/Software - Other', 'Salesforce')),
+    ('sales tax', ('Labor - G&A - Sales', 'Sales')),
+    ('meta platforms ads', ('Marketing - Digital', 'Meta Ads')),
+    # Short words match only on their own
+    ('xfer from current account', ('Uncategorized', '')),
+    ('cloud groups llc', ('Uncategorized', '')),
+    ('northwest metal works', ('Uncategorized', '')),
+    ('wholesale supply co', ('Uncategorized', '')),
+    # The shared rules still win
+    ('gryphon software', ('Labor - R&D - Engineering', 'Engineering Services')),
+])
+def test_iteration2_rule_set(iteration2, text, expected):
+    assert iteration2.categorize(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('hr', ('Labor - G&A - Executive', 'HR/Admin')),
+    ('director of hr', ('Labor - G&A - Executive', 'HR/Admin')),
+    ('director of operations', ('Uncategorized', '')),
+    ('seo audit', ('Marketing - Digital', 'SEO')),
+    ('seoul trading co', ('Uncategorized', '')),
+    ('badminton club', ('Uncategorized', '')),
+    ('annual software subscription', ('OpEx - IT/Software - Other', 'Software')),
+    ('qa', ('NRE - Testing', 'Testing')),
+])
+def test_real_data_rule_set(real_data, text, expected):
+    assert real_data.categorize(text) == expected
+
+
+def test_rule_sets_are_only_loaded_on_request(ruleset, iteration2):
+    assert ' rent' not in ruleset.vendor_rules and ' rent' in iteration2.vendor_rules
+    assert list(iteration2.vendor_rules)[:len(ruleset.vendor_rules)] == list(ruleset.vendor_rules)
+    assert ruleset.categorize('office rent october') == ('Uncategorized', '')
+
+
+def test_unknown_rule_set(tmp_path):
+    with pytest.raises(KeyError):
+        load_ruleset(snapshot_dir=str(tmp_path), rule_set='iteration9')
+
+
+@pytest.mark.parametrize('rule_set', [None, 'iteration2', 'real_data'])
+def test_every_rule_category_has_a_gl_code(tmp_path, rule_set):
+    ruleset = load_ruleset(snapshot_dir=str(tmp_path), rule_set=rule_set)
+    unmapped = {category for category, subcategory in ruleset.vendor_rules.values()
+                if category != 'Internal Transfer' and ruleset.gl_code(category, subcategory) == ('', '')}
+    assert not unmapped
+
+
+def test_cached_artifact_matches_the_same_way(tmp_path):
+    load_ruleset(snapshot_dir=str(tmp_path))
+    cached = load_ruleset(snapshot_dir=str(tmp_path))
+    assert cached.matcher.normalize is None
+    assert cached.categorize('boundless devices inc refund') == ('Uncategorized', '')
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from forecast_schemas import SOURCE_SCHEMAS, coerce_frame, column_name, decode_rows, empty_frame, select_columns
+
+RAMP = [
+    {'id': 'r1', 'transaction_date': '2025-03-01T23:30:00-05:00', 'payee': 'Flexport', 'memo': 'freight',
+     'txn_class': 'Ops', 'charge_usd': 12.5, 'payment_usd': None, 'is_matched': True,
+     'matched_qb_transaction_id': 'qb9'},
+    {'id': 'r2', 'transaction_date': None, 'payee': None, 'memo': None, 'txn_class': None,
+     'charge_usd': '7', 'payment_usd': 0, 'is_matched': None, 'matched_qb_transaction_id': None},
+]
+
+
+def test_select_requests_only_declared_columns():
+    assert select_columns('bank_statements') == 'id,transaction_date,description,amount'
+    assert 'txn_class:class' in select_columns('ramp_transactions').split(',')
+    assert column_name('txn_class:class') == 'txn_class'
+
+
+def test_decode_rows_types_and_nulls():
+    frame = decode_rows('ramp_transactions', RAMP)
+    assert frame.columns.tolist() == [column_name(field) for field, _ in SOURCE_SCHEMAS['ramp_transactions']]
+    assert frame['charge_usd'].tolist() == [12.5, 7.0] and frame['charge_usd'].dtype == np.float64
+    assert frame['payment_usd'].tolist() == [0.0, 0.0]
+    assert frame['is_matched'].tolist() == [True, False]
+    assert frame['payee'].tolist() == ['Flexport', ''] and frame['txn_class'].tolist() == ['Ops', '']
+    # timestamptz lands as naive UTC; NULL -> NaT
+    assert frame['transaction_date'].iloc[0] == pd.Timestamp('2025-03-02 04:30:00')
+    assert pd.isna(frame['transaction_date'].iloc[1])
+
+
+def test_coerce_frame_matches_decoded_json():
+    # What a COPY stream parses to: text columns, NULL as NaN, 't'/'f' booleans
+    copied = pd.DataFrame({
+        'id': ['r1', 'r2'], 'transaction_date': ['2025-03-02 04:30:00+00', np.nan],
+        'payee': ['Flexport', np.nan], 'memo': ['freight', np.nan], 'txn_class': ['Ops', np.nan],
+        'charge_usd': ['12.5', '7'], 'payment_usd': [np.nan, '0'], 'is_matched': ['t', np.nan],
+        'matched_qb_transaction_id': ['qb9', np.nan],
+    })
+    coerced = coerce_frame('ramp_transactions', copied)
+    decoded = decode_rows('ramp_transactions', RAMP)
+    pd.testing.assert_frame_equal(coerced, decoded, check_dtype=False)
+    assert coerced['charge_usd'].dtype == np.float64 and coerced['is_matched'].dtype == bool
+
+
+def test_empty_frame_has_every_column_typed():
+    for table in SOURCE_SCHEMAS:
+        frame = empty_frame(table)
+        assert frame.empty
+        for field, kind in SOURCE_SCHEMAS[table]:
+            dtype = frame[column_name(field)].dtype
+            if kind == 'money':
+                assert dtype == np.float64
+            elif kind == 'date':
+                assert dtype.kind == 'M'
+            elif kind == 'bool':
+                assert dtype == bool
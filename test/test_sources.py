@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_fetch import LEDGER_SOURCES, fetch_sources
+from forecast_schemas import decode_batches, empty_frame, fetch_typed, stack_frames
+from postgrest_fake import FakeClient
+
+BANK = [
+    {'id': f'b{i}', 'transaction_date': f'2025-03-0{1 + i}', 'description': f'wire {i}',
+     'amount': -100.0 * (i + 1), 'balance': 0.0}
+    for i in range(5)
+]
+
+
+def test_sources_are_fetched_side_by_side():
+    # Every fetcher waits for all the others, so a serial fetch would time out here
+    barrier = threading.Barrier(len(LEDGER_SOURCES), timeout=5)
+
+    def fetch(client, table, **options):
+        barrier.wait()
+        return [{'table': table, **options}]
+
+    rows, stats = fetch_sources(None, {table: {'page_size': 7} for table in LEDGER_SOURCES}, fetch=fetch)
+    assert list(rows) == LEDGER_SOURCES
+    assert rows['bank_statements'] == [{'table': 'bank_statements', 'page_size': 7}]
+    assert all(s['rows'] == 1 and s['error'] is None and s['seconds'] >= 0 for s in stats.values())
+
+
+def test_a_failed_source_comes_back_empty_with_its_error():
+    def fetch(client, table):
+        if table == 'ramp_transactions':
+            raise ConnectionError('reset by peer')
+        frame = pd.DataFrame({'id': ['x']})
+        frame.attrs['delta_rows'] = 3
+        return frame
+
+    rows, stats = fetch_sources(None, ['bank_statements', 'ramp_transactions'], fetch=fetch, empty=empty_frame)
+    assert rows['ramp_transactions'].empty
+    assert list(rows['ramp_transactions'].columns) == list(empty_frame('ramp_transactions').columns)
+    assert isinstance(stats['ramp_transactions']['error'], ConnectionError)
+    assert stats['ramp_transactions']['rows'] == 0
+    # Fetcher counters ride along in the stats
+    assert stats['bank_statements'] == {**stats['bank_statements'], 'rows': 1, 'error': None, 'delta_rows': 3}
+
+
+def test_fetch_typed_decodes_each_page():
+    client = FakeClient({'bank_statements': BANK})
+    frame = fetch_typed(client, 'bank_statements', page_size=2)
+    assert frame['id'].tolist() == [f'b{i}' for i in range(5)]
+    assert frame['amount'].dtype == np.float64
+    assert frame['transaction_date'].dtype.kind == 'M'
+    # Only the declared columns are requested, so 'balance' never comes back
+    assert 'balance' not in frame.columns
+    assert all('balance' not in row for page in client.pages for row in page)
+    assert max(len(page) for page in client.pages) == 2
+
+
+def test_stacked_batches_equal_one_decode():
+    batches = [BANK[:2], BANK[2:4], BANK[4:]]
+    stacked = decode_batches('bank_statements', batches)
+    whole = decode_batches('bank_statements', [BANK])
+    pd.testing.assert_frame_equal(stacked, whole)
+    assert stacked.index.tolist() == list(range(5))
+    assert stack_frames('bank_statements', []).columns.tolist() == whole.columns.tolist()
+
+
+def test_fetch_typed_reads_aliased_columns():
+    ramp = [{'id': 'r1', 'transaction_date': '2025-03-01', 'payee': 'Flexport', 'memo': None, 'class': 'Ops',
+             'charge_usd': '12.5', 'payment_usd': None, 'is_matched': True, 'matched_qb_transaction_id': None}]
+    frame = fetch_typed(FakeClient({'ramp_transactions': ramp}), 'ramp_transactions')
+    assert frame.loc[0, 'txn_class'] == 'Ops'
+    assert frame.loc[0, 'charge_usd'] == pytest.approx(12.5)
+    assert frame.loc[0, 'memo'] == '' and frame.loc[0, 'payment_usd'] == 0.0
@@ -0,0 +1,67 @@
+import sqlite3
+
+import forecast_vendors
+from forecast_vendors import VendorIndex, canonical_vendor
+
+RAW = [
+    'GRYPHON TECHNOLOGIES LLC',
+    'WIRE OUT 0412 Gryphon Technologies',
+    'Gryphon Technologies, Inc.',
+    'boundless1364227403',
+    'BOUNDLESS 03/14',
+    'Paylocity',
+    None,
+]
+
+
+def test_canonical_vendor_drops_channel_references_and_suffixes():
+    assert canonical_vendor('OUTGOING WIRE Gryphon Technologies LLC 1234') == 'gryphon technologies'
+    assert canonical_vendor('boundless1364227403') == 'boundless'
+    assert canonical_vendor('WIRE OUT 0412') == 'wire out'
+
+
+def test_resolve_collapses_raw_strings(tmp_path):
+    index = VendorIndex(str(tmp_path))
+    ids, names = index.resolve(RAW)
+    assert ids[0] == ids[1] == ids[2]
+    assert ids[3] == ids[4]
+    assert len(set(ids.tolist())) == 4
+    assert names[:5].tolist() == ['gryphon technologies'] * 3 + ['boundless'] * 2
+
+
+def test_ids_are_stable_across_save_and_reload(tmp_path):
+    first = VendorIndex(str(tmp_path))
+    ids, _ = first.resolve(RAW)
+    assert first.save() == len(set(RAW))
+
+    second = VendorIndex(str(tmp_path))
+    assert second.resolve(RAW)[0].tolist() == ids.tolist()
+    assert second.save() == 0
+    # A new spelling of a known payee joins its vendor; a new payee gets a fresh id
+    more, _ = second.resolve(['ACH DEBIT PAYLOCITY CORP', 'Deel Inc'])
+    assert more[0] == ids[5]
+    assert more[1] not in ids
+
+
+def test_concurrent_indexes_share_ids(tmp_path):
+    # Two runs opened before either registered anything
+    first, second = VendorIndex(str(tmp_path)), VendorIndex(str(tmp_path))
+    a, _ = first.resolve(['Deel Inc', 'Flexport'])
+    b, _ = second.resolve(['Flexport', 'Deel, Inc.'])
+    first.save()
+    second.save()
+    assert b.tolist() == [a[1], a[0]]
+    assert len(VendorIndex(str(tmp_path))) == 2
+
+
+def test_version_bump_clears_aliases_and_vendors(tmp_path, monkeypatch):
+    index = VendorIndex(str(tmp_path))
+    index.resolve(RAW)
+    index.save()
+
+    monkeypatch.setattr(forecast_vendors, 'CANONICAL_VERSION', 'bumped')
+    rebuilt = VendorIndex(str(tmp_path))
+    assert len(rebuilt) == 0
+    with sqlite3.connect(rebuilt.path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM aliases').fetchone()[0] == 0
+        assert conn.execute('SELECT COUNT(*) FROM vendors').fetchone()[0] == 0
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_frame import dollars, source_frame, transaction_frame
+from forecast_views import date_columns, family_categories, workbook_views
+
+CATEGORIES = [
+    ('Labor - G&A - Payroll', 'Payroll Processing', '6150', 'Payroll Taxes & Benefits'),
+    ('Labor - R&D - Engineering', 'Engineering Services', '9100', 'R&D - Firmware Development'),
+    ('OpEx - IT/Software - AWS', 'Cloud Hosting', '6420', 'Software & Cloud'),
+    ('Inventory - Freight', 'Freight Services', '5030', 'COGS - Freight & Shipping'),
+    ('NRE - Certification', 'Certification Testing', '9300', 'NRE - Certification'),
+    ('Operations - Repair Center', 'Repairs', '5200', 'Repair Center'),
+    ('Internal Transfer', 'Tide Rock Transfer', '', ''),
+    ('Uncategorized', '', '', ''),
+]
+
+
+@pytest.fixture
+def transactions():
+    rng = np.random.default_rng(22)
+    rows = 400
+    index = pd.RangeIndex(rows)
+    picks = rng.integers(0, len(CATEGORIES), rows)
+    categorized = pd.DataFrame({field: [CATEGORIES[i][n] for i in picks]
+                                for n, field in enumerate(['category', 'subcategory', 'gl_code', 'gl_name'])},
+                               index=index)
+    dates = pd.Series(pd.to_datetime('2024-12-28') + pd.to_timedelta(rng.integers(0, 21, rows), unit='D'))
+    dates[rng.random(rows) < 0.05] = pd.NaT
+    vendors = rng.choice(['Paylocity', 'Gryphon', 'Flexport', 'AWS', 'TUV', 'Deel'], rows)
+    df = transaction_frame([source_frame(
+        'QB Bill', [f'b{i}' for i in range(rows)], dates, vendors, rng.choice([19.99, 1250.5, 40000.0], rows),
+        categorized, balance=rng.choice([0.0, 10.0], rows), due_dates=dates + pd.Timedelta(days=30),
+    )])
+    df = df.sort_values('Date', ascending=False)
+    df['Amount'] = dollars(df['Amount_Cents'])
+    df['Balance'] = dollars(df['Balance_Cents'])
+    df['Canonical_Vendor'] = df['Vendor'].str.lower()
+    return df
+
+
+def _naive_detail(df, pattern, columns):
+    """The per-sheet filter the views replace: a str.contains scan and strftime per sheet"""
+    detail = df[df['Category'].astype(str).str.contains(pattern)][columns].copy()
+    for column in ('Date', 'Due_Date'):
+        if column in columns:
+            detail[column] = detail[column].dt.strftime('%Y-%m-%d')
+    return detail.reset_index(drop=True)
+
+
+def _plain(frame):
+    return frame.reset_index(drop=True).astype(object).where(frame.reset_index(drop=True).notna(), None)
+
+
+def test_detail_sheets_are_slices_of_the_naive_filters(transactions):
+    views = {sheet: frame for sheet, frame, _ in workbook_views(transactions)}
+    assert list(views) == ['All Expenses', 'Labor Detail', 'Labor Summary', 'OpEx Detail', 'Inventory_COGS',
+                           'NRE_RD', 'Operations', 'Weekly by GL Code', 'Needs Review']
+
+    for sheet, pattern, columns in [
+        ('OpEx Detail', 'OpEx', ['Date', 'Vendor', 'Subcategory', 'GL_Code', 'Amount']),
+        ('Inventory_COGS', 'Inventory', ['Date', 'Vendor', 'Subcategory', 'GL_Code', 'Amount', 'Status', 'Balance',
+                                         'Due_Date']),
+        ('NRE_RD', 'NRE|R&D', ['Date', 'Vendor', 'Subcategory', 'GL_Code', 'Amount']),
+        ('Operations', 'Operations', ['Date', 'Vendor', 'Subcategory', 'GL_Code', 'Amount']),
+    ]:
+        assert _plain(views[sheet]).equals(_plain(_naive_detail(transactions, pattern, columns))), sheet
+
+    labor = _naive_detail(transactions, 'Labor', ['Date', 'Vendor', 'Category', 'Subcategory', 'GL_Code', 'Amount',
+                                                  'Status'])
+    labor_dates = transactions[transactions['Category'].astype(str).str.contains('Labor')]['Date']
+    labor['Week'] = [str(day.to_period('W')) if pd.notna(day) else np.nan for day in labor_dates]
+    labor = labor.sort_values('Category', kind='stable')
+    assert _plain(views['Labor Detail']).equals(_plain(labor))
+
+    review = views['Needs Review']
+    assert len(review) == (transactions['Category'] == 'Uncategorized').sum()
+    assert review['Amount'].is_monotonic_decreasing
+
+
+def test_weekly_sheet_matches_a_pivot_table(transactions):
+    views = {sheet: frame for sheet, frame, _ in workbook_views(transactions)}
+    plain = transactions.astype({'GL_Code': str, 'GL_Name': str, 'Category': str})
+    dated = plain[(plain['GL_Code'] != '') & plain['Date'].notna()]
+    pivot = dated.assign(Week=dated['Date'].dt.to_period('W').dt.start_time).pivot_table(
+        values='Amount', index=['GL_Code', 'GL_Name', 'Category'], columns='Week', aggfunc='sum', fill_value=0)
+    pivot['Total'] = pivot.sum(axis=1)
+    pivot = pivot.sort_values('Total', ascending=False, kind='stable')
+
+    weekly = views['Weekly by GL Code']
+    assert sorted(weekly.index) == sorted(pivot.index)
+    assert np.allclose(weekly.loc[pivot.index].to_numpy(dtype=float), pivot.to_numpy(dtype=float))
+    assert weekly['Total'].is_monotonic_decreasing
+
+
+def test_duplicates_sheet_and_shared_date_text(transactions):
+    duplicates = pd.DataFrame({'Date': pd.to_datetime(['2025-01-03']), 'Kept_Date': pd.to_datetime(['2025-01-02']),
+                               'Vendor': ['Flexport']})
+    views = workbook_views(transactions, duplicates=duplicates)
+    sheet, frame, index = next(view for view in views if view[0] == 'Duplicates Removed')
+    assert frame[['Date', 'Kept_Date']].iloc[0].tolist() == ['2025-01-03', '2025-01-02'] and not index
+
+    dates = date_columns(transactions)
+    assert dates['Date_Text'].fillna('').tolist() == transactions['Date'].dt.strftime('%Y-%m-%d').fillna('').tolist()
+    assert dates['Week_Label'].fillna('').tolist() == [
+        str(day.to_period('W')) if pd.notna(day) else '' for day in transactions['Date']]
+    assert family_categories(['NRE - Certification', 'R&D Tools', 'Labor - OpEx?'])['NRE_RD'] == [
+        'NRE - Certification', 'R&D Tools']
@@ -0,0 +1,53 @@
+from datetime import date
+
+from forecast_fetch import resolve_window, window_filters
+from forecast_schemas import fetch_typed
+from forecast_snapshot import fetch_snapshot
+from postgrest_fake import FakeClient
+
+# A Wednesday: the current week runs Monday 2025-03-10 to Sunday 2025-03-16
+TODAY = date(2025, 3, 12)
+
+BILLS = [
+    {'id': f'b{day}', 'bill_date': f'2025-03-{day:02d}', 'due_date': None, 'vendor_name': 'Flexport',
+     'total_amount': float(day), 'balance': 0.0, 'updated_at': '2025-03-20T00:00:00+00:00'}
+    for day in (2, 3, 9, 10, 16, 17, 24)
+] + [{'id': 'bnull', 'bill_date': None, 'due_date': None, 'vendor_name': 'Flexport',
+      'total_amount': 1.0, 'balance': 0.0, 'updated_at': '2025-03-20T00:00:00+00:00'}]
+
+
+def test_weeks_resolve_to_whole_monday_to_sunday_weeks():
+    assert resolve_window(weeks_back=1, weeks_forward=1, today=TODAY) == ('2025-03-03', '2025-03-23')
+    assert resolve_window(weeks_back=0, weeks_forward=0, today=TODAY) == ('2025-03-10', '2025-03-16')
+    # Explicit dates win over week counts; nothing given = unbounded
+    assert resolve_window('2025-01-01', None, 4, 2, today=TODAY) == ('2025-01-01', '2025-03-30')
+    assert resolve_window(today=TODAY) == (None, None)
+
+
+def test_window_filters_use_each_tables_date_column():
+    assert window_filters('quickbooks_bills', '2025-03-03', '2025-03-16') == [
+        ('gte', 'bill_date', '2025-03-03'), ('lte', 'bill_date', '2025-03-16')]
+    assert window_filters('ramp_transactions', until='2025-03-16') == [('lte', 'transaction_date', '2025-03-16')]
+    assert window_filters('gl_transaction_overrides', '2025-03-03', '2025-03-16') == []
+    assert window_filters('bank_statements') == []
+
+
+def test_the_window_is_pushed_into_the_query():
+    since, until = resolve_window(weeks_back=1, weeks_forward=0, today=TODAY)
+    client = FakeClient({'quickbooks_bills': BILLS})
+    frame = fetch_typed(client, 'quickbooks_bills', since, until, page_size=2)
+    assert frame['id'].tolist() == ['b3', 'b9', 'b10', 'b16']
+    # Rows outside the window never leave the server, NULL dates included
+    assert sorted(row['id'] for page in client.pages for row in page) == ['b10', 'b16', 'b3', 'b9']
+
+
+def test_snapshots_sync_everything_and_window_the_read(tmp_path):
+    client = FakeClient({'quickbooks_bills': BILLS})
+    frame = fetch_snapshot(client, 'quickbooks_bills', snapshot_dir=str(tmp_path),
+                           since='2025-03-03', until='2025-03-16')
+    assert sorted(frame['id']) == ['b10', 'b16', 'b3', 'b9']
+    assert frame.attrs['delta_rows'] == len(BILLS)
+
+    wider = fetch_snapshot(FakeClient({'quickbooks_bills': BILLS}), 'quickbooks_bills',
+                           snapshot_dir=str(tmp_path), since='2025-03-01')
+    assert len(wider) == 7